@@ -3,7 +3,6 @@ import time
 import logging
 import traceback
 from datetime import datetime
-from dotenv import load_dotenv
 from pathlib import Path
 from streamlit.components.v1 import html
 from parser_agent.parser import extract_text_from_pdf, extract_text_from_image
@@ -11,15 +10,14 @@ from summarizer_agent.summarizer import summarize_text
 from tts_agent.tts import text_to_speech
 from chatbot_agent.chatbot import get_chatbot_response
 from ui_frontend.languages import get_text, LANGUAGES
-import requests
-import re
+from common.config import load_env
 from typing import Dict, List, Optional
 
 # Load environment variables
-load_dotenv()
+load_env()
 
 # Set up logging
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Chat UI Styles and Animations
@@ -95,13 +93,6 @@ CHAT_STYLES = """
 """
 
 
-def clean_text(text: str) -> str:
-    """Clean text by removing markdown characters and extra whitespace."""
-    text = re.sub(r'[*#_~`]', '', text)
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
-
-
 def initialize_session_state():
     """Initialize all required session state variables."""
     defaults = {
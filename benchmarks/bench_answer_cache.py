@@ -0,0 +1,111 @@
+"""
+Chatbot answer cache matching quality and lookup cost.
+
+Caches one answer per question for a document, then asks rewordings of
+those questions (which should be answered from the cache) and questions
+that differ in what they ask: another party, a negation, another clause
+number (which must not be). A scope of filler questions on the same
+document makes the lookup pay for a realistic number of candidates.
+Reports the share of each kind answered from the cache and the lookup
+latency.
+
+Usage:
+    python -m benchmarks.bench_answer_cache --entries 200
+    python -m benchmarks.bench_answer_cache --threshold 0.8 --save answer-cache
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.harness import format_table, save_results, summarize_latencies
+
+# (cached question, rewordings that mean the same, questions that ask something else)
+QUESTIONS = [
+    ("What is the notice period?",
+     ["notice period?", "What's the period of notice", "Please tell me the notice period"],
+     ["What is the notice period for the landlord?", "Is there no notice period?"]),
+    ("Who are the parties to this agreement?",
+     ["who are the parties", "Who are the parties in this deed?", "Who are the party to the contract"],
+     ["Who are the witnesses?", "Where do the parties live?"]),
+    ("When does this agreement expire?",
+     ["When does the contract expire", "when does it expire?", "When will this expire?"],
+     ["When does the lock-in expire?", "Why does this agreement expire?"]),
+    ("Can the tenant terminate the lease early?",
+     ["Can tenants terminate the lease early?", "can the tenant terminate this lease early",
+      "Could the tenant terminate the lease early?"],
+     ["Can the landlord terminate the lease early?", "Can the tenant renew the lease?"]),
+    ("Is subletting allowed?",
+     ["is subletting allowed", "Is subletting allowed under this agreement?", "Subletting allowed?"],
+     ["Is subletting not allowed?", "Is parking allowed?"]),
+    ("What does clause 5 say?",
+     ["What does clause 5 say", "Explain clause 5", "clause 5?"],
+     ["What does clause 6 say?", "What does clause 15 say?"]),
+    ("What is the monthly rent?",
+     ["monthly rent?", "What's the monthly rent", "Tell me the monthly rent please"],
+     ["What is the yearly rent?", "Who pays the monthly rent?"]),
+    ("What is the security deposit?",
+     ["security deposit?", "What is the security deposit amount", "What's the deposit for security"],
+     ["When is the security deposit refunded?", "Is there no security deposit?"]),
+]
+_FILLER_TERMS = ("stamp duty registration arbitration jurisdiction indemnity maintenance electricity water "
+                 "insurance penalty interest inspection alteration guarantor renewal escalation possession "
+                 "keys fixtures furniture pets guests signage utilities taxes").split()
+
+
+def _filler(count, rng):
+    return [f"What about {' '.join(rng.sample(_FILLER_TERMS, 3))} {i}?" for i in range(count)]
+
+
+def run(args, path):
+    from chatbot_agent.answer_cache import AnswerCache
+
+    cache = AnswerCache(path, threshold=args.threshold)
+    rng = random.Random(0)
+    for question in _filler(args.entries, rng):
+        cache.put(question, "document", "English", "filler answer")
+    for question, _, _ in QUESTIONS:
+        cache.put(question, "document", "English", f"answer: {question}")
+
+    kinds = {
+        "same question": [(question, question) for question, _, _ in QUESTIONS],
+        "reworded": [(variant, question) for question, variants, _ in QUESTIONS for variant in variants],
+        "different question": [(other, None) for _, _, others in QUESTIONS for other in others],
+        "other document": [(question, None) for question, _, _ in QUESTIONS],
+    }
+    results = {}
+    for kind, asked in kinds.items():
+        latencies = []
+        answered = 0
+        for _ in range(args.repeat):
+            for question, expected in asked:
+                document = "other" if kind == "other document" else "document"
+                start = time.perf_counter()
+                hit = cache.get(question, document, "English")
+                latencies.append(time.perf_counter() - start)
+                if hit and (expected is None or hit["question"] == expected):
+                    answered += 1
+        row = summarize_latencies(latencies, sum(latencies))
+        row["cached_pct"] = round(100 * answered / (len(asked) * args.repeat), 1)
+        results[kind] = row
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=200, help="other questions already cached for the document")
+    parser.add_argument("--threshold", type=float, default=0.85)
+    parser.add_argument("--repeat", type=int, default=20, help="times each question is asked")
+    parser.add_argument("--save", metavar="NAME", help="write results to benchmarks/results/NAME.json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="legal-lens-answer-cache-") as directory:
+        results = run(args, str(Path(directory) / "answers.sqlite"))
+    print(format_table(results, columns=("cached_pct", "p50_ms", "p95_ms", "p99_ms")))
+    if args.save:
+        print(f"Saved {save_results(results, args.save)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Tail latency of DeepSeek calls before and after the resilient API client.
+
+"before" sends each request once with a fixed timeout, the way the agents
+used to; "after" goes through common.api_client.chat_completion with
+retries, hedging and the circuit breaker. Both run against the same stub
+server configured with a slow tail and injected 503s.
+
+Usage:
+    python -m benchmarks.bench_api_client --requests 400 --concurrency 8
+    python -m benchmarks.bench_api_client --tail-probability 0.1 --error-rate 0.05
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+import requests
+
+from benchmarks.harness import format_table, save_results, summarize_latencies
+from benchmarks.stub_server import run_stub_server
+
+MESSAGES = [
+    {"role": "system", "content": "You are a helpful legal assistant."},
+    {"role": "user", "content": "What is the notice period for termination under this lease?"},
+]
+
+
+def _run_concurrently(call, total, concurrency):
+    """Run `call` `total` times on `concurrency` threads; returns (latencies, failures, elapsed)."""
+    latencies, failures = [], []
+    lock = threading.Lock()
+    remaining = iter(range(total))
+
+    def worker():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            start = time.perf_counter()
+            try:
+                ok = call()
+            except requests.exceptions.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    failures.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, failures, time.perf_counter() - started
+
+
+def bench_before(api_base, args):
+    """Single attempt with a fixed timeout and no retries."""
+    url = f"{api_base}/chat/completions"
+    body = json.dumps({"model": "deepseek-chat", "messages": MESSAGES, "max_tokens": 500})
+
+    def call():
+        response = requests.post(url, data=body, headers={"Content-Type": "application/json"}, timeout=args.timeout)
+        return response.status_code == 200
+
+    return _run_concurrently(call, args.requests, args.concurrency)
+
+
+def bench_after(api_base, args):
+    from common import api_client
+
+    api_client.reset_resilience()
+
+    def call():
+        response = api_client.chat_completion(MESSAGES, timeout=args.timeout, max_tokens=500)
+        return response.status_code == 200
+
+    # Warm the latency window so hedging and adaptive timeouts are active
+    _run_concurrently(call, args.warmup, args.concurrency)
+    return _run_concurrently(call, args.requests, args.concurrency)
+
+
+def run(args):
+    stub_config = {
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.latency_ms / 5,
+        "tail_probability": args.tail_probability,
+        "tail_latency_ms": args.tail_latency_ms,
+        "error_rate": args.error_rate,
+        "seed": 7,
+    }
+    results = {}
+    for name, bench in (("before", bench_before), ("after", bench_after)):
+        with run_stub_server(**stub_config) as api_base:
+            os.environ["DEEPSEEK_API_BASE"] = api_base
+            latencies, failures, elapsed = bench(api_base, args)
+        row = summarize_latencies(latencies, elapsed)
+        row["failures"] = len(failures)
+        results[name] = row
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--warmup", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--tail-probability", type=float, default=0.05)
+    parser.add_argument("--tail-latency-ms", type=float, default=3000.0)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--save", metavar="NAME", help="write results to benchmarks/results/NAME.json")
+    args = parser.parse_args()
+
+    # The client reads these at import time; bench_after imports it after they're set
+    os.environ.setdefault("DEEPSEEK_API_KEY", "stub-key")
+    os.environ.setdefault("LEGAL_LENS_API_RPM", "0")
+
+    results = run(args)
+    print(format_table(results, columns=("ops", "failures", "p50_ms", "p95_ms", "p99_ms")))
+    if args.save:
+        print(f"Saved {save_results(results, args.save)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Size and read cost of document artifacts against reloading whole documents.
+
+Builds a document of --pages synthetic contract pages, stores it as an
+artifact with each available codec, and compares:
+
+- size on disk against the UTF-8 text and a pickled ExtractedDocument
+- opening the artifact and reading one page (memory-mapped, one frame
+  decompressed) against unpickling the whole document or rebuilding it
+  from the corpus index's stored pages
+- loading the whole artifact as an ExtractedDocument
+
+Usage:
+    python -m benchmarks.bench_artifact --pages 100 1000
+    python -m benchmarks.bench_artifact --pages 5000 --save artifact
+"""
+import argparse
+import pickle
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.harness import format_table, save_results, summarize_latencies
+
+CLAUSE = ("{n}. {title}\n{n}.1 The Tenant shall pay the monthly rent of Rs. {rent} on or before the {day}th day "
+          "of each month. {n}.2 Either party may terminate this agreement by giving {notice} months' notice in "
+          "writing to the other party at the address stated above. {n}.3 The security deposit shall be refunded "
+          "without interest within {days} days of the Tenant handing over vacant possession.\n")
+TITLES = ["RENT", "TERMINATION", "DEPOSIT", "MAINTENANCE", "SUBLETTING", "ARBITRATION", "INDEMNITY", "NOTICES"]
+
+
+def build_document(pages):
+    from parser_agent.parser import TEXT_LAYER, document_from_pages
+
+    rng = random.Random(pages)
+    page_texts = []
+    for page in range(pages):
+        clauses = [CLAUSE.format(n=page * 4 + i + 1, title=rng.choice(TITLES), rent=rng.randint(5, 90) * 1000,
+                                 day=rng.randint(1, 28), notice=rng.randint(1, 6), days=rng.randint(15, 90))
+                   for i in range(4)]
+        page_texts.append("".join(clauses))
+    document = document_from_pages(page_texts)
+    document.spans = [(start, end, TEXT_LAYER, page) for page, (start, end) in enumerate(document.page_offsets, 1)]
+    return document
+
+
+def _time(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return summarize_latencies(latencies, sum(latencies))
+
+
+def run(pages, args, directory):
+    from parser_agent.artifact import CODEC_NONE, CODEC_ZLIB, CODEC_ZSTD, DocumentArtifact, _zstd, write_artifact
+    from search_agent.index import CorpusIndex
+
+    document = build_document(pages)
+    rng = random.Random(0)
+    results = {}
+
+    pickled = Path(directory) / f"{pages}.pickle"
+    pickled.write_bytes(pickle.dumps(document))
+    row = _time(lambda: pickle.loads(pickled.read_bytes()).page_text(rng.randint(1, pages)), args.repeat)
+    row["bytes"] = pickled.stat().st_size
+    results[f"{pages}p pickle page"] = row
+
+    index = CorpusIndex(str(Path(directory) / f"{pages}.sqlite"))
+    index.add_document(document, "lease.pdf", key="bench")
+    row = _time(lambda: index.document("bench").page_text(rng.randint(1, pages)), max(1, args.repeat // 10))
+    results[f"{pages}p corpus page"] = row
+
+    codecs = {"none": CODEC_NONE, "zlib": CODEC_ZLIB}
+    if _zstd() is not None:
+        codecs["zstd"] = CODEC_ZSTD
+    for name, codec in codecs.items():
+        path = Path(directory) / f"{pages}.{name}.llda"
+        start = time.perf_counter()
+        write_artifact(document, path, codec)
+        write_ms = (time.perf_counter() - start) * 1000
+
+        def read_page():
+            with DocumentArtifact(path) as artifact:
+                artifact.page_text(rng.randint(1, pages))
+
+        def load_all():
+            with DocumentArtifact(path) as artifact:
+                artifact.to_document()
+
+        row = _time(read_page, args.repeat)
+        row["bytes"] = path.stat().st_size
+        row["write_ms"] = write_ms
+        results[f"{pages}p {name} page"] = row
+        row = _time(load_all, max(1, args.repeat // 10))
+        row["bytes"] = path.stat().st_size
+        results[f"{pages}p {name} all"] = row
+
+    results[f"{pages}p utf-8 text"] = {"bytes": len(document.text.encode("utf-8"))}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", nargs="+", type=int, default=[100, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--save", metavar="NAME", help="write results to benchmarks/results/NAME.json")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="legal-lens-artifact-") as directory:
+        for pages in args.pages:
+            results.update(run(pages, args, directory))
+    print(format_table(results, columns=("bytes", "write_ms", "p50_ms", "p95_ms")))
+    if args.save:
+        print(f"Saved {save_results(results, args.save)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Server time per chat turn with a large document open.
+
+Serves the app with `streamlit run` (see benchmarks.load_test) against
+the stub chat-completions server. One browser session uploads a large
+PDF, generates its summary and audio, so the whole page is populated,
+and then asks --turns questions. Each turn is timed from the chat
+message to the end of the last script run it causes, and the server's
+CPU seconds over all turns are divided by the number of turns.
+
+Pass several scripts to --apps to compare layouts, e.g. a copy of
+interface.py from before a change:
+
+Usage:
+    python -m benchmarks.bench_chat_turn --pages 300 --turns 20
+    git show HEAD~1:interface.py > interface_before.py
+    python -m benchmarks.bench_chat_turn --apps interface_before.py interface.py --save chat-turn
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.corpus import generate_pdf
+from benchmarks.harness import format_table, save_results, summarize_latencies
+from benchmarks.load_test import APP_SCRIPT, AppServer, BrowserSession
+from benchmarks.stub_server import run_stub_server
+
+TOPICS = ["rent", "notice", "deposit", "maintenance", "termination", "arbitration", "renewal", "subletting"]
+
+
+def question(turn):
+    # Distinct clause numbers, so no turn is answered from the chatbot answer cache
+    return f"What does clause {turn + 1} say about {TOPICS[turn % len(TOPICS)]}?"
+
+
+async def _session(base_url, pdf, args, server):
+    from ui_frontend.languages import get_text
+
+    session = BrowserSession(base_url, args.timeout)
+    await session.connect()
+    try:
+        await session.rerun()
+        await session.upload(get_text("upload_title", "English"), pdf.name, pdf.read_bytes())
+        await session.click(get_text("generate_summary", "English"))
+        await session.click(get_text("generate_audio", "English"))
+        placeholder = get_text("chat_placeholder", "English")
+        latencies = []
+        cpu_start = server.stats.cpu_seconds()
+        start = time.perf_counter()
+        for turn in range(args.turns):
+            latencies.append(await session.chat(placeholder, question(turn)))
+        elapsed = time.perf_counter() - start
+        cpu_end = server.stats.cpu_seconds()
+    finally:
+        await session.close()
+    row = summarize_latencies(latencies, elapsed)
+    if cpu_start is not None and cpu_end is not None:
+        row["cpu_ms_per_turn"] = (cpu_end - cpu_start) / args.turns * 1000
+    row["errors"] = len(session.errors)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", nargs="+", default=[str(APP_SCRIPT)], help="Streamlit scripts to compare")
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--api-latency-ms", type=float, default=0.0,
+                        help="stub API latency; 0 leaves only the server's own time")
+    parser.add_argument("--timeout", type=float, default=180.0)
+    parser.add_argument("--save", metavar="NAME", help="write results to benchmarks/results/NAME.json")
+    args = parser.parse_args()
+    # Read by AppServer
+    args.tts_delay = 0.0
+    args.rpm = 0
+
+    pdf = generate_pdf("text", args.pages)
+    results = {}
+    with run_stub_server(latency_ms=args.api_latency_ms) as api_base:
+        for app in args.apps:
+            args.app = str(Path(app).resolve())
+            with tempfile.TemporaryDirectory(prefix="legal-lens-chat-") as cache_dir:
+                with AppServer(api_base, cache_dir, args) as server:
+                    results[Path(app).name] = asyncio.run(_session(server.base_url, pdf, args, server))
+            print(f"{Path(app).name}: p50 {results[Path(app).name]['p50_ms']:.0f} ms per turn", flush=True)
+    print(format_table(results, columns=("ops", "p50_ms", "p95_ms", "cpu_ms_per_turn", "errors")))
+    if args.save:
+        print(f"Saved {save_results(results, args.save)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Cold-start and per-rerun cost of the UI scripts and agent modules.
+
+Each target is measured in fresh interpreters:
+
+- cold: wall time to execute the UI script (or import the module) in a new
+  process, i.e. what the first page load pays before anything renders;
+- rerun: time to execute the script again in the same process, which is
+  what Streamlit pays on every widget interaction;
+- heaviest imports: the largest cumulative entries from `python -X importtime`.
+
+Usage:
+    python -m benchmarks.bench_imports
+    python -m benchmarks.bench_imports --targets interface.py nlp.roles --repeat 7 --top 10
+    python -m benchmarks.bench_imports --save-baseline imports --compare imports
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.harness import compare, format_table, load_baseline, save_results
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_TARGETS = [
+    "interface.py",
+    "ui_frontend/interface.py",
+    "parser_agent.parser",
+    "summarizer_agent.summarizer",
+    "chatbot_agent.chatbot",
+    "tts_agent.tts",
+    "nlp.roles",
+]
+
+# Executed in a fresh interpreter; scripts run under a non-main name so run_ui() isn't called.
+_PROBE = """
+import json, runpy, sys, time
+sys.path.insert(0, {root!r})
+target, reruns = {target!r}, {reruns}
+def load():
+    if target.endswith(".py"):
+        runpy.run_path(target, run_name="__bench__")
+    else:
+        __import__(target)
+start = time.perf_counter()
+load()
+cold = time.perf_counter() - start
+timings = []
+for _ in range(reruns if target.endswith(".py") else 0):
+    start = time.perf_counter()
+    load()
+    timings.append(time.perf_counter() - start)
+print(json.dumps({{"cold": cold, "reruns": timings}}))
+"""
+
+
+def _probe(target, reruns):
+    code = _PROBE.format(root=str(ROOT), target=target, reruns=reruns)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _importtime(target):
+    """Parse `-X importtime` into {module: cumulative microseconds}."""
+    module = "runpy" if target.endswith(".py") else target
+    code = f"import sys; sys.path.insert(0, {str(ROOT)!r}); import {module}"
+    if target.endswith(".py"):
+        code += f"; runpy.run_path({target!r}, run_name='__bench__')"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True)
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        cumulative[name] = int(cumulative_us)
+    return cumulative
+
+
+def bench_target(target, repeat, reruns):
+    colds, rerun_times = [], []
+    for _ in range(repeat):
+        result = _probe(target, reruns)
+        colds.append(result["cold"])
+        rerun_times.extend(result["reruns"])
+    row = {
+        "cold_ms": statistics.median(colds) * 1000,
+        "cold_min_ms": min(colds) * 1000,
+    }
+    if rerun_times:
+        row["rerun_ms"] = statistics.median(rerun_times) * 1000
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", default=DEFAULT_TARGETS)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per target")
+    parser.add_argument("--reruns", type=int, default=20, help="script re-executions per interpreter")
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports to list per script")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    args = parser.parse_args()
+
+    results = {target: bench_target(target, args.repeat, args.reruns) for target in args.targets}
+    print(format_table(results, columns=("cold_ms", "cold_min_ms", "rerun_ms")))
+
+    for target in args.targets:
+        if not target.endswith(".py") or args.top <= 0:
+            continue
+        cumulative = _importtime(target)
+        heaviest = sorted(
+            ((name, us) for name, us in cumulative.items() if "." not in name),
+            key=lambda item: item[1], reverse=True
+        )[:args.top]
+        print(f"\nHeaviest top-level imports for {target}:")
+        for name, us in heaviest:
+            print(f"  {name:<32}{us / 1000:>10.1f} ms")
+
+    if args.save_baseline:
+        print(f"Saved baseline to {save_results(results, args.save_baseline, baseline=True)}")
+    if args.compare:
+        print(compare(results, load_baseline(args.compare), metrics=("cold_ms", "cold_min_ms", "rerun_ms")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Corpus index build rate and query latency at scale.
+
+Fills a fresh index with synthetic lease documents (the same clause text
+the PDF corpus uses, without rendering PDFs), then times ranked searches
+for rare terms, common terms, phrases and prefixes. One document in a
+thousand carries a force majeure clause, so "rare" queries return a few
+dozen documents and "common" ones match nearly every page.
+
+Usage:
+    python -m benchmarks.bench_index --documents 100000 --pages 3
+    python -m benchmarks.bench_index --documents 10000 --pages 20 --keep /tmp/corpus.db
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.corpus import page_lines
+from benchmarks.harness import format_table, save_results, summarize_latencies
+
+RARE_CLAUSE = "Neither party shall be liable for delay caused by force majeure events beyond its control."
+RARE_EVERY = 1000
+
+QUERIES = {
+    "rare word": "majeure",
+    "rare phrase": '"force majeure"',
+    "rare and common": "force majeure rent",
+    "common word": "premises",
+    "common phrase": '"lock-in period"',
+    "prefix": "terminat*",
+}
+
+
+def document_pages(index, pages):
+    rng = random.Random(index)
+    texts = ["\n".join(page_lines(page, rng)) for page in range(1, pages + 1)]
+    if index % RARE_EVERY == 0:
+        texts[-1] += "\n" + RARE_CLAUSE
+    return texts
+
+
+def build(index, documents, pages):
+    start = time.perf_counter()
+    for i in range(documents):
+        index.add_pages(f"synthetic-{i}", f"lease-{i}.pdf", document_pages(i, pages), "English")
+    return time.perf_counter() - start
+
+
+def run(args, path):
+    from search_agent.index import CorpusIndex
+
+    index = CorpusIndex(path)
+    elapsed = build(index, args.documents, args.pages)
+    index.optimize()
+    stats = index.stats()
+    print(f"Indexed {stats['documents']} documents ({stats['pages']} pages) in {elapsed:.1f}s: "
+          f"{args.documents / elapsed:.0f} documents/s, {stats['bytes'] / 1e6:.1f} MB on disk")
+
+    results = {}
+    for name, query in QUERIES.items():
+        index.search(query, limit=args.limit)  # warm the page cache
+        latencies = []
+        hits = 0
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            hits = len(index.search(query, limit=args.limit))
+            latencies.append(time.perf_counter() - start)
+        row = summarize_latencies(latencies, sum(latencies))
+        row["documents"] = hits
+        results[name] = row
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=20, help="documents returned per search")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--keep", metavar="PATH", help="build the index at PATH and keep it")
+    parser.add_argument("--save", metavar="NAME", help="write results to benchmarks/results/NAME.json")
+    args = parser.parse_args()
+
+    if args.keep:
+        results = run(args, args.keep)
+    else:
+        with tempfile.TemporaryDirectory(prefix="legal-lens-index-") as directory:
+            results = run(args, str(Path(directory) / "corpus.db"))
+    print(format_table(results, columns=("documents", "p50_ms", "p95_ms", "p99_ms")))
+    if args.save:
+        print(f"Saved {save_results(results, args.save)}")
+
+
+if __name__ == "__main__":
+    main()
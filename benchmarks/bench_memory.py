@@ -0,0 +1,148 @@
+"""
+Memory held by N UI sessions, with and without the shared document store.
+
+"copies" reproduces the old session state: every session keeps its own
+extracted document, text, summary and an unbounded chat history.
+"store" keeps only handles in session state; artifacts live once in
+common.document_store and chat history is bounded like the UI does.
+
+Each scenario runs in a fresh process and reports Python heap bytes
+(tracemalloc) and peak RSS, for sessions viewing the same document and
+sessions viewing different documents.
+
+Usage:
+    python -m benchmarks.bench_memory --sessions 50 --pages 50
+    python -m benchmarks.bench_memory --sessions 200 --chat-turns 100
+"""
+import argparse
+import gc
+import io
+import multiprocessing
+import tracemalloc
+
+from benchmarks.corpus import CORPUS_DIR, generate_pdf
+from benchmarks.harness import format_table, peak_rss_mb, save_results
+
+MAX_CHAT_MESSAGES = 40  # mirrors interface.MAX_CHAT_MESSAGES
+
+
+class _Upload(io.BytesIO):
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def _pdf_bytes(pages, distinct, index):
+    if not distinct:
+        return generate_pdf("text", pages).read_bytes()
+    path = CORPUS_DIR / f"text-{pages}-seed{index}.pdf"
+    return generate_pdf("text", pages, path=path, seed=index).read_bytes()
+
+
+def _chat(turns, bounded):
+    history = [{"role": "system", "content": "You are a helpful legal assistant."}]
+    for turn in range(turns):
+        for role in ("user", "assistant"):
+            history.append({"role": role, "content": f"{role} message {turn} " * 20, "timestamp": "12:00"})
+            if bounded and len(history) > MAX_CHAT_MESSAGES + 1:
+                del history[1:len(history) - MAX_CHAT_MESSAGES]
+    return history
+
+
+def _summary(document_index):
+    # Built at run time so each call yields a separate string, like a fresh API reply
+    return " ".join([f"• Summary point of document {document_index}."] * 40)
+
+
+def build_sessions(mode, sessions, pages, distinct, chat_turns):
+    from common.document_store import DocumentStore
+    from common.singleflight import content_key
+    from parser_agent.parser import extract_document
+
+    store = DocumentStore()
+    states = []
+    for i in range(sessions):
+        data = _pdf_bytes(pages, distinct, i)
+        name = f"document-{i if distinct else 0}.pdf"
+        if mode == "copies":
+            document = extract_document(_Upload(data, name))
+            summary = _summary(i if distinct else 0)
+            states.append({
+                "document": document,
+                "extracted_text": document.text,
+                "summary": summary,
+                "chat_history": _chat(chat_turns, bounded=False),
+            })
+        else:
+            key = content_key("extract_document", name, data)
+            document = store.get_or_create(key, lambda: extract_document(_Upload(data, name)))
+            store.bind(f"session-{i}", "document", key, document)
+            summary = _summary(i if distinct else 0)
+            summary_key = store.put(content_key("summary", summary), summary)
+            store.bind(f"session-{i}", "summary", summary_key, summary)
+            states.append({
+                "document_key": key,
+                "summary_key": summary_key,
+                "chat_history": _chat(chat_turns, bounded=True),
+            })
+        del data
+    return states, store
+
+
+def _run(scenario, args, queue):
+    mode, distinct = scenario
+    try:
+        # Import and warm up the parser before measuring so module state isn't counted
+        build_sessions(mode, 1, 1, False, 0)
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        states, store = build_sessions(mode, args.sessions, args.pages, distinct, args.chat_turns)
+        gc.collect()
+        heap = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        queue.put((scenario, {
+            "sessions": len(states),
+            "heap_mb": heap / 1e6,
+            "per_session_kb": heap / len(states) / 1e3,
+            "peak_rss_mb": peak_rss_mb(),
+            "store_entries": store.stats()["entries"] if mode == "store" else 0,
+        }, None))
+    except Exception as e:
+        queue.put((scenario, None, f"{type(e).__name__}: {e}"))
+
+
+def run(args):
+    results = {}
+    ctx = multiprocessing.get_context("spawn")
+    for distinct in (False, True):
+        for mode in ("copies", "store"):
+            queue = ctx.Queue()
+            process = ctx.Process(target=_run, args=((mode, distinct), args, queue))
+            process.start()
+            scenario, row, error = queue.get()
+            process.join()
+            name = f"{mode}/{'different' if distinct else 'same'}"
+            if error:
+                print(f"{name}: failed ({error})")
+            else:
+                results[name] = row
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--chat-turns", type=int, default=60)
+    parser.add_argument("--save", metavar="NAME", help="write results to benchmarks/results/NAME.json")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(format_table(results, columns=("sessions", "heap_mb", "per_session_kb", "peak_rss_mb", "store_entries")))
+    if args.save:
+        print(f"Saved {save_results(results, args.save)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Near-duplicate detection quality and cost.
+
+Registers a base set of synthetic documents, then checks variants of them
+against the index: re-scans with OCR character errors, copies with the
+party names changed, revisions with a share of sentences rewritten, and
+unrelated documents. Reports the share of each kind flagged as a
+near-duplicate of its original (false positives for unrelated ones) and
+the time to sign and look up one document.
+
+Usage:
+    python -m benchmarks.bench_near_duplicates --documents 2000 --pages 5
+    python -m benchmarks.bench_near_duplicates --ocr-error-rate 0.01 --rewritten 0.3
+"""
+import argparse
+import random
+import string
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.harness import format_table, save_results, summarize_latencies
+
+VOCABULARY_SIZE = 5000
+# Common OCR confusions; anything else becomes a random letter
+_CONFUSIONS = {"e": "c", "l": "1", "o": "0", "i": "l", "m": "rn", "s": "5", "a": "o", "n": "ri"}
+
+
+def _vocabulary():
+    rng = random.Random(0)
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 11))) for _ in range(VOCABULARY_SIZE)]
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(words) for _ in range(rng.randint(8, 20))).capitalize() + "."
+
+
+def make_document(seed, pages, words):
+    rng = random.Random(seed)
+    names = [rng.choice(words).capitalize() for _ in range(4)]
+    sentences = [
+        f"This deed is made between {names[0]} {names[1]} and {names[2]} {names[3]}."
+    ] + [_sentence(rng, words) for _ in range(pages * 25)]
+    return {"names": names, "sentences": sentences}
+
+
+def render(document):
+    return "\n".join(document["sentences"])
+
+
+def ocr_variant(text, rate, rng):
+    chars = []
+    for ch in text:
+        if ch.isalpha() and rng.random() < rate:
+            chars.append(_CONFUSIONS.get(ch, rng.choice(string.ascii_lowercase)))
+        else:
+            chars.append(ch)
+    return "".join(chars)
+
+
+def renamed_variant(document, rng, words):
+    text = render(document)
+    for name in document["names"]:
+        text = text.replace(name, rng.choice(words).capitalize())
+    return text
+
+
+def rewritten_variant(document, share, rng, words):
+    sentences = list(document["sentences"])
+    for i in rng.sample(range(len(sentences)), int(len(sentences) * share)):
+        sentences[i] = _sentence(rng, words)
+    return "\n".join(sentences)
+
+
+def run(args, path):
+    from search_agent.near_duplicates import NearDuplicateIndex
+
+    index = NearDuplicateIndex(path, threshold=args.threshold)
+    words = _vocabulary()
+    originals = [make_document(seed, args.pages, words) for seed in range(args.documents)]
+    start = time.perf_counter()
+    for i, document in enumerate(originals):
+        index.register(f"original-{i}", f"original-{i}.pdf", render(document))
+    elapsed = time.perf_counter() - start
+    print(f"Registered {args.documents} documents of {args.pages} pages in {elapsed:.1f}s "
+          f"({args.documents / elapsed:.0f} documents/s)")
+
+    rng = random.Random(1)
+    sample = rng.sample(range(args.documents), min(args.variants, args.documents))
+    kinds = {
+        "ocr errors": lambda i: ocr_variant(render(originals[i]), args.ocr_error_rate, rng),
+        "renamed parties": lambda i: renamed_variant(originals[i], rng, words),
+        "rewritten": lambda i: rewritten_variant(originals[i], args.rewritten, rng, words),
+        "unrelated": lambda i: render(make_document(args.documents + i, args.pages, words)),
+    }
+    results = {}
+    for kind, variant in kinds.items():
+        latencies = []
+        flagged = 0
+        for i in sample:
+            text = variant(i)
+            start = time.perf_counter()
+            match = index.register(f"{kind}-{i}", f"{kind}-{i}.pdf", text)
+            latencies.append(time.perf_counter() - start)
+            if match and (kind == "unrelated" or match["key"] == f"original-{i}"):
+                flagged += 1
+        row = summarize_latencies(latencies, sum(latencies))
+        row["flagged_pct"] = round(100 * flagged / len(sample), 1)
+        results[kind] = row
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=2000, help="documents registered before checking variants")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--variants", type=int, default=200, help="variants checked per kind")
+    parser.add_argument("--ocr-error-rate", type=float, default=0.005, help="share of letters misread")
+    parser.add_argument("--rewritten", type=float, default=0.3, help="share of sentences rewritten")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--save", metavar="NAME", help="write results to benchmarks/results/NAME.json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="legal-lens-near-duplicates-") as directory:
+        results = run(args, str(Path(directory) / "corpus.db"))
+    print(format_table(results, columns=("flagged_pct", "p50_ms", "p95_ms", "p99_ms")))
+    if args.save:
+        print(f"Saved {save_results(results, args.save)}")
+
+
+if __name__ == "__main__":
+    main()
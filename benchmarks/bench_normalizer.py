@@ -0,0 +1,137 @@
+"""
+Text normalizer throughput against the cleaning functions it replaced.
+
+Builds a synthetic extraction of the requested size from the corpus's
+clause text with the artifacts PDF text layers and OCR produce (ligatures,
+soft hyphens, no-break spaces, words hyphenated across lines, doubled and
+trailing spaces), optionally in Devanagari, and times each function over
+the whole text. The replaced implementations are reproduced here as they
+were so the comparison stays runnable.
+
+Usage:
+    python -m benchmarks.bench_normalizer --mb 5
+    python -m benchmarks.bench_normalizer --mb 5 --script devanagari --repeat 5
+"""
+import argparse
+import random
+import re
+import time
+
+from benchmarks.corpus import page_lines
+from benchmarks.harness import format_table, save_results, summarize_latencies
+
+_DEVANAGARI = [
+    "पट्टेदार प्रत्येक माह की पाँच तारीख़ तक किराया अदा करेगा।",
+    "कोई भी पक्ष तीन माह का लिखित नोटिस देकर यह करार समाप्त कर सकता है।",
+    "ज़मानत राशि अवधि समाप्त होने पर बिना ब्याज के लौटाई जाएगी।",
+]
+
+
+def legacy_clean_text(text: str) -> str:
+    """interface.py, app.py and ui_frontend/interface.py before the shared normalizer."""
+    text = re.sub(r'[*#_~`]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def legacy_clean_markdown(text):
+    """nlp.summarizer.clean_markdown before the shared normalizer."""
+    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
+    text = re.sub(r'\*(.*?)\*', r'\1', text)
+    text = re.sub(r'_(.*?)_', r'\1', text)
+    text = re.sub(r'^#+\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)
+    text = re.sub(r'`(.*?)`', r'\1', text)
+    text = re.sub(r'```.*?```', '', text, flags=re.DOTALL)
+    text = re.sub(r'\n\s*\n', '\n\n', text)
+    return text.strip()
+
+
+def _with_artifacts(line, rng):
+    if rng.random() < 0.05:
+        line = line.replace("fi", "\ufb01")
+    if rng.random() < 0.05:
+        line = line.replace(" ", "\u00a0", 1)
+    if rng.random() < 0.1:
+        line = line.replace(" the ", "  the ")
+    if rng.random() < 0.05:
+        line += " "
+    return line
+
+
+def extraction(size, script="latin", seed=0):
+    """Page texts totalling about `size` characters."""
+    rng = random.Random(seed)
+    pages = []
+    total = 0
+    while total < size:
+        lines = page_lines(len(pages) % 49 + 2, rng)
+        if script == "devanagari":
+            lines = [lines[0]] + [rng.choice(_DEVANAGARI) + " " + rng.choice(_DEVANAGARI) for _ in lines[1:]]
+        text = "\n".join(_with_artifacts(line, rng) for line in lines) + "\n"
+        # A word hyphenated across a line break and a soft hyphen on most pages
+        text = text.replace("terminate", "termi-\nnate", 1).replace("premises", "prem\u00adises", 1)
+        pages.append(text)
+        total += len(text)
+    return pages
+
+
+def summary_markdown(size):
+    """Model-style markdown summaries totalling about `size` characters."""
+    parts = []
+    total = 0
+    while total < size:
+        part = (
+            f"## Clause {len(parts) + 1}\n\n- **Rent** is *due* on the fifth day; see [the schedule](#schedule).\n"
+            f"- The `security_deposit` is refundable _without interest_.\n\n"
+        )
+        parts.append(part)
+        total += len(part)
+    return "".join(parts)
+
+
+def run(args):
+    from nlp.normalizer import normalize_pages, normalize_text, speech_text, strip_markdown
+
+    size = int(args.mb * 1_000_000)
+    pages = extraction(size, args.script)
+    text = "".join(pages)
+    markdown = summary_markdown(size)
+    cases = {
+        "clean_text (old)": (legacy_clean_text, text),
+        "speech_text": (speech_text, text),
+        "clean_markdown (old)": (legacy_clean_markdown, markdown),
+        "strip_markdown": (strip_markdown, markdown),
+        "normalize_text": (normalize_text, text),
+        "normalize_pages": (lambda p: list(normalize_pages(p)), pages),
+    }
+    results = {}
+    for name, (fn, data) in cases.items():
+        fn(data)  # warm up (compiles patterns)
+        latencies = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fn(data)
+            latencies.append(time.perf_counter() - start)
+        row = summarize_latencies(latencies, sum(latencies), units=size * args.repeat / 1e6)
+        row["mb_s"] = row.pop("throughput_units_s")
+        results[name] = row
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=5.0, help="size of the synthetic extraction in MB of text")
+    parser.add_argument("--script", choices=("latin", "devanagari"), default="latin")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--save", metavar="NAME", help="write results to benchmarks/results/NAME.json")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(format_table(results, columns=("p50_ms", "p95_ms", "mb_s")))
+    if args.save:
+        print(f"Saved {save_results(results, args.save)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compare OCR engines on rendered pages of the scanned corpus.
+
+The per-call pytesseract path forks tesseract and reloads its language
+model for every image; the batched and tesserocr engines amortize that.
+
+Usage:
+    python -m benchmarks.bench_ocr --pages 32 --engines pytesseract batch tesserocr
+"""
+import argparse
+import time
+
+import fitz
+from PIL import Image
+
+from benchmarks.corpus import generate_pdf
+from benchmarks.harness import format_table, peak_rss_mb, summarize_latencies
+from parser_agent.ocr import BATCH_SIZE, ENGINES
+
+
+def render_pages(pages):
+    doc = fitz.open(str(generate_pdf("scanned", pages)))
+    images = []
+    for page in doc:
+        pix = page.get_pixmap()
+        images.append(Image.frombytes("RGB", [pix.width, pix.height], pix.samples))
+    return images
+
+
+def bench_engine(name, images, batch_size):
+    engine = ENGINES[name]()
+    latencies = []
+    chars = 0
+    start = time.perf_counter()
+    for batch_start in range(0, len(images), batch_size):
+        batch = images[batch_start:batch_start + batch_size]
+        batch_started = time.perf_counter()
+        texts = engine.images_to_strings(batch)
+        per_page = (time.perf_counter() - batch_started) / len(batch)
+        latencies.extend([per_page] * len(batch))
+        chars += sum(len(t) for t in texts)
+    row = summarize_latencies(latencies, time.perf_counter() - start, units=len(images))
+    row["chars"] = chars
+    row["peak_rss_mb"] = peak_rss_mb()
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=32)
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    images = render_pages(args.pages)
+    results = {}
+    for name in args.engines:
+        try:
+            results[name] = bench_engine(name, images, args.batch_size)
+        except Exception as e:
+            print(f"{name}: skipped ({type(e).__name__}: {e})")
+    print(format_table(results, columns=("units", "throughput_units_s", "p50_ms", "p95_ms", "chars")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+OCR throughput with 1..N queue workers, and recovery from a killed worker.
+
+Starts worker processes against a fresh queue (SQLite, or the Redis
+stand-in from benchmarks/stub_redis.py), submits OCR jobs of synthetic
+page images the way QueueOCREngine does, and waits for all of them. The
+workers run a stand-in OCR engine that takes --work-ms per page: by
+default it sleeps, modelling workers on separate nodes (tesseract runs on
+each worker's own cores); --cpu burns CPU instead, which only scales up
+to the cores of this machine.
+
+With --kill, one of the workers is killed (SIGKILL) once a third of the
+jobs are done; its running jobs must be requeued when their lease runs
+out and finished by the others. Reports pages per second, per-job
+latency from submit to result, and the jobs that needed a retry.
+
+Usage:
+    python -m benchmarks.bench_workers --workers 1 2 4 --jobs 32
+    python -m benchmarks.bench_workers --backends redis --workers 2 --kill
+    python -m benchmarks.bench_workers --cpu --work-ms 50 --save workers
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.harness import format_table, save_results, summarize_latencies
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+LEASE = 2.0
+
+
+class FakeOCREngine:
+    """Stand-in OCR engine that takes a fixed time per image."""
+
+    name = "fake"
+    work_ms = 200.0
+    cpu = False
+
+    def image_to_string(self, image, lang="eng"):
+        if self.cpu:
+            deadline = time.perf_counter() + self.work_ms / 1000
+            while time.perf_counter() < deadline:
+                pass
+        else:
+            time.sleep(self.work_ms / 1000)
+        return f"page {image.getpixel((0, 0))} ({lang})"
+
+    def images_to_strings(self, images, lang="eng"):
+        return [self.image_to_string(image, lang) for image in images]
+
+
+def serve_worker(url, work_ms, cpu):
+    """Body of a worker subprocess: the fake engine behind a one-job-at-a-time OCR worker."""
+    from parser_agent import ocr
+    from workers.queue import open_queue
+    from workers.worker import Worker
+
+    FakeOCREngine.work_ms = work_ms
+    FakeOCREngine.cpu = cpu
+    ocr.ENGINES["fake"] = FakeOCREngine
+    os.environ["LEGAL_LENS_WORKER_OCR_ENGINE"] = "fake"
+    worker = Worker(open_queue(url), ["ocr"], concurrency=1, lease=LEASE, heartbeat=0.25, poll=0.05)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    worker.run()
+
+
+def _page_images(jobs, pages, seed):
+    from PIL import Image
+
+    # Distinct pixels per page, so no two jobs are deduplicated into one
+    return [[Image.new("L", (64, 64), color=(seed + job * pages + page) % 256) for page in range(pages)]
+            for job in range(jobs)]
+
+
+def run_level(url, args, workers, kill):
+    from workers.queue import open_queue
+    from workers.stages import image_to_png
+
+    queue = open_queue(url)
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_workers", "--serve-worker", url,
+             "--work-ms", str(args.work_ms)] + (["--cpu"] if args.cpu else []),
+            cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        for _ in range(workers)
+    ]
+    try:
+        deadline = time.monotonic() + 30
+        while len(queue.workers()) < workers and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        start = time.perf_counter()
+        submitted = {}
+        for images in _page_images(args.jobs, args.pages, seed=workers * 7 + kill):
+            payload = {"images": [image_to_png(image) for image in images], "lang": "eng"}
+            submitted[queue.submit("ocr", payload)] = time.perf_counter()
+
+        latencies = {}
+        killed = False
+        while len(latencies) < len(submitted):
+            for job_id, submitted_at in submitted.items():
+                if job_id in latencies:
+                    continue
+                status = queue.status(job_id)
+                if status["status"] in ("done", "failed"):
+                    latencies[job_id] = (time.perf_counter() - submitted_at, status)
+            if kill and not killed and len(latencies) >= len(submitted) / 3:
+                procs[0].kill()
+                killed = True
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(10)
+
+    statuses = [status for _, status in latencies.values()]
+    row = summarize_latencies([latency for latency, _ in latencies.values()], elapsed,
+                              units=args.jobs * args.pages)
+    row["failed"] = sum(1 for status in statuses if status["status"] == "failed")
+    row["retried"] = sum(1 for status in statuses if status["attempts"] > 1)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["sqlite", "redis"], choices=["sqlite", "redis"])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--jobs", type=int, default=32)
+    parser.add_argument("--pages", type=int, default=1, help="page images per OCR job")
+    parser.add_argument("--work-ms", type=float, default=200.0, help="stand-in OCR time per page")
+    parser.add_argument("--cpu", action="store_true", help="burn CPU instead of sleeping")
+    parser.add_argument("--kill", action="store_true", help="also run each level with one worker killed mid-run")
+    parser.add_argument("--save", metavar="NAME", help="write results to benchmarks/results/NAME.json")
+    parser.add_argument("--serve-worker", metavar="URL", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_worker:
+        serve_worker(args.serve_worker, args.work_ms, args.cpu)
+        return
+
+    from benchmarks.stub_redis import serve
+    from workers.resp import RedisClient
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="legal-lens-workers-") as directory:
+        redis = serve(0) if "redis" in args.backends else None
+        for backend in args.backends:
+            for workers in args.workers:
+                for kill in ([False, True] if args.kill and workers > 1 else [False]):
+                    name = f"{backend} x{workers}" + (" killed 1" if kill else "")
+                    if backend == "sqlite":
+                        url = f"sqlite://{Path(directory) / name.replace(' ', '-')}.sqlite"
+                    else:
+                        url = f"redis://127.0.0.1:{redis.server_address[1]}/0"
+                        RedisClient.from_url(url).execute("FLUSHDB")
+                    results[name] = run_level(url, args, workers, kill)
+                    print(f"{name}: {results[name]['throughput_units_s']:.1f} pages/s")
+    print(format_table(results, columns=("units", "throughput_units_s", "p50_ms", "p95_ms", "retried", "failed")))
+    if args.save:
+        print(f"Saved {save_results(results, args.save)}")
+
+
+if __name__ == "__main__":
+    main()
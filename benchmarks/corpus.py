@@ -0,0 +1,108 @@
+"""
+Synthetic PDF corpus for benchmarks.
+
+Generates text-layer, scanned (image-only) and mixed PDFs of any page
+count with recital, clause, schedule and annexure structure, cached under
+benchmarks/.corpus so repeated runs reuse them.
+
+Usage:
+    python -m benchmarks.corpus --kinds text scanned mixed --pages 1 10 100 1000
+"""
+import argparse
+import random
+from pathlib import Path
+
+import fitz
+
+CORPUS_DIR = Path(__file__).parent / ".corpus"
+KINDS = ("text", "scanned", "mixed")
+
+_PARTIES = ["Ramesh Kumar Sharma", "Sunita Devi", "Acme Traders Pvt. Ltd.", "Globex Realty LLP", "Anil Deshmukh"]
+_ROLES = ["LESSOR", "LESSEE", "LICENSOR", "LICENSEE", "GUARANTOR"]
+_SENTENCES = [
+    "The Lessee shall pay the monthly rent on or before the fifth day of each calendar month.",
+    "Either party may terminate this agreement by giving three months notice in writing.",
+    "The security deposit shall be refunded without interest at the expiry of the term.",
+    "The premises shall be used for residential purposes only and for no other purpose.",
+    "Any dispute arising out of this agreement shall be referred to arbitration in Mumbai.",
+    "The Licensee shall not sub-let or part with possession of the premises or any part thereof.",
+    "All municipal taxes and charges in respect of the premises shall be borne by the Lessor.",
+    "The lock-in period shall be twelve months from the date of commencement of this agreement.",
+]
+
+
+def page_lines(page_number, rng):
+    """Lines for one synthetic page; the first page carries the recitals."""
+    lines = []
+    if page_number == 1:
+        lines.append("LEASE DEED")
+        for party, role in zip(rng.sample(_PARTIES, 2), rng.sample(_ROLES, 2)):
+            lines.append(f"{party}, residing at Pune (hereinafter referred to as the \"{role}\") AND")
+    lines.append(f"{page_number}. CLAUSE {page_number}")
+    for sub in range(1, 4):
+        lines.append(f"{page_number}.{sub} {rng.choice(_SENTENCES)} {rng.choice(_SENTENCES)}")
+    if page_number % 50 == 0:
+        lines.append(f"SCHEDULE {page_number // 50}")
+        lines.append("Description of the premises and fixtures.")
+    return lines
+
+
+def _insert_text_page(doc, lines):
+    page = doc.new_page()
+    page.insert_textbox(fitz.Rect(50, 50, 545, 800), "\n".join(lines), fontsize=10)
+
+
+def _insert_scanned_page(doc, lines):
+    """Render a text page to a bitmap and place it as an image-only page."""
+    scratch = fitz.open()
+    _insert_text_page(scratch, lines)
+    pix = scratch[0].get_pixmap(dpi=150)
+    page = doc.new_page()
+    page.insert_image(page.rect, stream=pix.tobytes("png"))
+
+
+def generate_pdf(kind, pages, path=None, seed=0):
+    """
+    Generate (or reuse) a synthetic PDF.
+
+    Args:
+        kind: "text", "scanned" or "mixed" (every third page scanned)
+        pages: Number of pages
+        path: Output path; defaults to benchmarks/.corpus/<kind>-<pages>.pdf
+        seed: Random seed for the content
+
+    Returns:
+        Path of the PDF
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown corpus kind: {kind}")
+    path = Path(path) if path else CORPUS_DIR / f"{kind}-{pages}.pdf"
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_number in range(1, pages + 1):
+        lines = page_lines(page_number, rng)
+        scanned = kind == "scanned" or (kind == "mixed" and page_number % 3 == 0)
+        if scanned:
+            _insert_scanned_page(doc, lines)
+        else:
+            _insert_text_page(doc, lines)
+    doc.save(str(path), garbage=3, deflate=True)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kinds", nargs="+", default=list(KINDS), choices=KINDS)
+    parser.add_argument("--pages", nargs="+", type=int, default=[1, 10, 100, 1000])
+    args = parser.parse_args()
+    for kind in args.kinds:
+        for pages in args.pages:
+            print(generate_pdf(kind, pages))
+
+
+if __name__ == "__main__":
+    main()
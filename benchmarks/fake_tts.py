@@ -0,0 +1,32 @@
+"""Offline stand-in for gTTS with a configurable synthesis delay."""
+import time
+
+# gTTS output is roughly 32 kbps MP3 at ~15 characters of speech per second.
+BYTES_PER_CHAR = 32000 // 8 // 15
+
+
+class FakeTTS:
+    """Drop-in for gtts.gTTS: same constructor arguments, writes deterministic bytes."""
+
+    delay_per_char = 0.00002
+
+    def __init__(self, text, lang="en", slow=False, **kwargs):
+        self.text = text
+        self.lang = lang
+        self.slow = slow
+
+    def save(self, savefile):
+        time.sleep(len(self.text) * self.delay_per_char)
+        frame = b"\xff\xf3\x44\xc4" + bytes(92)  # one silent MPEG frame header plus padding
+        size = max(len(frame), len(self.text) * BYTES_PER_CHAR)
+        with open(savefile, "wb") as f:
+            f.write(frame * (size // len(frame)))
+
+
+def install(delay_per_char=None):
+    """Route tts_agent.tts through FakeTTS for the rest of the process."""
+    from tts_agent import tts
+
+    if delay_per_char is not None:
+        FakeTTS.delay_per_char = delay_per_char
+    tts.gTTS = FakeTTS
@@ -0,0 +1,101 @@
+"""Shared helpers for the benchmark scripts: percentiles, RSS, baselines and reporting."""
+import json
+import math
+import resource
+import sys
+import time
+from pathlib import Path
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    """Peak resident set size of the current process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize_latencies(latencies, elapsed, units=None):
+    """
+    Reduce per-operation latencies (seconds) to a result row.
+
+    Args:
+        latencies: Per-operation wall-clock seconds
+        elapsed: Wall-clock seconds for the whole run
+        units: Optional count of work units (pages, characters) processed
+    """
+    row = {
+        "ops": len(latencies),
+        "throughput_ops_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+    if units is not None:
+        row["units"] = units
+        row["throughput_units_s"] = units / elapsed if elapsed else 0.0
+    return row
+
+
+def timed(fn, *args, **kwargs):
+    """Call fn and return (result, seconds)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def format_table(results, columns=("ops", "throughput_ops_s", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb")):
+    """Render {name: row} as a fixed-width text table."""
+    header = f"{'stage':<24}" + "".join(f"{c:>18}" for c in columns)
+    lines = [header, "-" * len(header)]
+    for name, row in results.items():
+        cells = []
+        for column in columns:
+            value = row.get(column, "")
+            cells.append(f"{value:>18.2f}" if isinstance(value, float) else f"{value!s:>18}")
+        lines.append(f"{name:<24}" + "".join(cells))
+    return "\n".join(lines)
+
+
+def save_results(results, name, baseline=False):
+    """Write results as JSON under benchmarks/baselines or benchmarks/results."""
+    directory = BASELINE_DIR if baseline else RESULTS_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+    return path
+
+
+def load_baseline(name):
+    with open(BASELINE_DIR / f"{name}.json", "r", encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare(results, baseline, metrics=("throughput_ops_s", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb")):
+    """Render the percentage change of each metric against a stored baseline."""
+    lines = [f"{'stage':<24}" + "".join(f"{m:>18}" for m in metrics)]
+    for name, row in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        cells = []
+        for metric in metrics:
+            old, new = base.get(metric), row.get(metric)
+            if isinstance(old, (int, float)) and isinstance(new, (int, float)) and old:
+                cells.append(f"{(new - old) / old:>+17.1%} ")
+            else:
+                cells.append(f"{'n/a':>18}")
+        lines.append(f"{name:<24}" + "".join(cells))
+    return "\n".join(lines)
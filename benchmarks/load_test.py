@@ -0,0 +1,491 @@
+"""
+Load test: N concurrent browser sessions against a real Streamlit server.
+
+Starts `streamlit run interface.py` in a subprocess, pointed at the stub
+chat-completions server with the fake TTS engine installed, and drives it
+over Streamlit's own websocket protocol the way browsers do: every session
+loads the page, uploads a PDF, generates a summary and its audio, then asks
+a few chat questions. Each action is one script rerun (plus the HTTP upload
+for the PDF); its latency is the time from the client's rerun message to
+the server's "script finished" message.
+
+For each concurrency level a fresh server (with an empty cache directory)
+serves all sessions at once. The report lists rerun latency percentiles
+overall and per action, throughput in reruns per second, the server's CPU
+use and peak RSS, and the first level at which the server saturates:
+throughput stops growing, p95 exceeds the latency target, or reruns fail.
+
+Usage:
+    python -m benchmarks.load_test --sessions 1 2 4 8 16 32
+    python -m benchmarks.load_test --sessions 8 --chat-turns 5 --think-time 1 --distinct
+    python -m benchmarks.load_test --sessions 4 16 --api-latency-ms 800 --save load-16
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+from benchmarks.corpus import CORPUS_DIR, generate_pdf
+from benchmarks.harness import format_table, percentile, save_results, summarize_latencies
+from benchmarks.stub_server import run_stub_server
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+APP_SCRIPT = REPO_ROOT / "interface.py"
+
+ACTIONS = ("load", "upload", "summary", "audio", "chat")
+QUESTIONS = [
+    "Who are the parties to this agreement?",
+    "What is the monthly rent and when is it due?",
+    "How can the agreement be terminated?",
+    "Is there a security deposit?",
+    "Which court has jurisdiction over disputes?",
+]
+
+
+class RerunFailed(Exception):
+    pass
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ProcessStats:
+    """CPU seconds and peak RSS of another process, read from /proc (Linux only)."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def cpu_seconds(self):
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                # Fields after the parenthesised command name; utime and stime are 14th and 15th overall
+                fields = f.read().rsplit(")", 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / self.ticks
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def peak_rss_mb(self):
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) / 1024
+        except (OSError, ValueError):
+            pass
+        return None
+
+
+class AppServer:
+    """A `streamlit run` subprocess serving the app on a free local port."""
+
+    def __init__(self, api_base, cache_dir, args):
+        self.port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.log_path = Path(cache_dir) / "server.log"
+        env = dict(
+            os.environ,
+            DEEPSEEK_API_BASE=api_base,
+            DEEPSEEK_API_KEY=os.getenv("DEEPSEEK_API_KEY", "stub-key"),
+            LEGAL_LENS_CACHE_DIR=str(cache_dir),
+            LEGAL_LENS_API_RPM=str(args.rpm),
+            PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_ROOT), os.getenv("PYTHONPATH")])),
+        )
+        command = [sys.executable, "-m", "benchmarks.load_test", "--serve", str(self.port),
+                   "--app", str(getattr(args, "app", None) or APP_SCRIPT)]
+        if args.tts_delay is not None:
+            command += ["--tts-delay", str(args.tts_delay)]
+        self._log = open(self.log_path, "wb")
+        self.process = subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=self._log, stderr=subprocess.STDOUT)
+        self.stats = ProcessStats(self.process.pid)
+
+    def wait_ready(self, timeout=60.0):
+        import requests
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                if requests.get(f"{self.base_url}/_stcore/health", timeout=1).ok:
+                    return
+            except requests.exceptions.RequestException:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        tail = self.log_path.read_text(errors="replace")[-2000:]
+        raise Exception(f"Streamlit server did not start on port {self.port}:\n{tail}")
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self._log.close()
+
+    def __enter__(self):
+        self.wait_ready()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class BrowserSession:
+    """
+    One simulated browser tab speaking Streamlit's websocket protocol.
+
+    Like the frontend, it resends the current value of every widget with
+    each rerun and adds a one-shot trigger for the widget being used.
+    Widgets are found by label in the elements of the last completed run.
+    Triggering a widget inside an st.fragment reruns only that fragment,
+    as the frontend does.
+    """
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session_id = None
+        self.widgets = {}
+        self.errors = []
+        self._values = {}
+        self._run_widgets = {}
+        self._run_errors = []
+        self._fragments = {}  # widget id -> id of the fragment it was drawn in
+        self._finished = None
+        self._file_urls = {}
+        self._ws = None
+        self._reader = None
+
+    async def connect(self):
+        try:
+            from websockets.asyncio.client import connect
+        except ImportError:
+            raise Exception("The load test needs the 'websockets' package (pip install websockets)")
+
+        url = self.base_url.replace("http://", "ws://", 1) + "/_stcore/stream"
+        self._ws = await connect(url, subprotocols=["streamlit"], max_size=None, open_timeout=self.timeout)
+        self._reader = asyncio.create_task(self._read())
+
+    async def close(self):
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+    async def _read(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        async for data in self._ws:
+            msg = ForwardMsg()
+            msg.ParseFromString(data)
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                if msg.new_session.HasField("initialize"):
+                    self.session_id = msg.new_session.initialize.session_id
+                # A fragment run redraws only its own elements; the rest of the page stays
+                self._run_widgets = dict(self.widgets) if msg.new_session.fragment_ids_this_run else {}
+                self._run_errors = []
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                self._collect(msg.delta.new_element, msg.delta.fragment_id)
+            elif kind == "file_urls_response":
+                waiter = self._file_urls.pop(msg.file_urls_response.response_id, None)
+                if waiter is not None and not waiter.done():
+                    waiter.set_result(msg.file_urls_response)
+            elif kind == "script_finished":
+                if msg.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue  # st.rerun(): the run that follows is part of the same action
+                self.widgets = self._run_widgets
+                if self._finished is not None and not self._finished.done():
+                    self._finished.set_result((msg.script_finished, self._run_errors))
+
+    def _collect(self, element, fragment_id=""):
+        from streamlit.proto.Alert_pb2 import Alert
+
+        kind = element.WhichOneof("type")
+        if kind is None:
+            return
+        proto = getattr(element, kind)
+        if kind == "exception":
+            self._run_errors.append(f"{proto.type}: {proto.message}")
+        elif kind == "alert" and proto.format == Alert.ERROR:
+            self._run_errors.append(proto.body)
+        widget_id = getattr(proto, "id", "")
+        if widget_id:
+            label = proto.placeholder if kind == "chat_input" else getattr(proto, "label", "")
+            self._run_widgets[(kind, label)] = widget_id
+            self._fragments[widget_id] = fragment_id
+
+    def widget_id(self, kind, label):
+        widget_id = self.widgets.get((kind, label))
+        if widget_id is None:
+            available = sorted(label for widget_kind, label in self.widgets if widget_kind == kind)
+            raise RerunFailed(f"No {kind} labelled {label!r} (have {available})")
+        return widget_id
+
+    async def rerun(self, trigger=None):
+        """Send a rerun with the current widget values plus an optional trigger; returns seconds."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        msg.rerun_script.SetInParent()
+        states = msg.rerun_script.widget_states.widgets
+        for state in self._values.values():
+            if trigger is None or state.id != trigger.id:
+                states.append(state)
+        if trigger is not None:
+            states.append(trigger)
+            if self._fragments.get(trigger.id):
+                msg.rerun_script.fragment_id = self._fragments[trigger.id]
+
+        self._finished = asyncio.get_running_loop().create_future()
+        start = time.perf_counter()
+        await self._ws.send(msg.SerializeToString())
+        try:
+            status, errors = await asyncio.wait_for(self._finished, self.timeout)
+        except asyncio.TimeoutError:
+            raise RerunFailed(f"Rerun did not finish within {self.timeout:g}s")
+        elapsed = time.perf_counter() - start
+        if status == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+            raise RerunFailed("Script failed to compile")
+        self.errors.extend(errors)
+        return elapsed
+
+    async def click(self, label):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        return await self.rerun(WidgetState(id=self.widget_id("button", label), trigger_value=True))
+
+    async def chat(self, placeholder, text):
+        from streamlit.proto.Common_pb2 import ChatInputValue
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        state = WidgetState(id=self.widget_id("chat_input", placeholder), chat_input_value=ChatInputValue(data=text))
+        return await self.rerun(state)
+
+    async def upload(self, label, name, data):
+        """Upload a file the way the frontend does (URL request, HTTP PUT, rerun); returns seconds."""
+        import requests
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.Common_pb2 import UploadedFileInfo
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget_id = self.widget_id("file_uploader", label)
+        start = time.perf_counter()
+        request_id = uuid.uuid4().hex
+        waiter = self._file_urls[request_id] = asyncio.get_running_loop().create_future()
+        msg = BackMsg()
+        msg.file_urls_request.request_id = request_id
+        msg.file_urls_request.file_names.append(name)
+        msg.file_urls_request.session_id = self.session_id or ""
+        await self._ws.send(msg.SerializeToString())
+        response = await asyncio.wait_for(waiter, self.timeout)
+        if response.error_msg or not response.file_urls:
+            raise RerunFailed(f"Upload URL request failed: {response.error_msg}")
+        urls = response.file_urls[0]
+
+        reply = await asyncio.to_thread(
+            requests.put, self.base_url + urls.upload_url,
+            files={"file": (name, data, "application/pdf")}, timeout=self.timeout
+        )
+        if not reply.ok:
+            raise RerunFailed(f"Upload failed with HTTP {reply.status_code}")
+
+        state = WidgetState(id=widget_id)
+        state.file_uploader_state_value.uploaded_file_info.append(
+            UploadedFileInfo(name=name, size=len(data), file_id=urls.file_id, file_urls=urls)
+        )
+        self._values[widget_id] = state
+        upload_seconds = time.perf_counter() - start
+        return upload_seconds + await self.rerun()
+
+
+async def _simulate(index, base_url, document, args, latencies, failures):
+    from ui_frontend.languages import get_text
+
+    name, data = document
+    session = BrowserSession(base_url, args.timeout)
+
+    async def act(action, operation):
+        latencies[action].append(await operation)
+        if args.think_time:
+            await asyncio.sleep(args.think_time)
+
+    try:
+        await session.connect()
+        await act("load", session.rerun())
+        await act("upload", session.upload(get_text("upload_title", "English"), name, data))
+        await act("summary", session.click(get_text("generate_summary", "English")))
+        await act("audio", session.click(get_text("generate_audio", "English")))
+        placeholder = get_text("chat_placeholder", "English")
+        for turn in range(args.chat_turns):
+            await act("chat", session.chat(placeholder, QUESTIONS[(index + turn) % len(QUESTIONS)]))
+    except Exception as e:
+        failures.append(f"session {index}: {type(e).__name__}: {e}")
+    finally:
+        await session.close()
+    failures.extend(f"session {index}: {error}" for error in session.errors)
+
+
+async def _run_sessions(count, base_url, documents, args):
+    latencies = defaultdict(list)
+    failures = []
+    await asyncio.gather(*(
+        _simulate(i, base_url, documents[i % len(documents)], args, latencies, failures)
+        for i in range(count)
+    ))
+    return latencies, failures
+
+
+def _documents(args, count):
+    if not args.distinct:
+        return [("contract.pdf", generate_pdf("text", args.pages).read_bytes())]
+    documents = []
+    for i in range(count):
+        path = CORPUS_DIR / f"text-{args.pages}-seed{i}.pdf"
+        documents.append((f"contract-{i}.pdf", generate_pdf("text", args.pages, path=path, seed=i).read_bytes()))
+    return documents
+
+
+def run_level(count, api_base, args):
+    """Serve `count` concurrent sessions from a fresh server; returns (summary row, per-action rows, failures)."""
+    documents = _documents(args, count)
+    with tempfile.TemporaryDirectory(prefix="legal-lens-load-") as cache_dir:
+        with AppServer(api_base, cache_dir, args) as server:
+            cpu_start = server.stats.cpu_seconds()
+            start = time.perf_counter()
+            latencies, failures = asyncio.run(_run_sessions(count, server.base_url, documents, args))
+            elapsed = time.perf_counter() - start
+            cpu_end = server.stats.cpu_seconds()
+            peak_rss = server.stats.peak_rss_mb()
+
+    every = [seconds for action in ACTIONS for seconds in latencies[action]]
+    row = {"sessions": count, **summarize_latencies(every, elapsed)}
+    row["cpu_percent"] = (cpu_end - cpu_start) / elapsed * 100 if cpu_start is not None and elapsed else None
+    row["peak_rss_mb"] = peak_rss
+    row["failures"] = len(failures)
+    actions = {
+        action: {
+            "ops": len(latencies[action]),
+            "p50_ms": percentile(latencies[action], 0.50) * 1000,
+            "p95_ms": percentile(latencies[action], 0.95) * 1000,
+            "p99_ms": percentile(latencies[action], 0.99) * 1000,
+        }
+        for action in ACTIONS if latencies[action]
+    }
+    return row, actions, failures
+
+
+def find_saturation(rows, min_gain, slo_ms):
+    """
+    First concurrency level at which the server is saturated.
+
+    Returns:
+        (level, reason), or (None, None) when every level still scaled
+    """
+    previous = None
+    for row in rows:
+        if row["failures"]:
+            return row["sessions"], f"{row['failures']} failed reruns"
+        if slo_ms and row["p95_ms"] > slo_ms:
+            return row["sessions"], f"p95 {row['p95_ms']:.0f} ms exceeds {slo_ms:g} ms"
+        if previous and row["throughput_ops_s"] < previous["throughput_ops_s"] * min_gain:
+            return row["sessions"], (
+                f"throughput {row['throughput_ops_s']:.1f} reruns/s vs "
+                f"{previous['throughput_ops_s']:.1f} at {previous['sessions']} sessions"
+            )
+        previous = row
+    return None, None
+
+
+def serve(port, tts_delay, app=APP_SCRIPT):
+    """Entry point of the server subprocess: `streamlit run` with the fake TTS engine installed."""
+    from benchmarks import fake_tts
+    from streamlit.web import cli
+
+    fake_tts.install(tts_delay)
+    sys.argv = [
+        "streamlit", "run", str(app),
+        "--server.port", str(port),
+        "--server.address", "127.0.0.1",
+        "--server.headless", "true",
+        "--server.fileWatcherType", "none",
+        "--server.enableXsrfProtection", "false",
+        "--server.enableCORS", "false",
+        "--browser.gatherUsageStats", "false",
+    ]
+    cli.main()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32],
+                        help="concurrency levels to run, in order")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--distinct", action="store_true", help="give every session its own document")
+    parser.add_argument("--chat-turns", type=int, default=3)
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds a user pauses between actions")
+    parser.add_argument("--api-latency-ms", type=float, default=100.0)
+    parser.add_argument("--tts-delay", type=float, default=None, help="fake TTS seconds per character")
+    parser.add_argument("--rpm", type=int, default=0, help="LEGAL_LENS_API_RPM for the server (0 = unlimited)")
+    parser.add_argument("--timeout", type=float, default=180.0, help="seconds before a rerun counts as failed")
+    parser.add_argument("--slo-ms", type=float, default=2000.0, help="p95 rerun latency target")
+    parser.add_argument("--min-gain", type=float, default=1.1,
+                        help="throughput growth below this factor between levels counts as saturation")
+    parser.add_argument("--save", metavar="NAME", help="write results to benchmarks/results/NAME.json")
+    parser.add_argument("--app", default=str(APP_SCRIPT), help="Streamlit script to serve")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.tts_delay, args.app)
+        return
+
+    rows, results = [], {}
+    with run_stub_server(latency_ms=args.api_latency_ms) as api_base:
+        for count in args.sessions:
+            print(f"Running {count} concurrent sessions...", flush=True)
+            row, actions, failures = run_level(count, api_base, args)
+            rows.append(row)
+            results[f"{count} sessions"] = row
+            for action, action_row in actions.items():
+                results[f"{count}/{action}"] = action_row
+            for failure in failures[:5]:
+                print(f"  {failure}")
+
+    print(format_table(
+        {f"{row['sessions']} sessions": row for row in rows},
+        columns=("ops", "throughput_ops_s", "p50_ms", "p95_ms", "p99_ms", "cpu_percent", "peak_rss_mb", "failures"),
+    ))
+    print()
+    print(format_table(
+        {name: row for name, row in results.items() if "/" in name},
+        columns=("ops", "p50_ms", "p95_ms", "p99_ms"),
+    ))
+    level, reason = find_saturation(rows, args.min_gain, args.slo_ms)
+    print()
+    if level is None:
+        print(f"No saturation up to {rows[-1]['sessions']} sessions")
+    else:
+        print(f"Saturated at {level} sessions: {reason}")
+    results["saturation"] = {"sessions": level, "reason": reason}
+    if args.save:
+        print(f"Saved {save_results(results, args.save)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Offline end-to-end pipeline benchmark.
+
+Runs each stage (extraction, summarization, chat, TTS) in its own
+process against the stub chat-completions server and the fake TTS
+engine, and reports throughput, p50/p95/p99 latency and peak RSS.
+
+Usage:
+    python -m benchmarks.pipeline --pages 1 10 100 --kinds text mixed
+    python -m benchmarks.pipeline --save-baseline main
+    python -m benchmarks.pipeline --compare main
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.harness import (
+    compare, format_table, load_baseline, peak_rss_mb, save_results, summarize_latencies, timed
+)
+from benchmarks.stub_server import run_stub_server
+
+STAGES = ("extract", "summarize", "nlp_summarize", "chat", "tts")
+
+
+class _Upload(io.BytesIO):
+    """Minimal stand-in for Streamlit's UploadedFile."""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+
+def _sample_texts(args):
+    """Extracted text of the text-layer corpus, used as input for the API-bound stages."""
+    from benchmarks.corpus import generate_pdf
+    from parser_agent.parser import extract_text_from_pdf
+
+    texts = []
+    for pages in args.pages:
+        path = generate_pdf("text", pages)
+        texts.append(extract_text_from_pdf(_Upload(path.read_bytes(), path.name)))
+    return texts
+
+
+def bench_extract(args):
+    from benchmarks.corpus import generate_pdf
+    from parser_agent.parser import extract_document
+
+    latencies, pages_done = [], 0
+    start = time.perf_counter()
+    for kind in args.kinds:
+        for pages in args.pages:
+            path = generate_pdf(kind, pages)
+            data = path.read_bytes()
+            for _ in range(args.repeat):
+                _, seconds = timed(extract_document, _Upload(data, path.name))
+                latencies.append(seconds)
+                pages_done += pages
+    return latencies, time.perf_counter() - start, pages_done
+
+
+def bench_summarize(args):
+    from summarizer_agent.summarizer import summarize_text
+
+    texts = _sample_texts(args)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for text in texts:
+            latencies.append(timed(summarize_text, text, "English")[1])
+    return latencies, time.perf_counter() - start, sum(len(t) for t in texts) * args.repeat
+
+
+def bench_nlp_summarize(args):
+    from nlp.summarizer import summarize_text
+
+    texts = _sample_texts(args)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for text in texts:
+            latencies.append(timed(summarize_text, text, "English")[1])
+    return latencies, time.perf_counter() - start, sum(len(t) for t in texts) * args.repeat
+
+
+def bench_chat(args):
+    from chatbot_agent.chatbot import get_chatbot_response
+
+    texts = _sample_texts(args)
+    questions = ["What is the notice period?", "Who are the parties?", "When does this expire?"]
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for text in texts:
+            for question in questions:
+                latencies.append(timed(get_chatbot_response, question, text, "English")[1])
+    return latencies, time.perf_counter() - start, None
+
+
+def bench_tts(args):
+    from benchmarks import fake_tts
+    from tts_agent.tts import text_to_speech
+
+    fake_tts.install()
+    texts = [t[:3000] for t in _sample_texts(args)]
+    latencies = []
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        for i in range(args.repeat):
+            for j, text in enumerate(texts):
+                path = os.path.join(tmp, f"summary-{i}-{j}.mp3")
+                latencies.append(timed(text_to_speech, text, "English", path)[1])
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed, sum(len(t) for t in texts) * args.repeat
+
+
+def _run_stage(stage, args, api_base, queue):
+    """Child-process entry point: one stage per process so peak RSS is per stage."""
+    os.environ["DEEPSEEK_API_BASE"] = api_base
+    os.environ.setdefault("DEEPSEEK_API_KEY", "stub-key")
+    try:
+        latencies, elapsed, units = globals()[f"bench_{stage}"](args)
+        row = summarize_latencies(latencies, elapsed, units)
+        row["peak_rss_mb"] = peak_rss_mb()
+        queue.put((stage, row, None))
+    except Exception as e:
+        queue.put((stage, None, f"{type(e).__name__}: {e}"))
+
+
+def run(args):
+    results = {}
+    ctx = multiprocessing.get_context("spawn")
+    with run_stub_server(latency_ms=args.latency_ms, error_rate=args.error_rate, seed=0) as api_base:
+        for stage in args.stages:
+            queue = ctx.Queue()
+            process = ctx.Process(target=_run_stage, args=(stage, args, api_base, queue))
+            process.start()
+            name, row, error = queue.get()
+            process.join()
+            if error:
+                print(f"{name}: failed ({error})")
+            else:
+                results[name] = row
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    parser.add_argument("--kinds", nargs="+", default=["text", "scanned", "mixed"])
+    parser.add_argument("--pages", nargs="+", type=int, default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="stub server base latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="stub server injected error rate")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(format_table(results))
+    print(f"\nResults written to {save_results(results, time.strftime('pipeline-%Y%m%d-%H%M%S'))}")
+    if args.save_baseline:
+        print(f"Baseline saved to {save_results(results, args.save_baseline, baseline=True)}")
+    if args.compare:
+        print("\nChange against baseline:")
+        print(compare(results, load_baseline(args.compare)))
+
+
+if __name__ == "__main__":
+    main()
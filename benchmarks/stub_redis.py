@@ -0,0 +1,286 @@
+"""
+In-memory stand-in for a Redis server, for benchmarks without Redis.
+
+Speaks RESP2 and implements the commands the Redis job queue and
+workers/resp.py use, with one global lock, so each command is atomic as
+it is on a real server. Keys with an expiry are dropped when next read.
+
+Usage:
+    python -m benchmarks.stub_redis --port 6390
+    LEGAL_LENS_QUEUE=redis://127.0.0.1:6390/0 python -m workers.worker --stages ocr
+"""
+import argparse
+import fnmatch
+import socketserver
+import threading
+import time
+
+from workers.resp import read_reply
+
+_lock = threading.Lock()
+_data = {}
+_expiry = {}
+
+
+class _Error(Exception):
+    pass
+
+
+def _live(key):
+    deadline = _expiry.get(key)
+    if deadline is not None and deadline <= time.time():
+        _data.pop(key, None)
+        _expiry.pop(key, None)
+    return _data.get(key)
+
+
+def _typed(key, kind):
+    value = _live(key)
+    if value is None:
+        return None
+    if not isinstance(value, kind):
+        raise _Error("WRONGTYPE Operation against a key holding the wrong kind of value")
+    return value
+
+
+def _create(key, kind):
+    value = _typed(key, kind)
+    if value is None:
+        value = _data[key] = kind()
+    return value
+
+
+def _drop_if_empty(key):
+    if key in _data and not _data[key]:
+        del _data[key]
+        _expiry.pop(key, None)
+
+
+def _score(value):
+    return {"-inf": float("-inf"), "+inf": float("inf"), "inf": float("inf")}.get(value) or float(value)
+
+
+def _set(key, value, *options):
+    options = [option.upper() for option in options]
+    exists = _live(key) is not None
+    if ("NX" in options and exists) or ("XX" in options and not exists):
+        return None
+    _data[key] = value
+    _expiry.pop(key, None)
+    if "EX" in options:
+        _expiry[key] = time.time() + float(options[options.index("EX") + 1])
+    return "OK"
+
+
+def _hset(key, *pairs):
+    table = _create(key, dict)
+    added = sum(1 for field in pairs[::2] if field not in table)
+    table.update(zip(pairs[::2], pairs[1::2]))
+    return added
+
+
+def _hdel(key, *fields):
+    table = _typed(key, dict) or {}
+    removed = sum(1 for field in fields if table.pop(field, None) is not None)
+    _drop_if_empty(key)
+    return removed
+
+
+def _hincrby(key, field, amount):
+    table = _create(key, dict)
+    table[field] = str(int(table.get(field, 0)) + int(amount))
+    return int(table[field])
+
+
+def _push(key, values, left):
+    items = _create(key, list)
+    for value in values:
+        if left:
+            items.insert(0, value)
+        else:
+            items.append(value)
+    return len(items)
+
+
+def _rpoplpush(source, destination):
+    items = _typed(source, list)
+    if not items:
+        return None
+    value = items.pop()
+    _drop_if_empty(source)
+    _create(destination, list).insert(0, value)
+    return value
+
+
+def _lrem(key, count, value):
+    items = _typed(key, list) or []
+    count = int(count)
+    removed = 0
+    indexes = range(len(items)) if count >= 0 else range(len(items) - 1, -1, -1)
+    for i in [i for i in indexes if items[i] == value][:abs(count) or None]:
+        items[i] = None
+        removed += 1
+    items[:] = [item for item in items if item is not None]
+    _drop_if_empty(key)
+    return removed
+
+
+def _lrange(key, start, stop):
+    items = _typed(key, list) or []
+    start, stop = int(start), int(stop)
+    stop = len(items) if stop == -1 else stop + 1
+    return items[start:stop]
+
+
+def _zadd(key, *pairs):
+    scores = _create(key, dict)
+    added = 0
+    for score, member in zip(pairs[::2], pairs[1::2]):
+        added += member not in scores
+        scores[member] = float(score)
+    return added
+
+
+def _zrem(key, *members):
+    scores = _typed(key, dict) or {}
+    removed = sum(1 for member in members if scores.pop(member, None) is not None)
+    _drop_if_empty(key)
+    return removed
+
+
+def _zscore(key, member):
+    score = (_typed(key, dict) or {}).get(member)
+    return None if score is None else repr(score)
+
+
+def _zrangebyscore(key, low, high):
+    low, high = _score(low), _score(high)
+    scores = _typed(key, dict) or {}
+    return [member for member, score in sorted(scores.items(), key=lambda item: item[1]) if low <= score <= high]
+
+
+def _hgetall(key):
+    return [part for field, value in (_typed(key, dict) or {}).items() for part in (field, value)]
+
+
+def _expire(key, seconds):
+    if _live(key) is None:
+        return 0
+    _expiry[key] = time.time() + float(seconds)
+    return 1
+
+
+def _delete(*keys):
+    removed = 0
+    for key in keys:
+        if _live(key) is not None:
+            del _data[key]
+            _expiry.pop(key, None)
+            removed += 1
+    return removed
+
+
+def _flush():
+    _data.clear()
+    _expiry.clear()
+    return "OK"
+
+
+COMMANDS = {
+    "PING": lambda: "PONG",
+    "SELECT": lambda db: "OK",
+    "AUTH": lambda *credentials: "OK",
+    "GET": lambda key: _typed(key, str),
+    "SET": _set,
+    "DEL": _delete,
+    "EXISTS": lambda *keys: sum(1 for key in keys if _live(key) is not None),
+    "EXPIRE": _expire,
+    "KEYS": lambda pattern: [key for key in list(_data) if _live(key) is not None and fnmatch.fnmatchcase(key, pattern)],
+    "HSET": _hset,
+    "HGET": lambda key, field: (_typed(key, dict) or {}).get(field),
+    "HMGET": lambda key, *fields: [(_typed(key, dict) or {}).get(field) for field in fields],
+    "HGETALL": _hgetall,
+    "HDEL": _hdel,
+    "HINCRBY": _hincrby,
+    "LPUSH": lambda key, *values: _push(key, values, left=True),
+    "RPUSH": lambda key, *values: _push(key, values, left=False),
+    "RPOPLPUSH": _rpoplpush,
+    "LREM": _lrem,
+    "LRANGE": _lrange,
+    "LLEN": lambda key: len(_typed(key, list) or []),
+    "ZADD": _zadd,
+    "ZREM": _zrem,
+    "ZSCORE": _zscore,
+    "ZRANGEBYSCORE": _zrangebyscore,
+    "ZCARD": lambda key: len(_typed(key, dict) or {}),
+    "FLUSHDB": _flush,
+}
+
+
+def _reply(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, bool) or isinstance(value, int):
+        return f":{int(value)}\r\n".encode()
+    if isinstance(value, list):
+        return f"*{len(value)}\r\n".encode() + b"".join(_reply(item) for item in value)
+    if value in ("OK", "PONG"):
+        return f"+{value}\r\n".encode()
+    data = str(value).encode("utf-8")
+    return f"${len(data)}\r\n".encode() + data + b"\r\n"
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            if not command:
+                continue
+            name, args = command[0].upper(), command[1:]
+            if name == "QUIT":
+                self.wfile.write(b"+OK\r\n")
+                return
+            try:
+                handler = COMMANDS.get(name)
+                if handler is None:
+                    raise _Error(f"ERR unknown command '{name}'")
+                with _lock:
+                    reply = _reply(handler(*args))
+            except _Error as e:
+                reply = f"-{e}\r\n".encode()
+            except (TypeError, ValueError, IndexError) as e:
+                reply = f"-ERR {name}: {e}\r\n".encode()
+            self.wfile.write(reply)
+
+
+class StubRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(port: int, host: str = "127.0.0.1") -> StubRedisServer:
+    """Start the stand-in on a background thread and return the server (port 0 picks a free one)."""
+    server = StubRedisServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="stub-redis", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    server = StubRedisServer((args.host, args.port), _Handler)
+    print(f"Stub Redis listening on redis://{args.host}:{args.port}/0")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
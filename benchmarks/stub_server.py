@@ -0,0 +1,203 @@
+"""
+Local stand-in for the DeepSeek chat-completions API.
+
+Supports configurable latency (with an optional slow tail), streaming
+responses and error injection, so pipeline stages can be benchmarked
+offline without spending API credits.
+
+Usage:
+    python -m benchmarks.stub_server --port 8765 --latency-ms 300 --error-rate 0.05
+    DEEPSEEK_API_BASE=http://127.0.0.1:8765/v1 streamlit run interface.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_CONFIG = {
+    "latency_ms": 50.0,        # base latency per request
+    "jitter_ms": 10.0,         # uniform jitter added to the base latency
+    "tail_probability": 0.0,   # fraction of requests that take tail_latency_ms instead
+    "tail_latency_ms": 2000.0,
+    "error_rate": 0.0,         # fraction of requests answered with error_status
+    "error_status": 503,
+    "retry_after": 1,          # Retry-After seconds sent with 429 responses
+    "stream_chunk_delay_ms": 5.0,
+    "seed": None,
+}
+
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _fake_content(payload):
+    """Deterministic reply shaped like what each agent expects."""
+    messages = payload.get("messages") or [{"content": ""}]
+    prompt = str(messages[-1].get("content", ""))
+    if (payload.get("response_format") or {}).get("type") == "json_object":
+        return json.dumps({"parties": [{"name": "Stub Party", "role": "Lessor"}]})
+    words = [w for w in prompt.split() if w.isalpha()][:60]
+    bullets = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)] or ["No content"]
+    return "\n".join(f"• {line}" for line in bullets)
+
+
+class StubState:
+    """Mutable configuration and counters shared by all request handlers."""
+
+    def __init__(self, **config):
+        self.config = dict(DEFAULT_CONFIG, **config)
+        self.random = random.Random(self.config["seed"])
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def latency(self):
+        with self.lock:
+            if self.random.random() < self.config["tail_probability"]:
+                return self.config["tail_latency_ms"] / 1000
+            return (self.config["latency_ms"] + self.random.uniform(0, self.config["jitter_ms"])) / 1000
+
+    def should_fail(self):
+        with self.lock:
+            self.requests += 1
+            failed = self.random.random() < self.config["error_rate"]
+            if failed:
+                self.errors += 1
+            return failed
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: StubState = None
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/_stats":
+            self._send_json(200, {"requests": self.state.requests, "errors": self.state.errors, "config": self.state.config})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        payload = self._read_json()
+        if self.path == "/_config":
+            with self.state.lock:
+                self.state.config.update(payload)
+            self._send_json(200, self.state.config)
+            return
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": "not found"})
+            return
+
+        time.sleep(self.state.latency())
+        if self.state.should_fail():
+            status = self.state.config["error_status"]
+            headers = {"Retry-After": self.state.config["retry_after"]} if status == 429 else None
+            self._send_json(status, {"error": {"message": "Injected failure", "code": status}}, headers)
+            return
+
+        content = _fake_content(payload)
+        prompt_tokens = sum(_estimate_tokens(str(m.get("content", ""))) for m in payload.get("messages", []))
+        completion_tokens = _estimate_tokens(content)
+        if payload.get("stream"):
+            self._stream(payload, content)
+            return
+        self._send_json(200, {
+            "id": "stub-completion",
+            "object": "chat.completion",
+            "model": payload.get("model", "deepseek-chat"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+
+    def _stream(self, payload, content):
+        """Send the reply as server-sent events, one word per chunk."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_chunk(data):
+            encoded = data.encode("utf-8")
+            self.wfile.write(f"{len(encoded):x}\r\n".encode("ascii") + encoded + b"\r\n")
+            self.wfile.flush()
+
+        delay = self.state.config["stream_chunk_delay_ms"] / 1000
+        for word in content.split(" "):
+            chunk = {
+                "object": "chat.completion.chunk",
+                "model": payload.get("model", "deepseek-chat"),
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+            }
+            write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            time.sleep(delay)
+        write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=0, **config):
+    """Create (but don't start) a stub server; port 0 picks a free port."""
+    handler = type("BoundStubHandler", (StubHandler,), {"state": StubState(**config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+@contextmanager
+def run_stub_server(**config):
+    """Run a stub server on a background thread and yield its API base URL."""
+    server = make_server(**config)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address
+        yield f"http://{host}:{port}/v1"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for key, value in DEFAULT_CONFIG.items():
+        if key != "seed":
+            parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = {key: getattr(args, key) for key in DEFAULT_CONFIG}
+    server = make_server(args.host, args.port, **config)
+    print(f"Stub chat-completions server on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
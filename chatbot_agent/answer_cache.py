@@ -0,0 +1,278 @@
+"""
+Cached chatbot answers, scoped to one document and one answer language.
+
+People reading the same document ask the same few questions in many
+wordings: "What is the notice period?", "notice period?", "what's the
+period of notice". Questions are reduced to their content terms and
+compared to the questions already answered for that document by TF-IDF
+cosine similarity, so a rewording is answered from the cache in about a
+millisecond instead of an API round-trip.
+
+Entries are keyed by a hash of the document text, so an edited or
+re-extracted document never sees answers given for the old text; those
+expire after the TTL or can be dropped with `invalidate`.
+"""
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from common.config import get_env
+from common.tracing import span
+from nlp.normalizer import normalize_text
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(get_env("LEGAL_LENS_CACHE_DIR", ".legal_lens_cache"))
+
+# Cosine similarity of TF-IDF term vectors at or above which a cached answer is reused
+DEFAULT_THRESHOLD = float(get_env("LEGAL_LENS_ANSWER_CACHE_THRESHOLD", "0.85"))
+DEFAULT_TTL = float(get_env("LEGAL_LENS_ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+DEFAULT_MAX_ENTRIES = int(get_env("LEGAL_LENS_ANSWER_CACHE_MAX_ENTRIES", "20000"))
+
+_WORD_RE = re.compile(r"(?:[^\W_]|[\u0900-\u0DFF])+")  # words, keeping Indic vowel signs attached
+_CONTRACTIONS = {"what's": "what is", "who's": "who is", "when's": "when is", "can't": "can not",
+                 "won't": "will not", "n't": " not", "'s": ""}
+_STOPWORDS = frozenset(
+    "a an the this that these those is are be been being am do does of in on at to for "
+    "from by with about as into under i me my we our you your it its there here what which whom how "
+    "please tell explain say says said give show any some document agreement contract deed".split()
+)
+# Terms whose presence flips or pins down a question's meaning; a match may not differ in any of them.
+# Modals and past tense are kept for that reason: "Must the tenant pay?" is not "May the tenant pay?",
+# and "Was the tenant liable?" is not "Is the tenant liable?".
+_NEGATIONS = frozenset("not no never without none nor except unless".split())
+_MODALS = frozenset("can could would should will shall may might must".split())
+_TENSES = frozenset("was were did".split())
+_PINNED = _NEGATIONS | _MODALS | _TENSES
+# Bumped when question_terms changes, so entries keyed by the old terms are dropped
+TERMS_VERSION = 2
+
+
+def _stem(word: str) -> str:
+    """Fold plurals so "parties" and "party" are one term."""
+    if not word.isascii() or len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def question_terms(question: str) -> List[str]:
+    """
+    Content terms of a question, in order.
+
+    The question is normalized like extracted text, lower-cased, stripped
+    of punctuation and of words that don't change what is asked ("what is
+    the", "please tell me"), and plurals are folded. Negations, modal verbs,
+    past tense auxiliaries and numbers are kept.
+    """
+    text = normalize_text(question).lower().replace("\u2019", "'")
+    for contraction, expansion in _CONTRACTIONS.items():
+        if contraction in text:
+            text = text.replace(contraction, expansion)
+    return [_stem(word) for word in _WORD_RE.findall(text) if word not in _STOPWORDS]
+
+
+def _pinned(terms) -> set:
+    return {term for term in terms if term in _PINNED or any(ch.isdigit() for ch in term)}
+
+
+def _cosine(a: Counter, b: Counter, idf: Dict[str, float]) -> float:
+    dot = sum(count * b[term] * idf[term] ** 2 for term, count in a.items() if term in b)
+    if not dot:
+        return 0.0
+    norm_a = math.sqrt(sum((count * idf[term]) ** 2 for term, count in a.items()))
+    norm_b = math.sqrt(sum((count * idf[term]) ** 2 for term, count in b.items()))
+    return dot / (norm_a * norm_b)
+
+
+class AnswerCache:
+    """
+    Persistent chatbot answers keyed by (document hash, language, question).
+
+    A lookup compares the question with every live entry for the same
+    document and language, weighting terms by inverse document frequency
+    over those questions so terms every question shares ("notice" in a
+    notice) count for less than the ones that tell them apart ("tenant",
+    "landlord"). The best match is reused only if its similarity reaches
+    `threshold` and it agrees with the question on negations, modal verbs,
+    tense and numbers.
+    Entries older than `ttl` seconds are ignored and pruned; beyond
+    `max_entries` the least recently used are evicted.
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: float = DEFAULT_THRESHOLD,
+                 ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = str(path or CACHE_DIR / "answer_cache.sqlite")
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "exact_hits": 0, "inserts": 0, "evictions": 0}
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self):
+        with self._connection() as connection:
+            (version,) = connection.execute("PRAGMA user_version").fetchone()
+            if version < TERMS_VERSION:
+                # Entries keyed by older question terms could match questions they don't answer
+                logger.info("Dropping answer cache entries keyed by older question terms")
+                connection.execute("DROP TABLE IF EXISTS answers")
+                connection.execute(f"PRAGMA user_version = {TERMS_VERSION}")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "id INTEGER PRIMARY KEY, document TEXT NOT NULL, language TEXT NOT NULL, "
+                "question TEXT NOT NULL, terms TEXT NOT NULL, answer TEXT NOT NULL, "
+                "created REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS answers_scope ON answers (document, language)")
+            connection.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def get(self, question: str, document: str, language: str) -> Optional[Dict]:
+        """
+        Cached answer to the question or a rewording of it, or None on a miss.
+
+        Args:
+            question: The user's question as typed
+            document: Hash of the document text the question is about ("" for none)
+            language: The answer language
+
+        Returns:
+            {"answer", "question" (the cached wording), "similarity"} or None
+        """
+        with span("cache.answer", language=language) as s:
+            terms = question_terms(question)
+            if not terms:  # "what is this?" says too little to match on
+                s.set(cache_hit=False)
+                return None
+            key = " ".join(terms)
+            connection = self._connection()
+            rows = connection.execute(
+                "SELECT id, terms, question, answer FROM answers "
+                "WHERE document = ? AND language = ? AND created >= ?",
+                (document, language, time.time() - self.ttl)
+            ).fetchall()
+            self._count("lookups")
+
+            best = None
+            exact = next((row for row in rows if row[1] == key), None)
+            if exact:
+                best = (1.0, exact)
+            elif rows:
+                query = Counter(terms)
+                candidates = [(row, Counter(row[1].split())) for row in rows]
+                df = Counter(term for _, counts in candidates for term in counts)
+                df.update(query.keys())
+                n = len(candidates) + 1
+                idf = {term: math.log((1 + n) / (1 + count)) + 1 for term, count in df.items()}
+                pinned = _pinned(query)
+                for row, counts in candidates:
+                    if _pinned(counts) != pinned:
+                        continue
+                    score = _cosine(query, counts, idf)
+                    if score >= self.threshold and (best is None or score > best[0]):
+                        best = (score, row)
+
+            s.set(cache_hit=best is not None, candidates=len(rows))
+            if best is None:
+                return None
+
+            similarity, (row_id, _, cached_question, answer) = best
+            self._count("hits")
+            if exact:
+                self._count("exact_hits")
+            with connection:
+                connection.execute(
+                    "UPDATE answers SET hits = hits + 1, last_used = ? WHERE id = ?", (time.time(), row_id)
+                )
+            return {"answer": answer, "question": cached_question, "similarity": similarity}
+
+    def put(self, question: str, document: str, language: str, answer: str):
+        """Store an answer, pruning expired entries and evicting least recently used ones when full."""
+        terms = " ".join(question_terms(question))
+        if not terms:
+            return
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "DELETE FROM answers WHERE document = ? AND language = ? AND (terms = ? OR created < ?)",
+                (document, language, terms, now - self.ttl)
+            )
+            connection.execute(
+                "INSERT INTO answers (document, language, question, terms, answer, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (document, language, question, terms, answer, now, now)
+            )
+            self._count("inserts")
+            (count,) = connection.execute("SELECT COUNT(*) FROM answers").fetchone()
+            if count > self.max_entries:
+                # Expired entries go first, then a tenth of the rest, so eviction isn't paid on every insert
+                evicted = connection.execute("DELETE FROM answers WHERE created < ?", (now - self.ttl,)).rowcount
+                excess = count - evicted - self.max_entries
+                if excess > 0:
+                    excess += self.max_entries // 10
+                    connection.execute(
+                        "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY last_used LIMIT ?)",
+                        (excess,)
+                    )
+                    evicted += excess
+                self._count("evictions", evicted)
+
+    def invalidate(self, document: str, language: Optional[str] = None) -> int:
+        """Drop the cached answers for a document (in one language, or all); returns the number removed."""
+        connection = self._connection()
+        with connection:
+            if language is None:
+                removed = connection.execute("DELETE FROM answers WHERE document = ?", (document,)).rowcount
+            else:
+                removed = connection.execute(
+                    "DELETE FROM answers WHERE document = ? AND language = ?", (document, language)
+                ).rowcount
+        if removed:
+            logger.info(f"Dropped {removed} cached answers for document {document[:12]}")
+        return removed
+
+    def stats(self) -> Dict[str, float]:
+        """Lookup, hit, exact-hit, insert and eviction counts plus the hit rate since start-up."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        (stats["entries"],) = self._connection().execute("SELECT COUNT(*) FROM answers").fetchone()
+        return stats
+
+
+@lru_cache(maxsize=None)
+def get_answer_cache() -> Optional[AnswerCache]:
+    """Process-wide answer cache, or None when disabled with LEGAL_LENS_ANSWER_CACHE=0."""
+    if get_env("LEGAL_LENS_ANSWER_CACHE", "1").lower() in ("0", "false", "no"):
+        return None
+    try:
+        return AnswerCache()
+    except (sqlite3.Error, OSError) as e:
+        logger.error(f"Answer cache unavailable: {str(e)}")
+        return None
@@ -1,15 +1,12 @@
-import os
-from dotenv import load_dotenv
-import requests
 import logging
 from typing import Optional
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+from chatbot_agent.answer_cache import get_answer_cache
+from common.config import get_api_key
+from common.singleflight import content_key
+from common.scheduler import INTERACTIVE
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 def get_chatbot_response(
     user_input: str,
@@ -18,6 +15,10 @@ def get_chatbot_response(
 ) -> str:
     """
     Get a response from the chatbot with improved error handling and reliability.
+
+    Answers are cached per document text and language, so a question asked
+    before about the same document, in any wording the answer cache
+    recognises, is answered without an API call.
     
     Args:
         user_input: The user's question or input
@@ -27,9 +28,21 @@ def get_chatbot_response(
     Returns:
         The chatbot's response or an error message in the specified language
     """
+    # requests and the API client are loaded on the first question, not at UI start-up
+    import requests
+    from common.api_client import chat_completion
+
     try:
+        cache = get_answer_cache()
+        document_hash = content_key(document_text or "") if cache else None
+        if cache:
+            cached = cache.get(user_input, document_hash, language)
+            if cached:
+                logger.info(f"Answered from cache ({cached['similarity']:.0%} similar to \"{cached['question']}\")")
+                return cached["answer"]
+
         # Validate API key
-        api_key = os.getenv("DEEPSEEK_API_KEY")
+        api_key = get_api_key()
         if not api_key:
             logger.error("API key not configured")
             return "Service configuration error. Please contact support."
@@ -59,19 +72,12 @@ def get_chatbot_response(
         messages.append({"role": "user", "content": user_input})
 
         # Make API request with timeout
-        response = requests.post(
-            "https://api.deepseek.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "deepseek-chat",
-                "messages": messages,
-                "temperature": 0.7,
-                "max_tokens": 500
-            },
-            timeout=30  # 30-second timeout
+        response = chat_completion(
+            messages,
+            api_key=api_key,
+            priority=INTERACTIVE,  # 30-second budget including queueing and retries
+            temperature=0.7,
+            max_tokens=500
         )
 
         # Validate response
@@ -80,11 +86,16 @@ def get_chatbot_response(
             return "The AI service is currently unavailable. Please try again later."
             
         try:
-            return response.json()["choices"][0]["message"]["content"]
+            answer = response.json()["choices"][0]["message"]["content"]
         except (KeyError, IndexError) as e:
             logger.error(f"Malformed API response: {str(e)}")
             return "The AI response couldn't be processed. Please rephrase your question."
 
+        # Only real answers are cached; the error messages above are retried next time
+        if cache and answer:
+            cache.put(user_input, document_hash, language, answer)
+        return answer
+
     except requests.exceptions.RequestException as e:
         logger.error(f"Network error: {str(e)}")
         return "Network connection issue. Please check your internet."
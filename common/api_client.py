@@ -0,0 +1,282 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from common import resilience, scheduler
+from common.config import get_env
+from common.tracing import register_gauge, span
+
+logger = logging.getLogger(__name__)
+
+API_BASE = get_env("DEEPSEEK_API_BASE", "https://api.deepseek.com/v1").rstrip("/")
+CHAT_COMPLETIONS_URL = f"{API_BASE}/chat/completions"
+DEFAULT_MODEL = "deepseek-chat"
+
+# Overall budget per priority class when the caller gives no timeout.
+# Queueing, retries, backoff and hedges all count against it.
+DEFAULT_DEADLINES = {
+    scheduler.INTERACTIVE: float(get_env("LEGAL_LENS_API_TIMEOUT_INTERACTIVE", "30")),
+    scheduler.ON_DEMAND: float(get_env("LEGAL_LENS_API_TIMEOUT_ON_DEMAND", "120")),
+    scheduler.BACKGROUND: float(get_env("LEGAL_LENS_API_TIMEOUT_BACKGROUND", "300")),
+}
+CONNECT_TIMEOUT = 5.0
+
+# Once latencies are known, a single attempt is abandoned (and retried)
+# after this multiple of the rolling p99, but never sooner than the minimum.
+ATTEMPT_TIMEOUT_FACTOR = 3.0
+MIN_ATTEMPT_TIMEOUT = 10.0
+
+HEDGING_ENABLED = get_env("LEGAL_LENS_API_HEDGING", "1").lower() not in ("0", "false", "no")
+HEDGE_PERCENTILE = 0.95
+
+_latency = resilience.LatencyTracker()
+_breaker = resilience.CircuitBreaker(
+    failure_threshold=int(get_env("LEGAL_LENS_API_BREAKER_FAILURES", "5")),
+    cooldown=float(get_env("LEGAL_LENS_API_BREAKER_COOLDOWN", "30"))
+)
+_executor = None
+_executor_lock = threading.Lock()
+
+register_gauge(
+    "api_circuit_open", "1 while the DeepSeek circuit breaker is rejecting calls.",
+    lambda: {"deepseek": int(_breaker.state == "open")}
+)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """The API has been failing and calls are being rejected without a request."""
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(get_env("LEGAL_LENS_API_WORKERS", "16")),
+                thread_name_prefix="legal-lens-api"
+            )
+        return _executor
+
+
+def reset_resilience():
+    """Forget latency history and close the circuit breaker (benchmarks and tests)."""
+    _latency.clear()
+    _breaker.reset()
+
+
+def estimate_tokens(messages, max_tokens=None) -> int:
+    """Rough token budget of a request: about four characters per prompt token plus the completion limit."""
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in messages)
+    return prompt_chars // 4 + (max_tokens or 1024)
+
+
+def _admit(limiter, estimated, priority, session_id, timeout):
+    """Wait for a scheduler slot, surfacing a queue timeout as a request timeout."""
+    if limiter is None:
+        return
+    try:
+        limiter.acquire(estimated, priority=priority, session_id=session_id, timeout=timeout)
+    except scheduler.SchedulerTimeout as e:
+        raise requests.exceptions.Timeout(str(e)) from e
+
+
+def _post(body, headers, timeout):
+    """One HTTP attempt; returns (response, seconds)."""
+    started = time.monotonic()
+    response = requests.post(CHAT_COMPLETIONS_URL, headers=headers, data=body, timeout=timeout)
+    return response, time.monotonic() - started
+
+
+def _is_retryable(outcome) -> bool:
+    return isinstance(outcome, Exception) or outcome[0].status_code in resilience.RETRY_STATUSES
+
+
+def _send_hedged(body, headers, timeout, hedge_after, admit_hedge):
+    """
+    Send a request and, if it hasn't answered within `hedge_after` seconds,
+    a duplicate; the first usable reply wins.
+
+    Returns:
+        ((response, seconds), hedged, hedge_won)
+    """
+    executor = _get_executor()
+    primary = executor.submit(_post, body, headers, timeout)
+    done, _ = wait([primary], timeout=hedge_after)
+    if done or not admit_hedge():
+        return primary.result(), False, False
+
+    hedge = executor.submit(_post, body, headers, timeout)
+    pending = {primary, hedge}
+    outcome = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            outcome = error if error is not None else future.result()
+            if not _is_retryable(outcome):
+                return outcome, True, future is hedge
+    # Both attempts failed: report the last failure
+    if isinstance(outcome, Exception):
+        raise outcome
+    return outcome, True, False
+
+
+def chat_completion(messages, api_key=None, timeout=None, model=DEFAULT_MODEL,
+                    priority=None, session_id=None, idempotent=True, **params):
+    """
+    Send a chat-completions request to the DeepSeek API.
+
+    Every agent goes through this function so API calls can be traced,
+    rate limited and made resilient in one place:
+
+    - requests wait in the process-wide scheduler until the account's
+      request and token budgets allow them;
+    - 429 and 5xx replies, timeouts and connection errors are retried with
+      jittered exponential backoff, honouring Retry-After;
+    - once latencies are known, idempotent calls that are slower than the
+      rolling p95 get a hedged duplicate request, and single attempts are
+      abandoned after a multiple of the rolling p99;
+    - sustained failures open a circuit breaker that fails fast.
+
+    Status handling of the final reply is left to the caller.
+
+    Args:
+        messages: Chat messages in OpenAI format
+        api_key: API key; read from DEEPSEEK_API_KEY when omitted
+        timeout: Overall budget in seconds including queueing and retries;
+            defaults per priority class (DEFAULT_DEADLINES)
+        model: Model name
+        priority: scheduler.INTERACTIVE, ON_DEMAND or BACKGROUND; defaults
+            to the enclosing scheduler.request_context, else ON_DEMAND
+        session_id: Session to queue fairly against others; defaults to the
+            enclosing scheduler.request_context
+        idempotent: Whether a duplicate request is harmless (enables hedging)
+        **params: Extra payload fields such as temperature or max_tokens
+
+    Returns:
+        The requests.Response
+
+    Raises:
+        requests.exceptions.Timeout: if the budget runs out
+        CircuitOpenError: while the circuit breaker is open
+        scheduler.RequestCancelled: if the enclosing request_context was cancelled
+        requests.exceptions.RequestException: if the last attempt failed without a reply
+    """
+    # Checked once, up front: a call other callers may have coalesced onto is never abandoned midway
+    scheduler.check_cancelled()
+    api_key = api_key or get_env("DEEPSEEK_API_KEY")
+    payload = {"model": model, "messages": messages, **params}
+    body = json.dumps(payload).encode("utf-8")
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "Accept": "application/json"
+    }
+
+    priority = scheduler.current_priority() if priority is None else priority
+    session_id = session_id or scheduler.current_session()
+    budget = timeout if timeout is not None else DEFAULT_DEADLINES[priority]
+    deadline = time.monotonic() + budget
+    latency_key = f"{model}:{scheduler.PRIORITY_NAMES[priority]}"
+    limiter = scheduler.get_scheduler()
+    estimated = estimate_tokens(messages, params.get("max_tokens"))
+    can_hedge = HEDGING_ENABLED and idempotent and not params.get("stream")
+
+    def admit_hedge():
+        # Hedges only use spare capacity; they never queue behind other work
+        try:
+            _admit(limiter, estimated, priority, session_id, timeout=0)
+            return True
+        except requests.exceptions.Timeout:
+            return False
+
+    with span("api.chat_completion", model=model, bytes_out=len(body),
+              priority=scheduler.PRIORITY_NAMES[priority]) as s:
+        attempt = 0
+        while True:
+            _admit(limiter, estimated, priority, session_id, timeout=max(deadline - time.monotonic(), 0))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.exceptions.Timeout(f"API budget of {budget:g}s exhausted")
+
+            # Checked after admission, so a half-open probe is only taken by a call about to be sent
+            if not _breaker.allow():
+                if limiter is not None:
+                    limiter.record_usage(estimated, 0)
+                s.set(circuit_open=True)
+                raise CircuitOpenError("DeepSeek API circuit breaker is open after repeated failures")
+
+            recorded = False
+            try:
+                p99 = _latency.percentile(latency_key, 0.99)
+                attempt_timeout = min(remaining, max(MIN_ATTEMPT_TIMEOUT, p99 * ATTEMPT_TIMEOUT_FACTOR)) if p99 else remaining
+                request_timeout = (min(CONNECT_TIMEOUT, attempt_timeout), attempt_timeout)
+                hedge_after = _latency.percentile(latency_key, HEDGE_PERCENTILE) if can_hedge else None
+
+                try:
+                    if hedge_after is not None and hedge_after < attempt_timeout:
+                        (response, seconds), hedged, hedge_won = _send_hedged(
+                            body, headers, request_timeout, hedge_after, admit_hedge
+                        )
+                        if hedged:
+                            s.set(hedged=True, hedge_won=hedge_won)
+                    else:
+                        response, seconds = _post(body, headers, request_timeout)
+                    error = None
+                except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                    response, error = None, e
+
+                if error is None and response.status_code not in resilience.RETRY_STATUSES:
+                    _breaker.record_success()
+                    recorded = True
+                    break
+
+                _breaker.record_failure()
+                recorded = True
+            finally:
+                # Any other exception leaves without an outcome; don't hold the half-open probe
+                if not recorded:
+                    _breaker.release()
+
+            if limiter is not None:
+                limiter.record_usage(estimated, 0)
+            attempt += 1
+            retry_after = resilience.parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+            delay = resilience.backoff_delay(attempt, retry_after)
+            if attempt > resilience.MAX_RETRIES or time.monotonic() + delay >= deadline:
+                s.set(attempts=attempt, status=response.status_code if response is not None else None)
+                if error is not None:
+                    raise error
+                return response
+            logger.warning(
+                f"API attempt {attempt} failed ({error or response.status_code}); retrying in {delay:.2f}s"
+            )
+            time.sleep(delay)
+
+        s.set(attempts=attempt + 1, status=response.status_code, bytes_in=len(response.content))
+        actual = estimated
+        if response.status_code == 200:
+            _latency.record(latency_key, seconds)
+            try:
+                usage = response.json().get("usage") or {}
+                s.set(
+                    prompt_tokens=usage.get("prompt_tokens", 0),
+                    completion_tokens=usage.get("completion_tokens", 0)
+                )
+                actual = usage.get("total_tokens", estimated)
+            except ValueError:
+                pass
+        if limiter is not None:
+            limiter.record_usage(estimated, actual)
+    return response
+
+
+def chat_completion_content(messages, **kwargs):
+    """Send a chat-completions request and return the first choice's content, raising on HTTP errors."""
+    response = chat_completion(messages, **kwargs)
+    response.raise_for_status()
+    return response.json()["choices"][0]["message"]["content"]
@@ -0,0 +1,26 @@
+import os
+from functools import lru_cache
+from typing import Optional
+
+
+@lru_cache(maxsize=None)
+def load_env() -> bool:
+    """
+    Load .env into the process environment, once per process.
+
+    Streamlit re-executes the UI script on every interaction; calling this
+    there (or from any agent) costs a cache lookup after the first call.
+    """
+    from dotenv import load_dotenv
+
+    return load_dotenv()
+
+
+def get_env(name: str, default: Optional[str] = None) -> Optional[str]:
+    """Read a setting from the environment, with .env loaded first."""
+    load_env()
+    return os.getenv(name, default)
+
+
+def get_api_key() -> Optional[str]:
+    return get_env("DEEPSEEK_API_KEY")
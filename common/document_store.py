@@ -0,0 +1,243 @@
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+from common.config import get_env
+from common.singleflight import coalesce
+from common.tracing import register_gauge, span
+
+logger = logging.getLogger(__name__)
+
+# Sessions not seen for this long release their artifacts.
+SESSION_TTL = float(get_env("LEGAL_LENS_SESSION_TTL", "1800"))
+# Unreferenced artifacts are kept (for re-uploads) up to this many bytes, least recently used first out.
+IDLE_BYTES = int(float(get_env("LEGAL_LENS_STORE_IDLE_MB", "256")) * 1024 * 1024)
+# Expired sessions are swept at most this often.
+SWEEP_INTERVAL = 60.0
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate resident size of an artifact in bytes."""
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    text = getattr(value, "text", None)
+    if isinstance(text, str):
+        # Extracted documents: the text dominates; offsets and index entries are small records
+        offsets = len(getattr(value, "page_offsets", ()))
+        entries = len(getattr(getattr(value, "structure", None), "entries", ()))
+        return sys.getsizeof(text) + 72 * offsets + 400 * entries
+    return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ("value", "size", "holders", "on_evict")
+
+    def __init__(self, value, size, on_evict=None):
+        self.value = value
+        self.size = size
+        self.holders = set()
+        self.on_evict = on_evict
+
+
+class DocumentStore:
+    """
+    Process-wide, content-addressed store for per-document artifacts.
+
+    Extracted documents, summaries and audio are stored once under a
+    content key, however many sessions view them. Sessions hold handles:
+    `bind(session, slot, key)` records that a session uses an artifact in a
+    named slot ("document", "summary", "audio"), releasing whatever the
+    slot held before. An artifact no session holds stays cached until the
+    idle budget is exceeded, then is evicted least recently used first.
+    Artifacts backed by a file pass `on_evict` to delete it on eviction.
+    """
+
+    def __init__(self, idle_bytes: int = IDLE_BYTES, session_ttl: float = SESSION_TTL):
+        self.idle_bytes = idle_bytes
+        self.session_ttl = session_ttl
+        self._lock = threading.RLock()
+        self._entries: Dict[str, _Entry] = {}
+        self._idle = OrderedDict()  # key -> size of unreferenced entries, LRU order
+        self._idle_size = 0
+        self._sessions: Dict[str, Dict[str, str]] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._last_sweep = time.monotonic()
+        self._expiry_listeners = []
+        self.stats_counters = {"hits": 0, "misses": 0, "evictions": 0, "expired_sessions": 0}
+
+    def get(self, key: Optional[str]) -> Optional[Any]:
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if key in self._idle:
+                self._idle.move_to_end(key)
+            return entry.value
+
+    def put(self, key: str, value: Any, on_evict: Optional[Callable[[Any], None]] = None) -> str:
+        """
+        Store an artifact unless an equal one is already stored; returns the key.
+
+        `on_evict` is called with the value when the artifact is evicted.
+        """
+        with self._lock:
+            if key not in self._entries:
+                size = estimate_size(value)
+                self._entries[key] = _Entry(value, size, on_evict)
+                self._mark_idle(key, size)
+        return key
+
+    def get_or_create(self, key: str, factory: Callable[[], Any],
+                      on_evict: Optional[Callable[[Any], None]] = None) -> Any:
+        """Return the stored artifact, building it once for all concurrent callers when missing."""
+        with span("store.get", cache_hit=key in self._entries):
+            value = self.get(key)
+            with self._lock:
+                self.stats_counters["hits" if value is not None else "misses"] += 1
+            if value is not None:
+                return value
+
+            def build():
+                existing = self.get(key)
+                if existing is not None:
+                    return existing
+                created = factory()
+                self.put(key, created, on_evict)
+                return created
+
+            return coalesce(f"store:{key}", build)
+
+    def _mark_idle(self, key: str, size: int):
+        self._idle[key] = size
+        self._idle_size += size
+        while self._idle_size > self.idle_bytes and len(self._idle) > 1:
+            evicted, evicted_size = self._idle.popitem(last=False)
+            self._idle_size -= evicted_size
+            entry = self._entries.pop(evicted)
+            self.stats_counters["evictions"] += 1
+            if entry.on_evict is not None:
+                try:
+                    entry.on_evict(entry.value)
+                except Exception as e:
+                    logger.warning(f"Cleaning up evicted artifact {evicted[:12]} failed: {str(e)}")
+
+    def _release(self, session_id: str, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry.holders.discard(session_id)
+        if not entry.holders:
+            self._mark_idle(key, entry.size)
+
+    def bind(self, session_id: str, slot: str, key: Optional[str], value: Any = None,
+             on_evict: Optional[Callable[[Any], None]] = None):
+        """
+        Point a session's slot at an artifact (or at nothing), releasing the previous one.
+
+        Pass the artifact as `value` (and its `on_evict`) when it may have
+        been evicted since it was fetched; it is stored again instead of failing.
+        """
+        with self._lock:
+            if key is not None and key not in self._entries and value is not None:
+                self.put(key, value, on_evict)
+            self._last_seen[session_id] = time.monotonic()
+            slots = self._sessions.setdefault(session_id, {})
+            previous = slots.get(slot)
+            if previous == key:
+                return
+            if key is None:
+                slots.pop(slot, None)
+            else:
+                entry = self._entries.get(key)
+                if entry is None:
+                    raise KeyError(f"No stored artifact {key[:12]}")
+                if not entry.holders and key in self._idle:
+                    self._idle_size -= self._idle.pop(key)
+                entry.holders.add(session_id)
+                slots[slot] = key
+            if previous is not None and previous not in slots.values():
+                self._release(session_id, previous)
+
+    def touch(self, session_id: str):
+        """Record session activity; call once per script run."""
+        with self._lock:
+            self._last_seen[session_id] = time.monotonic()
+
+    def release_session(self, session_id: str):
+        """Drop every artifact a session holds."""
+        with self._lock:
+            for key in set(self._sessions.pop(session_id, {}).values()):
+                self._release(session_id, key)
+            self._last_seen.pop(session_id, None)
+
+    def on_session_expired(self, callback: Callable[[str], None]):
+        """Call `callback(session_id)` for each expired session, before its artifacts are released."""
+        with self._lock:
+            self._expiry_listeners.append(callback)
+
+    def expire_sessions(self, is_active: Optional[Callable[[str], bool]] = None, force: bool = False) -> int:
+        """
+        Release sessions idle for longer than the TTL, or reported gone by `is_active`.
+
+        Runs at most once per SWEEP_INTERVAL unless forced.
+
+        Returns:
+            Number of sessions released
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_sweep < SWEEP_INTERVAL:
+                return 0
+            self._last_sweep = now
+            candidates = list(self._last_seen.items())
+
+        expired = []
+        for session_id, last_seen in candidates:
+            if now - last_seen > self.session_ttl:
+                expired.append(session_id)
+            elif is_active is not None:
+                try:
+                    if not is_active(session_id):
+                        expired.append(session_id)
+                except Exception as e:
+                    logger.debug(f"Session liveness check failed: {str(e)}")
+        for session_id in expired:
+            for callback in list(self._expiry_listeners):
+                try:
+                    callback(session_id)
+                except Exception as e:
+                    logger.warning(f"Session expiry callback failed: {str(e)}")
+            self.release_session(session_id)
+        if expired:
+            self.stats_counters["expired_sessions"] += len(expired)
+            logger.info(f"Released artifacts of {len(expired)} expired sessions")
+        return len(expired)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            total = sum(entry.size for entry in self._entries.values())
+            return {
+                "entries": len(self._entries),
+                "bytes": total,
+                "referenced_bytes": total - self._idle_size,
+                "idle_bytes": self._idle_size,
+                "sessions": len(self._sessions),
+                **self.stats_counters,
+            }
+
+
+@lru_cache(maxsize=None)
+def get_document_store() -> DocumentStore:
+    """The store shared by all sessions in this process."""
+    store = DocumentStore()
+    register_gauge(
+        "document_store_bytes", "Approximate bytes held by the shared document store.",
+        lambda: {kind: value for kind, value in store.stats().items() if kind.endswith("bytes")}
+    )
+    return store
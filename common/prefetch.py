@@ -0,0 +1,202 @@
+"""
+Speculative background work started before the user asks for it.
+
+A session submits work it expects to be asked for next, e.g. a summary
+right after an upload. Tasks run on a small executor of their own, at
+BACKGROUND priority, so they survive Streamlit reruns and never hold up
+what a user is waiting on. Results go into the shared document store
+under the task's content key; when the user then asks, `claim` returns
+the stored result, waits for a task that has already started, or reports
+a miss so the caller does the work itself at INTERACTIVE priority. A task
+still queued behind others is cancelled on a miss rather than waited for.
+
+Each session has at most one task per name. Submitting a different key
+under a name, or cancelling the session, cancels the old task: queued
+tasks never start, and a running one makes no further API calls and its
+result is discarded. The document store cancels a session's tasks when
+it expires the session.
+"""
+import logging
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+from common import scheduler
+from common.config import get_env
+from common.document_store import DocumentStore, get_document_store
+from common.tracing import register_gauge, span
+
+logger = logging.getLogger(__name__)
+
+# Default for the sidebar's speculative mode switch; off unless enabled
+ENABLED = get_env("LEGAL_LENS_PREFETCH", "0").lower() in ("1", "true", "yes")
+WORKERS = int(get_env("LEGAL_LENS_PREFETCH_WORKERS", "2"))
+
+
+class _Task:
+    __slots__ = ("session_id", "name", "key", "cancel", "future")
+
+    def __init__(self, session_id: str, name: str, key: str):
+        self.session_id = session_id
+        self.name = name
+        self.key = key
+        self.cancel = threading.Event()
+        self.future: Optional[Future] = None
+
+
+class Prefetcher:
+    """
+    Per-session speculative tasks whose results land in the document store.
+
+    A finished result is bound to the session's "prefetch_<name>" slot, so
+    it is kept as long as the session is and released like any other
+    artifact when the session ends or moves on.
+    """
+
+    def __init__(self, workers: int = WORKERS, store: Optional[DocumentStore] = None):
+        self.store = store or get_document_store()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="legal-lens-prefetch")
+        self._lock = threading.Lock()
+        self._tasks: Dict[tuple, _Task] = {}
+        self._names = set()
+        self._stats = {
+            "submitted": 0, "completed": 0, "failed": 0, "cancelled": 0,
+            "claims": 0, "hits": 0, "joined": 0, "misses": 0,
+        }
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def submit(self, session_id: str, name: str, key: str, fn: Callable[[], Any]) -> bool:
+        """
+        Start `fn` in the background unless its result is stored or already being built.
+
+        Args:
+            session_id: The session the work is for
+            name: The kind of work ("summary", "roles"); one task per name and session
+            key: Content key of the result; the same key means the same result
+            fn: Builds the result; it is discarded if `fn` raises
+
+        Returns:
+            True if a task was started
+        """
+        with self._lock:
+            task = self._tasks.get((session_id, name))
+            if task is not None and task.key == key:
+                return False
+            if task is not None:
+                self._cancel(task)
+            if self.store.get(key) is not None:
+                self._tasks.pop((session_id, name), None)
+                return False
+            task = _Task(session_id, name, key)
+            self._tasks[(session_id, name)] = task
+            self._names.add(name)
+            self._stats["submitted"] += 1
+            task.future = self._executor.submit(self._run, task, fn)
+        return True
+
+    def _run(self, task: _Task, fn: Callable[[], Any]) -> Any:
+        if task.cancel.is_set():
+            return None
+        with span(f"prefetch.{task.name}") as s:
+            try:
+                with scheduler.request_context(task.session_id, scheduler.BACKGROUND, cancel=task.cancel):
+                    value = fn()
+            except Exception as e:
+                if not task.cancel.is_set():
+                    self._count("failed")
+                    logger.warning(f"Prefetching {task.name} failed: {str(e)}")
+                s.set(cancelled=task.cancel.is_set())
+                return None
+            s.set(cancelled=task.cancel.is_set())
+        if task.cancel.is_set() or value is None:
+            return None
+        self.store.put(task.key, value)
+        try:
+            self.store.bind(task.session_id, f"prefetch_{task.name}", task.key, value)
+        except KeyError:
+            pass  # evicted again before it could be bound; claim will find it missing
+        with self._lock:
+            self._stats["completed"] += 1
+            # The stored result now stands in for the task; a failed task stays so it isn't resubmitted
+            if self._tasks.get((task.session_id, task.name)) is task:
+                del self._tasks[(task.session_id, task.name)]
+        return value
+
+    def _cancel(self, task: _Task):
+        """Cancel a task; the caller holds the lock."""
+        task.cancel.set()
+        if task.future is not None and not task.future.done():
+            task.future.cancel()
+            self._stats["cancelled"] += 1
+        if self._tasks.get((task.session_id, task.name)) is task:
+            del self._tasks[(task.session_id, task.name)]
+
+    def cancel_session(self, session_id: str):
+        """Cancel every task of a session and release its prefetched results."""
+        with self._lock:
+            tasks = [task for (owner, _), task in self._tasks.items() if owner == session_id]
+            for task in tasks:
+                self._cancel(task)
+            names = list(self._names)
+        for name in names:
+            self.store.bind(session_id, f"prefetch_{name}", None)
+        if tasks:
+            logger.info(f"Cancelled {len(tasks)} prefetch tasks")
+
+    def claim(self, session_id: str, name: str, key: str) -> Optional[Any]:
+        """
+        The result of a prefetched task, or None when there is none to use.
+
+        A matching task that has started is waited for. One still queued is
+        cancelled instead: the caller is waiting, and doing the work itself
+        at INTERACTIVE priority beats queueing behind other sessions'
+        background work. A hit counts when the result was ready; waited-for
+        tasks count as joined.
+        """
+        with self._lock:
+            task = self._tasks.get((session_id, name))
+            if task is not None and task.key != key:
+                task = None
+            self._stats["claims"] += 1
+
+        value = self.store.get(key)
+        outcome = "hits"
+        if value is None and task is not None and task.future is not None:
+            # A task that starts between these checks only finds its cancel flag set
+            if task.future.running() or task.future.done():
+                outcome = "joined"
+                try:
+                    value = task.future.result()
+                except CancelledError:
+                    value = None
+            else:
+                with self._lock:
+                    self._cancel(task)
+        if value is None:
+            outcome = "misses"
+        self._count(outcome)
+        return value
+
+    def stats(self) -> Dict[str, float]:
+        """Task and claim counts; hit_rate is the share of claims answered by a finished prefetch."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["running"] = sum(1 for task in self._tasks.values() if task.future and not task.future.done())
+        stats["hit_rate"] = stats["hits"] / stats["claims"] if stats["claims"] else 0.0
+        return stats
+
+
+@lru_cache(maxsize=None)
+def get_prefetcher() -> Prefetcher:
+    """The prefetcher shared by all sessions in this process."""
+    prefetcher = Prefetcher()
+    prefetcher.store.on_session_expired(prefetcher.cancel_session)
+    register_gauge(
+        "prefetch_tasks", "Speculative tasks by outcome and prefetched results by claim outcome.",
+        lambda: {name: value for name, value in prefetcher.stats().items() if name != "hit_rate"}
+    )
+    return prefetcher
@@ -0,0 +1,143 @@
+import math
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from common.config import get_env
+
+# Statuses worth retrying: rate limiting and transient upstream failures.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+MAX_RETRIES = int(get_env("LEGAL_LENS_API_MAX_RETRIES", "2"))
+BACKOFF_BASE = float(get_env("LEGAL_LENS_API_BACKOFF_BASE", "0.5"))
+BACKOFF_CAP = float(get_env("LEGAL_LENS_API_BACKOFF_CAP", "8"))
+
+# Latency windows need this many samples before percentiles drive hedging and timeouts.
+MIN_SAMPLES = 20
+WINDOW_SIZE = 200
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Seconds to wait before retry number `attempt` (1-based).
+
+    Uses "full jitter" exponential backoff, or the server's Retry-After
+    when it asks for longer.
+    """
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delay-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class LatencyTracker:
+    """Rolling window of successful request latencies per workload key."""
+
+    def __init__(self, window: int = WINDOW_SIZE):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, key: str, fraction: float) -> Optional[float]:
+        """Nearest-rank percentile, or None until MIN_SAMPLES have been recorded."""
+        with self._lock:
+            samples = self._samples.get(key)
+            if not samples or len(samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+        return ordered[index]
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+class CircuitBreaker:
+    """
+    Fails fast after sustained upstream errors.
+
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `cooldown` seconds. Then a single probe is let through (half-open):
+    success closes the circuit, failure re-opens it. Every call `allow`
+    admits must end in record_success, record_failure or release.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self.stats = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return "open"
+            return "half_open"
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.cooldown and not self._probing:
+                self._probing = True
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release(self):
+        """End a call that left without an outcome, so a half-open circuit lets the next call probe."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                if self._opened_at is None or self._probing:
+                    self.stats["opened"] += 1
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def reset(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
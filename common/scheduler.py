@@ -0,0 +1,252 @@
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Optional
+
+from common.config import get_env
+from common.tracing import register_gauge, set_session_resolver, span
+
+logger = logging.getLogger(__name__)
+
+# Priority classes: lower values are dispatched first.
+INTERACTIVE = 0   # chat questions a user is waiting on
+ON_DEMAND = 1     # summaries and extractions the user clicked for
+BACKGROUND = 2    # prefetch and batch work
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", ON_DEMAND: "on_demand", BACKGROUND: "background"}
+
+_current_session = contextvars.ContextVar("legal_lens_session", default="default")
+_current_priority = contextvars.ContextVar("legal_lens_priority", default=None)
+_current_cancel = contextvars.ContextVar("legal_lens_cancel", default=None)
+
+
+class SchedulerTimeout(Exception):
+    """A request waited longer than its deadline for a dispatch slot."""
+
+
+class RequestCancelled(Exception):
+    """The work an API call belongs to was cancelled before the call was made."""
+
+
+@contextmanager
+def request_context(session_id: Optional[str] = None, priority: Optional[int] = None,
+                    cancel: Optional[threading.Event] = None):
+    """
+    Attribute API calls made inside the block to a session and/or priority class.
+
+    Once `cancel` is set, further API calls made inside the block raise
+    RequestCancelled instead of being sent; calls already sent complete.
+    """
+    tokens = []
+    if session_id is not None:
+        tokens.append((_current_session, _current_session.set(session_id)))
+    if priority is not None:
+        tokens.append((_current_priority, _current_priority.set(priority)))
+    if cancel is not None:
+        tokens.append((_current_cancel, _current_cancel.set(cancel)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def set_current_session(session_id: str):
+    """Attribute API calls from the current thread or task to a session until changed."""
+    _current_session.set(session_id)
+
+
+def current_session() -> str:
+    return _current_session.get()
+
+
+set_session_resolver(current_session)
+
+
+def current_priority(default: int = ON_DEMAND) -> int:
+    priority = _current_priority.get()
+    return default if priority is None else priority
+
+
+def check_cancelled():
+    """Raise RequestCancelled if the enclosing request_context has been cancelled."""
+    cancel = _current_cancel.get()
+    if cancel is not None and cancel.is_set():
+        raise RequestCancelled("Request cancelled before it was sent")
+
+
+class TokenBucket:
+    """Refills `rate_per_minute` units per minute up to `capacity`."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 when available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+    def credit(self, amount: float):
+        """Adjust for the difference between estimated and actual usage."""
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Ticket:
+    __slots__ = ("priority", "session_id", "tokens", "enqueued", "seq")
+
+    def __init__(self, priority, session_id, tokens, seq):
+        self.priority = priority
+        self.session_id = session_id
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+        self.seq = seq
+
+
+class Scheduler:
+    """
+    Admission control for DeepSeek calls across all agents and sessions.
+
+    Requests wait until both the requests-per-minute and tokens-per-minute
+    buckets have room. Waiting requests are dispatched by priority class,
+    round-robin across sessions within a class, so one session's batch
+    can't starve others.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self._condition = threading.Condition()
+        self._queues: Dict[int, OrderedDict] = {p: OrderedDict() for p in PRIORITY_NAMES}
+        self._seq = itertools.count()
+        self._stats = {
+            p: {"dispatched": 0, "timeouts": 0, "total_wait_s": 0.0, "max_wait_s": 0.0}
+            for p in PRIORITY_NAMES
+        }
+
+    def _head(self) -> Optional[_Ticket]:
+        for priority in sorted(self._queues):
+            sessions = self._queues[priority]
+            if sessions:
+                return next(iter(sessions.values()))[0]
+        return None
+
+    def _remove(self, ticket: _Ticket, rotate: bool):
+        sessions = self._queues[ticket.priority]
+        queue = sessions[ticket.session_id]
+        queue.remove(ticket)
+        if not queue:
+            del sessions[ticket.session_id]
+        elif rotate:
+            sessions.move_to_end(ticket.session_id)
+
+    def acquire(self, estimated_tokens: int, priority: int = ON_DEMAND,
+                session_id: str = "default", timeout: Optional[float] = None) -> float:
+        """
+        Block until the request may be sent.
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            SchedulerTimeout: if not dispatched within `timeout` seconds
+        """
+        with span(f"scheduler.wait.{PRIORITY_NAMES[priority]}", tokens=estimated_tokens) as s:
+            with self._condition:
+                ticket = _Ticket(priority, session_id, estimated_tokens, next(self._seq))
+                self._queues[priority].setdefault(session_id, deque()).append(ticket)
+                deadline = ticket.enqueued + timeout if timeout is not None else None
+                while True:
+                    now = time.monotonic()
+                    if self._head() is ticket:
+                        wait = max(
+                            self.request_bucket.wait_time(1, now),
+                            self.token_bucket.wait_time(estimated_tokens, now)
+                        )
+                        if wait == 0:
+                            self.request_bucket.consume(1)
+                            self.token_bucket.consume(estimated_tokens)
+                            self._remove(ticket, rotate=True)
+                            self._condition.notify_all()
+                            break
+                    else:
+                        wait = None
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self._remove(ticket, rotate=False)
+                            self._stats[priority]["timeouts"] += 1
+                            self._condition.notify_all()
+                            s.set(timed_out=True)
+                            raise SchedulerTimeout(
+                                f"Waited {timeout:g}s for a {PRIORITY_NAMES[priority]} API slot"
+                            )
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+
+                waited = time.monotonic() - ticket.enqueued
+                stats = self._stats[priority]
+                stats["dispatched"] += 1
+                stats["total_wait_s"] += waited
+                stats["max_wait_s"] = max(stats["max_wait_s"], waited)
+            s.set(wait_ms=waited * 1000)
+        return waited
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Credit back (or charge) the difference once the response reports real usage."""
+        with self._condition:
+            self.token_bucket.credit(estimated_tokens - actual_tokens)
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Dict]:
+        """Queue depth and wait-time metrics per priority class."""
+        with self._condition:
+            result = {}
+            for priority, name in PRIORITY_NAMES.items():
+                stats = dict(self._stats[priority])
+                stats["queue_depth"] = sum(len(q) for q in self._queues[priority].values())
+                stats["sessions_waiting"] = len(self._queues[priority])
+                stats["mean_wait_s"] = stats["total_wait_s"] / stats["dispatched"] if stats["dispatched"] else 0.0
+                result[name] = stats
+            return result
+
+
+@lru_cache(maxsize=None)
+def get_scheduler() -> Optional[Scheduler]:
+    """
+    Process-wide scheduler sized by LEGAL_LENS_API_RPM and LEGAL_LENS_API_TPM.
+
+    Returns None (no admission control) when LEGAL_LENS_API_RPM is 0.
+    """
+    rpm = float(get_env("LEGAL_LENS_API_RPM", "300"))
+    tpm = float(get_env("LEGAL_LENS_API_TPM", "1000000"))
+    if rpm <= 0:
+        return None
+    logger.info(f"API scheduler: {rpm:g} requests/min, {tpm:g} tokens/min")
+    limiter = Scheduler(rpm, tpm)
+    register_gauge(
+        "scheduler_queue_depth", "API requests waiting for a dispatch slot.",
+        lambda: {name: stats["queue_depth"] for name, stats in limiter.stats().items()}
+    )
+    register_gauge(
+        "scheduler_mean_wait_seconds", "Mean time dispatched API requests spent queued.",
+        lambda: {name: round(stats["mean_wait_s"], 6) for name, stats in limiter.stats().items()}
+    )
+    return limiter
@@ -0,0 +1,225 @@
+import fcntl
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from common.config import get_env
+from common.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(*parts) -> str:
+    """Stable hash of the inputs that determine a result (bytes, strings or reprs)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, bytes):
+            data = part
+        elif isinstance(part, str):
+            data = part.encode("utf-8")
+        else:
+            data = repr(part).encode("utf-8")
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Thread-safe in-process request coalescing.
+
+    Concurrent calls with the same key share one execution of `fn`: the
+    first caller runs it, later callers block until it finishes and receive
+    the same result (or exception). Nothing is cached once the call returns.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            with span("singleflight.wait", coalesced=True):
+                call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class FileLockSingleFlight:
+    """
+    Cross-process request coalescing with advisory file locks.
+
+    The process holding `<key>.lock` computes the result and writes it to
+    `<key>.result` before releasing the lock; processes that were blocked on
+    the lock read that result instead of recomputing. Results are pickled
+    and pruned after `result_ttl` seconds, and so are lock files nobody holds.
+    """
+
+    def __init__(self, directory: str, result_ttl: float = 300.0):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.result_ttl = result_ttl
+
+    def _read_result(self, path: Path, not_before: float):
+        try:
+            if path.stat().st_mtime < not_before:
+                return False, None
+            with open(path, "rb") as f:
+                return True, pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False, None
+
+    def _write_result(self, path: Path, result):
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _is_current(path: Path, lock_file) -> bool:
+        """Whether an open lock file is still the one at `path`, i.e. wasn't pruned and replaced."""
+        try:
+            return os.fstat(lock_file.fileno()).st_ino == os.stat(path).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        for path in self.directory.glob("*.result"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
+        # Lock files are only deleted while locked by the pruner, so no holder or waiter
+        # loses its lock; a waiter that gets a pruned file reopens the path (see _acquire).
+        for path in self.directory.glob("*.lock"):
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                with open(path, "a+b") as lock_file:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue
+                    if self._is_current(path, lock_file):
+                        path.unlink()
+            except OSError:
+                pass
+
+    def _acquire(self, lock_path: Path):
+        """
+        Open and lock `<key>.lock`.
+
+        Returns:
+            (open lock file, whether another process held the lock first)
+        """
+        waited = False
+        while True:
+            lock_file = open(lock_path, "a+b")
+            try:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Another process is computing this key: wait for it
+                    waited = True
+                    with span("singleflight.wait", coalesced=True, scope="process"):
+                        fcntl.flock(lock_file, fcntl.LOCK_EX)
+                if self._is_current(lock_path, lock_file):
+                    return lock_file, waited
+            except BaseException:
+                lock_file.close()
+                raise
+            lock_file.close()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        lock_path = self.directory / f"{key}.lock"
+        result_path = self.directory / f"{key}.result"
+        started = time.time()
+        lock_file, waited = self._acquire(lock_path)
+        with lock_file:
+            if waited:
+                # Take the other process's result; if it failed, compute it ourselves while holding the lock
+                found, result = self._read_result(result_path, started)
+                if found:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    return result
+            try:
+                result = fn()
+                try:
+                    self._write_result(result_path, result)
+                except (OSError, pickle.PicklingError) as e:
+                    logger.warning(f"Could not share result for {key[:12]}: {str(e)}")
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                self._prune()
+
+
+class Coalescer:
+    """In-process coalescing, optionally backed by a file-lock layer shared across processes."""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.local = SingleFlight()
+        self.shared = FileLockSingleFlight(directory) if directory else None
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        if self.shared is None:
+            return self.local.do(key, fn)
+        return self.local.do(key, lambda: self.shared.do(key, fn))
+
+
+@lru_cache(maxsize=None)
+def get_coalescer() -> Coalescer:
+    """
+    Process-wide coalescer.
+
+    Set LEGAL_LENS_SINGLEFLIGHT_DIR to a directory shared by all server
+    processes on a host to coalesce across processes as well.
+    """
+    return Coalescer(get_env("LEGAL_LENS_SINGLEFLIGHT_DIR") or None)
+
+
+def coalesce(key: str, fn: Callable[[], Any]) -> Any:
+    """Run `fn` once for all concurrent callers with the same key."""
+    return get_coalescer().do(key, fn)
@@ -0,0 +1,294 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from common.config import get_env
+
+logger = logging.getLogger(__name__)
+
+# Numeric span attributes that are summed per span name in the aggregate views.
+COUNTER_ATTRIBUTES = ("bytes_in", "bytes_out", "prompt_tokens", "completion_tokens", "chars")
+
+MAX_SPANS = int(get_env("LEGAL_LENS_TRACE_BUFFER", "5000"))
+
+_enabled = get_env("LEGAL_LENS_TRACING", "").lower() in ("1", "true", "yes")
+_spans = deque(maxlen=MAX_SPANS)
+_lock = threading.Lock()
+_local = threading.local()
+_server = None
+_gauges: Dict[str, tuple] = {}
+_session_of: Optional[Callable[[], str]] = None
+
+
+class _NoopSpan:
+    """Shared stand-in returned while tracing is disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """A timed section of work with free-form attributes, attributed to the session it ran for."""
+    __slots__ = ("name", "attrs", "start", "duration", "parent", "session")
+
+    def __init__(self, name: str, attrs: Dict):
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+        self.duration = 0.0
+        self.parent = None
+        self.session = _session_of() if _session_of is not None else None
+
+    def set(self, **attrs):
+        """Attach or update attributes, e.g. bytes_out, prompt_tokens or cache_hit."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _local.stack.pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        with _lock:
+            _spans.append(self)
+        return False
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "parent": self.parent,
+            "session": self.session,
+            "start": self.start,
+            "duration_ms": self.duration * 1000,
+            **self.attrs
+        }
+
+
+def span(name: str, **attrs):
+    """
+    Time a block of work when tracing is enabled.
+
+    Usage:
+        with span("ocr.image", page=3) as s:
+            text = ocr(image)
+            s.set(chars=len(text))
+
+    While disabled this returns a shared no-op object, so instrumented code
+    pays only for the call itself.
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, attrs)
+
+
+def enable(flag: bool = True):
+    """
+    Turn span recording on or off for the whole process.
+
+    For process-level callers (benchmarks, the metrics endpoint); a
+    session only chooses whether to look at the spans, not whether they
+    are recorded.
+    """
+    global _enabled
+    _enabled = flag
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def set_session_resolver(resolve: Callable[[], str]):
+    """Attribute each new span to the session `resolve()` returns, e.g. the scheduler's current session."""
+    global _session_of
+    _session_of = resolve
+
+
+def _recorded(session: Optional[str]) -> List[Span]:
+    with _lock:
+        return [s for s in _spans if session is None or s.session == session]
+
+
+def clear(session: Optional[str] = None):
+    """Drop the recorded spans, or only those of one session."""
+    with _lock:
+        if session is None:
+            _spans.clear()
+            return
+        kept = [s for s in _spans if s.session != session]
+        _spans.clear()
+        _spans.extend(kept)
+
+
+def get_spans(session: Optional[str] = None) -> List[Dict]:
+    """Return the recorded spans, oldest first, optionally only one session's."""
+    return [s.to_dict() for s in _recorded(session)]
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(session: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Aggregate recorded spans per name, optionally only one session's.
+
+    Returns:
+        Dict mapping span name to count, total/p50/p95/max milliseconds,
+        summed counters, cache hits/misses and errors
+    """
+    spans = _recorded(session)
+
+    grouped: Dict[str, List[Span]] = {}
+    for s in spans:
+        grouped.setdefault(s.name, []).append(s)
+
+    summary = {}
+    for name, items in sorted(grouped.items()):
+        durations = sorted(s.duration * 1000 for s in items)
+        stats = {
+            "count": len(items),
+            "total_ms": sum(durations),
+            "p50_ms": _percentile(durations, 0.50),
+            "p95_ms": _percentile(durations, 0.95),
+            "max_ms": durations[-1],
+            "errors": sum(1 for s in items if "error" in s.attrs),
+        }
+        for counter in COUNTER_ATTRIBUTES:
+            values = [s.attrs[counter] for s in items if isinstance(s.attrs.get(counter), (int, float))]
+            if values:
+                stats[counter] = sum(values)
+        hits = [s.attrs["cache_hit"] for s in items if "cache_hit" in s.attrs]
+        if hits:
+            stats["cache_hits"] = sum(1 for hit in hits if hit)
+            stats["cache_misses"] = len(hits) - stats["cache_hits"]
+        summary[name] = stats
+    return summary
+
+
+def to_json(include_spans: bool = False, session: Optional[str] = None) -> str:
+    """Serialize the aggregate view (and optionally raw spans) as JSON, optionally only one session's."""
+    data = {"enabled": _enabled, "summary": summarize(session)}
+    if include_spans:
+        data["spans"] = get_spans(session)
+    return json.dumps(data, ensure_ascii=False, indent=2, default=str)
+
+
+def dump_json(path: str, include_spans: bool = True):
+    """Write the trace to a JSON file."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(to_json(include_spans=include_spans))
+
+
+def register_gauge(metric: str, help_text: str, read: Callable[[], Dict[str, float]]):
+    """
+    Export a point-in-time value alongside the span metrics.
+
+    `read` is called on every scrape and returns {label value: number}; the
+    label is rendered as `key`, e.g. legal_lens_<metric>{key="interactive"}.
+    """
+    _gauges[metric] = (help_text, read)
+
+
+def _metric_name(span_name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in span_name)
+
+
+def to_prometheus() -> str:
+    """Render the aggregate view in the Prometheus text exposition format."""
+    lines = [
+        "# HELP legal_lens_span_seconds Duration of traced operations.",
+        "# TYPE legal_lens_span_seconds summary",
+    ]
+    summary = summarize()
+    for name, stats in summary.items():
+        label = f'span="{_metric_name(name)}"'
+        lines.append(f'legal_lens_span_seconds{{{label},quantile="0.5"}} {stats["p50_ms"] / 1000:.6f}')
+        lines.append(f'legal_lens_span_seconds{{{label},quantile="0.95"}} {stats["p95_ms"] / 1000:.6f}')
+        lines.append(f"legal_lens_span_seconds_sum{{{label}}} {stats['total_ms'] / 1000:.6f}")
+        lines.append(f"legal_lens_span_seconds_count{{{label}}} {stats['count']}")
+    for metric in COUNTER_ATTRIBUTES + ("cache_hits", "cache_misses", "errors"):
+        rows = [(name, stats[metric]) for name, stats in summary.items() if metric in stats]
+        if not rows:
+            continue
+        lines.append(f"# TYPE legal_lens_{metric}_total counter")
+        for name, value in rows:
+            lines.append(f'legal_lens_{metric}_total{{span="{_metric_name(name)}"}} {value}')
+    for metric, (help_text, read) in list(_gauges.items()):
+        try:
+            values = read()
+        except Exception as e:
+            logger.warning(f"Gauge {metric} failed: {str(e)}")
+            continue
+        lines.append(f"# HELP legal_lens_{metric} {help_text}")
+        lines.append(f"# TYPE legal_lens_{metric} gauge")
+        for key, value in values.items():
+            lines.append(f'legal_lens_{metric}{{key="{key}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics"):
+            body, content_type = to_prometheus(), "text/plain; version=0.0.4"
+        elif self.path.startswith("/trace.json"):
+            body, content_type = to_json(include_spans=True), "application/json"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def serve_metrics(port: Optional[int] = None, host: str = "127.0.0.1"):
+    """
+    Serve /metrics (Prometheus text) and /trace.json from a daemon thread.
+
+    Safe to call on every Streamlit rerun; only the first call starts a server.
+    The port defaults to LEGAL_LENS_METRICS_PORT; nothing is started without one.
+    """
+    global _server
+    port = port or int(get_env("LEGAL_LENS_METRICS_PORT", "0"))
+    with _lock:
+        if _server is not None or not port:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logger.error(f"Could not start metrics endpoint on port {port}: {str(e)}")
+            return None
+    enable()
+    threading.Thread(target=_server.serve_forever, name="metrics-endpoint", daemon=True).start()
+    logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return _server
@@ -2,19 +2,31 @@ import streamlit as st
 import logging
 import os
 import traceback
+import uuid
 from datetime import datetime
-from dotenv import load_dotenv
+from pathlib import Path
 from typing import List, Optional, Tuple
-import requests
-import re
-from parser_agent.parser import extract_text_from_pdf, extract_text_from_image
-from summarizer_agent.summarizer import summarize_text
-from tts_agent.tts import text_to_speech
+from parser_agent.artifact import get_artifact_store
+from parser_agent.ocr_cache import get_ocr_cache
+from parser_agent.thumbnails import get_thumbnail_store
+from search_agent.index import document_key, get_corpus_index
+from search_agent.near_duplicates import get_near_duplicate_index
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from summarizer_agent.incremental import document_family, record_version
+from tts_agent.tts import MIME_TYPES, audio_extension, delete_audio
+from chatbot_agent.answer_cache import get_answer_cache
 from chatbot_agent.chatbot import get_chatbot_response
-from ui_frontend.languages import get_text, LANGUAGES
+from nlp.normalizer import speech_text
+from nlp.roles import extract_parties
+from common import prefetch, scheduler, tracing
+from common.config import get_env, load_env
+from common.document_store import get_document_store
+from common.singleflight import content_key
+from ui_frontend.languages import get_text, AVAILABLE_LANGUAGES
+from workers.client import extract_document, summarize_document, text_to_speech
 
 # Load environment variables
-load_dotenv()
+load_env()
 
 # Set up logging
 logging.basicConfig(
@@ -23,14 +35,42 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+PREVIEW_PAGES = 3   # pages sent to the browser per preview window
+SEARCH_LIMIT = 50   # search hits listed per query
+CORPUS_RESULTS = 10  # documents listed per corpus search
+MAX_CHAT_MESSAGES = 40  # chat messages kept per session besides the system prompt
+# Served by Streamlit at app/static/... when server.enableStaticServing is on (.streamlit/config.toml)
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+AUDIO_DIR = Path(get_env("LEGAL_LENS_AUDIO_DIR", STATIC_DIR / "audio"))
+
+def _session_id() -> str:
+    """Streamlit's id for this browser session, so expiry can ask the runtime whether it is still connected."""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else uuid.uuid4().hex
+
+def _session_is_active(session_id: str) -> bool:
+    from streamlit import runtime
+
+    return not runtime.exists() or runtime.get_instance().is_active_session(session_id)
+
 def initialize_session_state():
     """Initialize all required session state variables."""
     defaults = {
         'interface_language': "English",
         'summary_language': "English",
-        'summary': None,
-        'extracted_text': None,
-        'audio_file': None,
+        # Set once the user picks a summary language; uploads then only suggest one
+        'summary_language_chosen': False,
+        # Artifacts live in the shared document store; sessions keep only their keys
+        'document_key': None,
+        'summary_key': None,
+        'audio_key': None,
+        'upload_id': None,
+        'document_name': None,
+        'changed_clauses': None,
+        'near_duplicate': None,
+        'speculative': prefetch.ENABLED,
+        'preview_page': 1,
+        'chat_unrendered': 0,  # messages sent since the last full run drew the history
         'chat_history': [
             {
                 "role": "system",
@@ -42,23 +82,60 @@ def initialize_session_state():
                 "timestamp": datetime.now().strftime("%H:%M")
             }
         ],
-        'bot_typing': False,
-        'last_message': None
+        'session_id': _session_id()
     }
     
     for key, value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
 
-def clean_text(text: str) -> str:
-    """Clean text by removing special characters and normalizing whitespace."""
-    text = re.sub(r'[*#_~`]', '', text)  # Remove markdown characters
-    text = re.sub(r'\s+', ' ', text).strip()  # Normalize whitespace
-    return text
+def current_document():
+    """The session's extracted document, or None."""
+    return get_document_store().get(st.session_state.document_key)
+
+def current_summary() -> Optional[str]:
+    return get_document_store().get(st.session_state.summary_key)
+
+def current_audio() -> Optional[str]:
+    """Path of the session's audio summary, or None when there is none or its file is gone."""
+    path = get_document_store().get(st.session_state.audio_key)
+    return path if path and os.path.exists(path) else None
+
+def audio_source(path: str) -> str:
+    """
+    Static URL of an audio file inside STATIC_DIR, or the path itself.
+
+    The browser fetches a static URL over plain HTTP with Range requests and
+    caches it; a path is read and registered as a media file on every rerun.
+    st.audio only passes absolute http(s) URLs through, so the URL is built
+    on the address the browser uses for the app.
+    """
+    app_url = st.context.url
+    if not st.get_option("server.enableStaticServing") or not app_url:
+        return path
+    try:
+        relative = Path(path).resolve().relative_to(STATIC_DIR)
+    except ValueError:
+        return path
+    return f"{app_url.rstrip('/')}/app/static/{relative.as_posix()}"
+
+def append_chat_message(role: str, content: str):
+    """Add a chat message, keeping the system prompt and the last MAX_CHAT_MESSAGES messages."""
+    history = st.session_state.chat_history
+    history.append({
+        "role": role,
+        "content": content,
+        "timestamp": datetime.now().strftime("%H:%M")
+    })
+    if len(history) > MAX_CHAT_MESSAGES + 1:
+        del history[1:len(history) - MAX_CHAT_MESSAGES]
 
 def extract_names_roles(text: str, language: str = "English") -> Optional[List[Tuple[str, str]]]:
     """
-    Extract names and their roles from document text using AI.
+    Extract names and their roles from document text.
+
+    Standard recital and cause-title patterns are resolved locally over the
+    full text; the model is only consulted for spans the local pass can't resolve.
     
     Args:
         text: The document text to analyze
@@ -68,82 +145,35 @@ def extract_names_roles(text: str, language: str = "English") -> Optional[List[T
         List of (name, role) tuples or None if extraction fails
     """
     try:
-        cleaned_text = clean_text(text)[:2000]  # Limit input size
-        
-        prompt = f"""Extract names and roles from this legal document text.
-        Return ONLY as a list of tuples in format: [("Name1", "Role1"), ("Name2", "Role2")]
-        Include only names with clearly stated roles.
-        Document excerpt:
-        {cleaned_text}"""
-
-        api_key = os.getenv("DEEPSEEK_API_KEY")
-        if not api_key:
-            logger.error("API key not configured")
+        names_roles = extract_parties(text)
+        if not names_roles:
             return None
 
-        response = requests.post(
-            "https://api.deepseek.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "deepseek-chat",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You extract precise (name, role) pairs from legal documents."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.3
-            },
-            timeout=30  # Add timeout
-        )
-
-        if response.status_code == 200:
-            try:
-                content = response.json()["choices"][0]["message"]["content"]
-                names_roles = eval(content)
-                
-                if (isinstance(names_roles, list) and 
-                    all(isinstance(item, tuple) and len(item) == 2 
-                        for item in names_roles)):
-                    
-                    if language != "English":
-                        return translate_roles(names_roles, language)
-                    return names_roles
-            except Exception as e:
-                logger.error(f"Failed to parse response: {str(e)}")
-        return None
+        if language != "English":
+            return translate_roles(names_roles, language)
+        return names_roles
     except Exception as e:
         logger.error(f"Extraction error: {str(e)}")
         return None
 
 def translate_roles(names_roles: List[Tuple[str, str]], target_lang: str) -> List[Tuple[str, str]]:
     """Translate role descriptions to target language."""
+    from common.api_client import chat_completion
+
     translated = []
     for name, role in names_roles:
         try:
             prompt = f"Translate this legal role to {target_lang}: {role}"
-            response = requests.post(
-                "https://api.deepseek.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {os.getenv('DEEPSEEK_API_KEY')}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "deepseek-chat",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": f"You translate legal terms to {target_lang} accurately."
-                        },
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.3
-                },
-                timeout=30
+            response = chat_completion(
+                [
+                    {
+                        "role": "system",
+                        "content": f"You translate legal terms to {target_lang} accurately."
+                    },
+                    {"role": "user", "content": prompt}
+                ],
+                timeout=30,
+                temperature=0.3
             )
             if response.status_code == 200:
                 translated_role = response.json()["choices"][0]["message"]["content"].strip()
@@ -154,6 +184,102 @@ def translate_roles(names_roles: List[Tuple[str, str]], target_lang: str) -> Lis
             translated.append((name, role))
     return translated
 
+def extract_and_index(uploaded_file):
+    """
+    Extract a document, keep its artifact and add it to the corpus and
+    near-duplicate indexes, so it stays searchable and reusable after the session.
+    """
+    document = extract_document(uploaded_file)
+    try:
+        key = document_key(document)
+        get_artifact_store().put(key, document)
+        get_corpus_index().add_document(document, uploaded_file.name, key=key)
+        get_near_duplicate_index().register(key, uploaded_file.name, document.text)
+    except Exception as e:
+        logger.warning(f"Indexing {uploaded_file.name} failed: {str(e)}")
+    return document
+
+def find_near_duplicate(document):
+    """The earlier indexed document this one nearly duplicates, or None."""
+    try:
+        return get_near_duplicate_index().match(document_key(document))
+    except Exception as e:
+        logger.warning(f"Near-duplicate lookup failed: {str(e)}")
+        return None
+
+def load_indexed_document(key: str):
+    """
+    Load an earlier upload by its document key.
+
+    Its extraction artifact keeps the original structure index and span
+    sources; documents indexed before artifacts were written are rebuilt
+    from the corpus index.
+    """
+    return get_artifact_store().load(key) or get_corpus_index().document(key)
+
+def reference_document():
+    """Load the current upload's near-duplicate, if it has one."""
+    match = st.session_state.near_duplicate
+    if not match:
+        return None
+    try:
+        return load_indexed_document(match["key"])
+    except Exception as e:
+        logger.warning(f"Loading {match['name']} failed: {str(e)}")
+        return None
+
+def _document_family() -> str:
+    """Version family of the current upload, kept to this session."""
+    return document_family(st.session_state.document_name or "", scope=st.session_state.session_id)
+
+def _speculative_keys() -> dict:
+    """Content keys of the results speculative mode prepares for the current document and settings."""
+    match = st.session_state.near_duplicate
+    language = st.session_state.summary_language
+    return {
+        "summary": content_key(
+            "prefetch_summary", st.session_state.document_key, language,
+            _document_family(), match["key"] if match else None
+        ),
+        "roles": content_key("prefetch_roles", st.session_state.document_key, language),
+    }
+
+def _speculative_summary(document, language: str, family: str, match: Optional[dict]) -> dict:
+    reference = load_indexed_document(match["key"]) if match else None
+    return summarize_document(document, language, family=family, reference=reference, save_version=False)
+
+def _claim_miss_priority() -> Optional[int]:
+    """
+    Priority for work a prefetch claim didn't answer.
+
+    In speculative mode the user has been waiting since the claim, so the
+    work runs at INTERACTIVE; otherwise it keeps the default.
+    """
+    return scheduler.INTERACTIVE if st.session_state.speculative else None
+
+def start_prefetch(document):
+    """
+    Start the summary and name extraction for the current document in the background.
+
+    Runs on every rerun; tasks already started or finished for the same
+    document and summary language are left alone.
+    """
+    prefetcher = prefetch.get_prefetcher()
+    session_id = st.session_state.session_id
+    keys = _speculative_keys()
+    # The tasks outlive this script run, so they get plain values, not session state
+    language = st.session_state.summary_language
+    family = _document_family()
+    match = st.session_state.near_duplicate
+    prefetcher.submit(
+        session_id, "summary", keys["summary"],
+        lambda: _speculative_summary(document, language, family, match)
+    )
+    prefetcher.submit(
+        session_id, "roles", keys["roles"],
+        lambda: extract_names_roles(document.text, language) or []
+    )
+
 def handle_file_upload():
     """Process uploaded file and extract text."""
     uploaded_file = st.file_uploader(
@@ -164,11 +290,50 @@ def handle_file_upload():
     
     if uploaded_file:
         try:
-            with st.spinner(get_text("extracting_text", st.session_state.interface_language)):
-                if uploaded_file.type == "application/pdf":
-                    st.session_state.extracted_text = extract_text_from_pdf(uploaded_file)
+            is_new_upload = uploaded_file.name != st.session_state.document_name
+            store = get_document_store()
+            # Reruns with the same upload reuse the stored document instead of extracting again
+            if uploaded_file.file_id != st.session_state.upload_id or current_document() is None:
+                with st.spinner(get_text("extracting_text", st.session_state.interface_language)):
+                    data = uploaded_file.getvalue()
+                    key = content_key("extract_document", uploaded_file.name, data)
+                    # Sessions opening the same file share one extraction and one stored copy
+                    document = store.get_or_create(key, lambda: extract_and_index(uploaded_file))
+                    store.bind(st.session_state.session_id, "document", key, document)
+                    if key != st.session_state.document_key:
+                        prefetch.get_prefetcher().cancel_session(st.session_state.session_id)
+                        st.session_state.summary_key = st.session_state.audio_key = None
+                        st.session_state.changed_clauses = None
+                        st.session_state.near_duplicate = find_near_duplicate(document)
+                        store.bind(st.session_state.session_id, "summary", None)
+                        store.bind(st.session_state.session_id, "audio", None)
+                    st.session_state.document_key = key
+                    st.session_state.upload_id = uploaded_file.file_id
+                    st.session_state.document_name = uploaded_file.name
+                    if document.source_key:
+                        get_thumbnail_store().add_pdf(data, document.source_key)
+            if is_new_upload:
+                st.session_state.preview_page = 1
+
+            # Pre-fill the detected document language for the summary, unless the user picked one
+            detected_language = current_document().language
+            if (is_new_upload and detected_language in AVAILABLE_LANGUAGES
+                    and detected_language != st.session_state.summary_language):
+                if st.session_state.summary_language_chosen:
+                    st.info(f"{get_text('detected_language', st.session_state.interface_language)}: {detected_language}")
                 else:
-                    st.session_state.extracted_text = extract_text_from_image(uploaded_file)
+                    st.session_state.summary_language = detected_language
+                    st.info(f"{get_text('summary_language', st.session_state.interface_language)}: {detected_language}")
+
+            match = st.session_state.near_duplicate
+            if match:
+                st.info(
+                    f"{get_text('near_duplicate_of', st.session_state.interface_language)} "
+                    f"**{match['name']}** ({match['similarity']:.0%})"
+                )
+
+            if st.session_state.speculative:
+                start_prefetch(current_document())
                     
             display_document_preview()
             
@@ -176,28 +341,100 @@ def handle_file_upload():
             logger.error(f"File processing failed: {str(e)}\n{traceback.format_exc()}")
             st.error(f"{get_text('error_processing', st.session_state.interface_language)}: {str(e)}")
 
+def _set_preview_page(page: int):
+    st.session_state.preview_page = page
+
+def _jump_to_search_hit(hits: List[dict]):
+    index = st.session_state.get("preview_hit")
+    if index is not None:
+        st.session_state.preview_page = hits[index]["page"]
+
+@st.fragment
+def display_page_window(document):
+    """
+    Show one window of pages with page jump, search and lazily rendered thumbnails.
+
+    A fragment, so paging and searching rerun only the preview.
+    """
+    lang = st.session_state.interface_language
+    page_count = document.page_count
+    if not 1 <= st.session_state.preview_page <= page_count:
+        st.session_state.preview_page = 1
+
+    query = st.text_input(get_text("search_document", lang), key="preview_query")
+    if query:
+        hits = document.search(query, limit=SEARCH_LIMIT)
+        if hits:
+            more = "+" if len(hits) >= SEARCH_LIMIT else ""
+            st.selectbox(
+                f"{len(hits)}{more} {get_text('matches_found', lang)}",
+                options=range(len(hits)),
+                format_func=lambda i: f"{hits[i]['page']}: …{hits[i]['snippet']}…",
+                index=None,
+                key="preview_hit",
+                on_change=_jump_to_search_hit,
+                args=(hits,)
+            )
+        else:
+            st.caption(get_text("no_matches", lang))
+
+    nav_prev, nav_page, nav_next = st.columns([1, 2, 1])
+    first = st.session_state.preview_page
+    with nav_prev:
+        st.button("◀", on_click=_set_preview_page, args=(max(1, first - PREVIEW_PAGES),),
+                  disabled=first <= 1, use_container_width=True)
+    with nav_page:
+        st.number_input(
+            get_text("page", lang), min_value=1, max_value=page_count, step=1,
+            key="preview_page", label_visibility="collapsed"
+        )
+    with nav_next:
+        st.button("▶", on_click=_set_preview_page, args=(min(page_count, first + PREVIEW_PAGES),),
+                  disabled=first + PREVIEW_PAGES > page_count, use_container_width=True)
+
+    last = min(page_count, first + PREVIEW_PAGES - 1)
+    st.caption(f"{get_text('page', lang)} {first}–{last} / {page_count}")
+    # Only the visible window is sent to the browser, not the whole document
+    st.text_area(
+        label="Document Content",
+        value=document.pages_text(first, last),
+        height=400,
+        label_visibility="collapsed"
+    )
+
+    store = get_thumbnail_store()
+    if store.has_source(document.source_key) and st.checkbox(get_text("show_thumbnails", lang), key="preview_thumbnails"):
+        for column, page in zip(st.columns(PREVIEW_PAGES), range(first, last + 1)):
+            thumbnail = store.thumbnail(document.source_key, page)
+            if thumbnail:
+                with column:
+                    st.image(thumbnail, caption=str(page))
+
 def display_document_preview():
-    """Display document preview and extracted names/roles."""
+    """Display a paginated document preview and extracted names/roles."""
     col1, col2 = st.columns([2, 1])
     
     with col1:
         st.subheader(get_text("document_preview", st.session_state.interface_language))
-        if st.session_state.extracted_text:
-            st.text_area(
-                label="Document Content",
-                value=st.session_state.extracted_text,
-                height=400,
-                label_visibility="collapsed"
-            )
+        document = current_document()
+        if document and document.page_count:
+            display_page_window(document)
     
     with col2:
         st.subheader(get_text("key_people", st.session_state.interface_language))
         if st.button(get_text("extract_roles", st.session_state.interface_language)):
             with st.spinner(get_text("analyzing", st.session_state.interface_language)):
-                names_roles = extract_names_roles(
-                    st.session_state.extracted_text,
-                    st.session_state.summary_language
-                )
+                names_roles = None
+                if st.session_state.speculative and document:
+                    names_roles = prefetch.get_prefetcher().claim(
+                        st.session_state.session_id, "roles", _speculative_keys()["roles"]
+                    )
+                if names_roles is None:
+                    with scheduler.request_context(priority=_claim_miss_priority()):
+                        names_roles = extract_names_roles(
+                            document.text if document else "",
+                            st.session_state.summary_language
+                        )
                 if names_roles:
                     for name, role in names_roles:
                         st.markdown(f"**{name}** - {role}")
@@ -206,95 +443,248 @@ def display_document_preview():
 
 def handle_summary_generation():
     """Generate and display document summary."""
-    if st.session_state.extracted_text:
+    document = current_document()
+    if document:
+        store = get_document_store()
+        session_id = st.session_state.session_id
         if st.button(get_text("generate_summary", st.session_state.interface_language)):
             with st.spinner(get_text("analyzing", st.session_state.interface_language)):
-                st.session_state.summary = summarize_text(
-                    clean_text(st.session_state.extracted_text),
-                    st.session_state.summary_language
-                )
+                result = None
+                if st.session_state.speculative:
+                    result = prefetch.get_prefetcher().claim(session_id, "summary", _speculative_keys()["summary"])
+                    if result:
+                        record_version(result["pending_version"])
+                if result is None:
+                    try:
+                        with scheduler.request_context(priority=_claim_miss_priority()):
+                            result = summarize_document(
+                                document,
+                                st.session_state.summary_language,
+                                family=_document_family(),
+                                reference=reference_document()
+                            )
+                    except Exception as e:
+                        logger.error(f"Summary generation failed: {str(e)}")
+                        st.error(f"{get_text('error_summary', st.session_state.interface_language)}: {str(e)}")
+                if result is not None:
+                    summary_key = store.put(content_key("summary", result["summary"]), result["summary"])
+                    store.bind(session_id, "summary", summary_key, result["summary"])
+                    if summary_key != st.session_state.summary_key:
+                        store.bind(session_id, "audio", None)
+                        st.session_state.audio_key = None
+                    st.session_state.summary_key = summary_key
+                    st.session_state.changed_clauses = (
+                        result if result["previous_version"] or result["reference"] else None
+                    )
         
-        if st.session_state.summary:
+        summary = current_summary()
+        if summary:
             st.subheader(get_text("ai_summary", st.session_state.interface_language))
-            st.write(st.session_state.summary)
+            st.write(summary)
+
+            changes = st.session_state.changed_clauses
+            if changes:
+                if changes["reference"] and st.session_state.near_duplicate:
+                    title = (
+                        f"{get_text('differences_from', st.session_state.interface_language)} "
+                        f"{st.session_state.near_duplicate['name']}"
+                    )
+                else:
+                    title = get_text("changed_clauses", st.session_state.interface_language, "Changes since previous version")
+                with st.expander(title):
+                    for label in changes["changed"]:
+                        st.markdown(f"- {label}")
+                    for label in changes["removed"]:
+                        st.markdown(f"- ~~{label}~~")
+                    if not changes["changed"] and not changes["removed"]:
+                        st.caption(get_text("no_changes", st.session_state.interface_language, "No clauses changed"))
             
             if st.button(get_text("generate_audio", st.session_state.interface_language)):
                 with st.spinner(get_text("generating_audio", st.session_state.interface_language)):
                     try:
-                        st.session_state.audio_file = text_to_speech(
-                            clean_text(st.session_state.summary),
-                            st.session_state.summary_language
+                        language = st.session_state.summary_language
+                        extension = audio_extension()
+                        audio_key = content_key("audio", summary, language, extension)
+                        audio_path = store.get_or_create(
+                            audio_key,
+                            lambda: text_to_speech(speech_text(summary), language, str(AUDIO_DIR / f"{audio_key}{extension}")),
+                            on_evict=delete_audio
                         )
+                        store.bind(session_id, "audio", audio_key, audio_path, on_evict=delete_audio)
+                        st.session_state.audio_key = audio_key
                         st.rerun()
                     except Exception as e:
                         logger.error(f"Audio generation failed: {str(e)}")
                         st.error(f"{get_text('error_audio', st.session_state.interface_language)}: {str(e)}")
             
-            if st.session_state.audio_file:
+            audio_path = current_audio()
+            if audio_path:
                 st.subheader(get_text("audio_version", st.session_state.interface_language))
-                st.audio(st.session_state.audio_file)
+                st.audio(audio_source(audio_path), format=MIME_TYPES.get(Path(audio_path).suffix, "audio/mpeg"))
+
+def render_chat_message(msg: dict):
+    with st.chat_message(msg["role"], avatar="🧑" if msg["role"] == "user" else "🤖"):
+        st.write(msg['content'])
+        if msg.get("timestamp"):
+            st.caption(msg["timestamp"])
 
 def handle_chat_interaction():
-    """Manage chat interface and bot responses."""
+    """Show the chat history and the chat pane."""
     st.markdown("---")
     st.subheader(get_text("chatbot_title", st.session_state.interface_language))
     
-    # Display chat history
-    for msg in st.session_state.chat_history[1:]:
-        with st.chat_message(msg["role"], avatar="🧑" if msg["role"] == "user" else "🤖"):
-            st.write(msg['content'])
-            if msg.get("timestamp"):
-                st.caption(msg["timestamp"])
-    
-    # Handle user input
-    if prompt := st.chat_input(get_text("chat_placeholder", st.session_state.interface_language)):
-        process_user_message(prompt)
-    
-    # Generate bot response
-    if st.session_state.bot_typing:
-        generate_bot_response()
-
-def process_user_message(prompt: str):
-    """Process user message and trigger bot response."""
-    if not st.session_state.last_message or prompt != st.session_state.last_message:
-        st.session_state.last_message = prompt
-        st.session_state.chat_history.append({
-            "role": "user",
-            "content": prompt,
-            "timestamp": datetime.now().strftime("%H:%M")
-        })
-        st.session_state.bot_typing = True
-        st.rerun()
+    # Past messages are drawn on full runs only; chat turns draw theirs from chat_pane
+    history = st.container()
+    with history:
+        for msg in st.session_state.chat_history[1:]:
+            render_chat_message(msg)
+    st.session_state.chat_unrendered = 0
+    chat_pane(history)
 
-def generate_bot_response():
-    """Generate and display bot response."""
-    try:
-        response = get_chatbot_response(
-            st.session_state.last_message,
-            st.session_state.extracted_text,
-            st.session_state.interface_language
+@st.fragment
+def chat_pane(history):
+    """
+    Chat input and bot responses, rerun on their own.
+
+    Sending a message reruns only this fragment, so the document preview,
+    summary and audio are not rebuilt for a chat turn, and neither are the
+    messages the last full run drew. Messages sent since then are redrawn
+    into a slot at the end of `history`, which the fragment claims on every
+    full run.
+    """
+    scheduler.set_current_session(st.session_state.session_id)
+    lang = st.session_state.interface_language
+    turns = history.container()
+    prompt = st.chat_input(get_text("chat_placeholder", lang))
+    with turns:
+        if prompt:
+            append_chat_message("user", prompt)
+            st.session_state.chat_unrendered += 1
+        unrendered = min(st.session_state.chat_unrendered, len(st.session_state.chat_history) - 1)
+        for msg in st.session_state.chat_history[len(st.session_state.chat_history) - unrendered:]:
+            render_chat_message(msg)
+        if not prompt:
+            return
+        with st.spinner(get_text("typing_indicator", lang)):
+            try:
+                document = current_document()
+                response = get_chatbot_response(prompt, document.text if document else None, lang)
+                append_chat_message("assistant", response)
+            except Exception as e:
+                logger.error(f"Chatbot error: {str(e)}")
+                append_chat_message("assistant", get_text("general_error", lang))
+        st.session_state.chat_unrendered += 1
+        render_chat_message(st.session_state.chat_history[-1])
+
+def display_corpus_search():
+    """Sidebar search over every document processed so far, not just the open one."""
+    lang = st.session_state.interface_language
+    query = st.text_input(get_text("search_corpus", lang), key="corpus_query")
+    if not query:
+        return
+    results = get_corpus_index().search(query, limit=CORPUS_RESULTS)
+    if not results:
+        st.caption(get_text("no_matches", lang))
+        return
+    document = current_document()
+    open_key = document.source_key if document else None
+    for result in results:
+        st.markdown(f"**{result['name']}**")
+        for hit in result["pages"]:
+            st.caption(f"{get_text('page', lang)} {hit['page']}: {hit['snippet']}")
+            if result["key"] == open_key:
+                st.button(
+                    f"{get_text('open_page', lang)} {hit['page']}", key=f"corpus_hit_{hit['page']}",
+                    on_click=_set_preview_page, args=(hit["page"],)
+                )
+
+def display_performance_panel():
+    """
+    Optional sidebar panel with this session's per-stage timings from the tracing layer.
+
+    The checkbox only shows or hides the panel; whether spans are recorded
+    is a process setting (LEGAL_LENS_TRACING or the metrics endpoint).
+    """
+    show = st.checkbox(
+        get_text("performance_panel", st.session_state.interface_language, "Performance"),
+        key="show_performance"
+    )
+    if not show:
+        return
+
+    ocr_cache = get_ocr_cache()
+    if ocr_cache:
+        stats = ocr_cache.stats()
+        st.caption(f"OCR cache: {stats['hit_rate']:.0%} hit rate, {stats['entries']} entries")
+
+    answer_cache = get_answer_cache()
+    if answer_cache:
+        stats = answer_cache.stats()
+        st.caption(f"Answer cache: {stats['hit_rate']:.0%} hit rate, {stats['entries']} entries")
+
+    if st.session_state.speculative:
+        stats = prefetch.get_prefetcher().stats()
+        st.caption(
+            f"Prefetch: {stats['hit_rate']:.0%} hit rate ({stats['hits']} ready, {stats['joined']} awaited, "
+            f"{stats['misses']} missed), {stats['cancelled']} cancelled"
         )
-        st.session_state.chat_history.append({
-            "role": "assistant",
-            "content": response,
-            "timestamp": datetime.now().strftime("%H:%M")
-        })
-    except Exception as e:
-        logger.error(f"Chatbot error: {str(e)}")
-        st.session_state.chat_history.append({
-            "role": "assistant",
-            "content": get_text("general_error", st.session_state.interface_language),
-            "timestamp": datetime.now().strftime("%H:%M")
-        })
-    finally:
-        st.session_state.bot_typing = False
-        st.session_state.last_message = None
+
+    store_stats = get_document_store().stats()
+    st.caption(
+        f"Document store: {store_stats['entries']} artifacts, {store_stats['bytes'] / 1e6:.1f} MB "
+        f"for {store_stats['sessions']} sessions"
+    )
+
+    limiter = scheduler.get_scheduler()
+    if limiter:
+        queued = sum(stats["queue_depth"] for stats in limiter.stats().values())
+        waits = ", ".join(
+            f"{name} {stats['mean_wait_s'] * 1000:.0f} ms" for name, stats in limiter.stats().items() if stats["dispatched"]
+        )
+        st.caption(f"API queue: {queued} waiting" + (f"; mean wait {waits}" if waits else ""))
+
+    if not tracing.is_enabled():
+        st.caption(get_text("tracing_disabled", st.session_state.interface_language, "Tracing is off (LEGAL_LENS_TRACING=1 turns it on)"))
+        return
+    session_id = st.session_state.session_id
+    summary = tracing.summarize(session_id)
+    if not summary:
+        st.caption(get_text("no_timings", st.session_state.interface_language, "No timings recorded yet"))
+        return
+
+    st.dataframe(
+        [
+            {
+                "stage": name,
+                "count": stats["count"],
+                "total ms": round(stats["total_ms"], 1),
+                "p95 ms": round(stats["p95_ms"], 1),
+                "tokens": stats.get("prompt_tokens", 0) + stats.get("completion_tokens", 0),
+                "bytes": stats.get("bytes_in", 0) + stats.get("bytes_out", 0),
+                "cache hits": stats.get("cache_hits", ""),
+            }
+            for name, stats in summary.items()
+        ],
+        hide_index=True,
+        use_container_width=True
+    )
+    st.download_button(
+        "trace.json", tracing.to_json(include_spans=True, session=session_id), file_name="trace.json", mime="application/json"
+    )
+    st.download_button("metrics.txt", tracing.to_prometheus(), file_name="metrics.txt", mime="text/plain")
+    if st.button(get_text("clear_timings", st.session_state.interface_language, "Clear timings")):
+        tracing.clear(session_id)
         st.rerun()
 
 def run_ui():
     """Main application interface."""
     try:
         initialize_session_state()
+        scheduler.set_current_session(st.session_state.session_id)
+        store = get_document_store()
+        store.touch(st.session_state.session_id)
+        store.expire_sessions(is_active=_session_is_active)
+        tracing.serve_metrics()
         
         st.set_page_config(
             page_title=get_text("title", st.session_state.interface_language),
@@ -308,16 +698,27 @@ def run_ui():
             prev_lang = st.session_state.interface_language
             st.session_state.interface_language = st.selectbox(
                 get_text("language_selector", st.session_state.interface_language),
-                options=list(LANGUAGES.keys()),
-                index=list(LANGUAGES.keys()).index(st.session_state.interface_language)
+                options=AVAILABLE_LANGUAGES,
+                index=AVAILABLE_LANGUAGES.index(st.session_state.interface_language)
             )
+            prev_summary_lang = st.session_state.summary_language
             st.session_state.summary_language = st.selectbox(
                 get_text("summary_language", st.session_state.interface_language),
-                options=list(LANGUAGES.keys()),
-                index=list(LANGUAGES.keys()).index(st.session_state.summary_language)
+                options=AVAILABLE_LANGUAGES,
+                index=AVAILABLE_LANGUAGES.index(st.session_state.summary_language)
+            )
+            if prev_summary_lang != st.session_state.summary_language:
+                st.session_state.summary_language_chosen = True
+            st.session_state.speculative = st.checkbox(
+                get_text("speculative_mode", st.session_state.interface_language),
+                value=st.session_state.speculative,
+                help=get_text("speculative_help", st.session_state.interface_language)
             )
             if prev_lang != st.session_state.interface_language:
                 st.rerun()
+
+            display_corpus_search()
+            display_performance_panel()
         
         # Main application
         st.title(get_text("title", st.session_state.interface_language))
@@ -0,0 +1,177 @@
+"""
+Text normalization shared by extraction, search, summarization and speech.
+
+Built for throughput on multi-megabyte extractions: every pattern is
+precompiled and starts with a literal character, which lets the regex
+engine skip ordinary text at C speed, and each fix is skipped outright
+when a substring check shows it has nothing to do. Clean ASCII text is
+scanned a handful of times by str.__contains__ and not at all by Python
+code.
+
+- normalize_text: OCR and PDF artifacts in extracted text (ligatures, soft
+  hyphens, odd spaces, words hyphenated across line breaks, Indic
+  canonical forms). It never adds or removes line breaks, so line records
+  built from the raw lines still line up.
+- normalize_pages: the same, one page at a time, for page-by-page extraction.
+- strip_markdown: markdown formatting removed from model output.
+- speech_text: markdown removed and whitespace collapsed, for TTS.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, Iterator
+
+# Per-character fixes: ligatures expanded; soft hyphen, zero-width space, word joiner,
+# byte order mark, form feed and carriage return dropped; tabs, no-break and Unicode
+# spaces made plain spaces; Unicode hyphens made ASCII
+_CHARS = {
+    "\ufb00": "ff", "\ufb01": "fi", "\ufb02": "fl", "\ufb03": "ffi", "\ufb04": "ffl", "\ufb05": "st", "\ufb06": "st",
+    "\u00ad": "", "\u200b": "", "\u2060": "", "\ufeff": "", "\x0c": "", "\r": "",
+    "\u2010": "-", "\u2011": "-",
+    **dict.fromkeys("\t\u00a0\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u202f\u205f\u3000", " "),
+}
+_ASCII_CHARS = {char: replacement for char, replacement in _CHARS.items() if char.isascii()}
+_CHAR_RE = re.compile(f"[{re.escape(''.join(_CHARS))}]")
+
+# "termi-\nnation of" -> "termination\nof": the line break stays, the fragment moves up
+_HYPHENATED_RE = re.compile(r"-(?<=[a-z]-)\n *([a-z]\S*) *")
+_SPACE_RUN_RE = re.compile(r"  +")
+_WORD_END_RE = re.compile(r"[ \n]")
+
+# Each branch starts with a literal; headings and blank-line runs are matched from the
+# line break before them, so strip_markdown prepends one
+_MARKDOWN_RE = re.compile(
+    r"```[\s\S]*?```"                             # code blocks are dropped
+    r"|\[(?P<link>[^\]\n]*)\]\([^)\n]*\)"          # links keep their text
+    r"|\*\*(?P<strong>[^\n]*?)\*\*"
+    r"|\*(?P<em>[^*\n]+?)\*"
+    r"|_(?<!\w_)(?P<underline>[^_\n]+?)_(?!\w)"     # not inside snake_case words
+    r"|`(?P<code>[^`\n]*)`"
+    r"|\n[ \t]*(?:(?P<blank>\n)\s*(?:#+[ \t]+)?|(?P<heading>#+[ \t]+))"  # blank-line runs and heading markers
+)
+# Stray markers left after stripping; underscores joining words are read as spaces
+_SPEECH_CHARS = {"*": "", "#": "", "~": "", "`": "", "_": " "}
+
+
+def _char_replacement(match) -> str:
+    return _CHARS[match.group(0)]
+
+
+@lru_cache(maxsize=None)
+def _nfc_candidates():
+    """
+    Pattern for the characters around which NFC can change a string.
+
+    Those are characters NFC always replaces (e.g. precomposed Devanagari
+    letters with nukta), characters that can compose with the one before
+    them (nukta, two-part Bengali and Tamil vowel signs, Latin combining
+    accents, Hangul jamo) and, conservatively, anything outside the BMP.
+    Built once from the unicodedata tables, in about 30 ms.
+    """
+    candidates = set(range(0x1161, 0x1176)) | set(range(0x11A8, 0x11C3))
+    for cp in range(0x10000):
+        decomposition = unicodedata.decomposition(chr(cp))
+        if decomposition and not decomposition.startswith("<"):
+            parts = decomposition.split()
+            if len(parts) == 2:
+                candidates.add(int(parts[1], 16))
+            if unicodedata.normalize("NFC", chr(cp)) != chr(cp):
+                candidates.add(cp)
+    # Ranges keep the class a bitmap; a list of single characters is searched linearly
+    ranges = []
+    for cp in sorted(candidates):
+        if ranges and ranges[-1][1] == cp - 1:
+            ranges[-1][1] = cp
+        else:
+            ranges.append([cp, cp])
+    body = "".join(f"\\u{a:04x}-\\u{b:04x}" for a, b in ranges)
+    return re.compile(f"[{body}\\U00010000-\\U0010ffff]")
+
+
+def _compose(text: str) -> str:
+    """
+    NFC-normalize the words of a string that contain a candidate character.
+
+    Twice as fast as normalizing Indic text whole, where nearly every
+    character would otherwise go through NFC's slow path.
+    """
+    pieces = []
+    last = 0
+    for match in _nfc_candidates().finditer(text):
+        if match.start() < last:
+            continue
+        start = max(last, text.rfind(" ", last, match.start()) + 1, text.rfind("\n", last, match.start()) + 1)
+        end_match = _WORD_END_RE.search(text, match.end())
+        end = end_match.start() if end_match else len(text)
+        pieces.append(text[last:start])
+        pieces.append(unicodedata.normalize("NFC", text[start:end]))
+        last = end
+    if not pieces:
+        return text
+    pieces.append(text[last:])
+    return "".join(pieces)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize extracted text.
+
+    Expands ligatures, drops soft hyphens, zero-width characters, carriage
+    returns and form feeds, turns tabs and Unicode spaces into plain
+    spaces, rejoins words hyphenated across a line break, removes trailing
+    spaces and collapses runs of spaces. Non-ASCII text is put in NFC form,
+    which gives Indic text with nukta and split vowel signs one canonical
+    spelling whether it came from a text layer or from OCR (marks are
+    reordered only within words that also contain a composing mark).
+    """
+    if not text:
+        return text
+    if text.isascii():
+        for char, replacement in _ASCII_CHARS.items():
+            if char in text:
+                text = text.replace(char, replacement)
+    else:
+        text = _compose(_CHAR_RE.sub(_char_replacement, text))
+    while " \n" in text:
+        text = text.replace(" \n", "\n")
+    if "-\n" in text:
+        text = _HYPHENATED_RE.sub(r"\1\n", text)
+    if "  " in text:
+        text = _SPACE_RUN_RE.sub(" ", text)
+    return text
+
+
+def normalize_pages(pages: Iterable[str]) -> Iterator[str]:
+    """
+    Normalize page texts one at a time as they are produced.
+
+    Pages are normalized independently, so a word hyphenated across a page
+    break stays split and page boundaries don't move.
+    """
+    for page in pages:
+        yield normalize_text(page)
+
+
+def _markdown_replacement(match) -> str:
+    group = match.lastgroup
+    if group is None:
+        return ""
+    if group == "blank":
+        return "\n\n"
+    if group == "heading":
+        return "\n"
+    return match.group(group)
+
+
+def strip_markdown(text: str) -> str:
+    """Remove markdown formatting (emphasis, headings, links, code) from text, keeping its line structure."""
+    return _MARKDOWN_RE.sub(_markdown_replacement, "\n" + text).strip()
+
+
+def speech_text(text: str) -> str:
+    """Text for speech synthesis: markdown removed and all whitespace collapsed to single spaces."""
+    text = strip_markdown(text)
+    for char, replacement in _SPEECH_CHARS.items():
+        if char in text:
+            text = text.replace(char, replacement)
+    return " ".join(text.split())
@@ -0,0 +1,313 @@
+import json
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from nlp.summarizer import deepseek_chat
+
+logger = logging.getLogger(__name__)
+
+# Role gazetteer: lower-cased surface form -> canonical role name.
+# Covers the usual Indian and English conveyancing, litigation and
+# employment vocabulary found in recitals and cause titles.
+ROLE_GAZETTEER = {
+    "lessor": "Lessor",
+    "lessee": "Lessee",
+    "landlord": "Landlord",
+    "landlady": "Landlord",
+    "tenant": "Tenant",
+    "licensor": "Licensor",
+    "licensee": "Licensee",
+    "vendor": "Vendor",
+    "vendee": "Vendee",
+    "seller": "Seller",
+    "buyer": "Buyer",
+    "purchaser": "Purchaser",
+    "mortgagor": "Mortgagor",
+    "mortgagee": "Mortgagee",
+    "borrower": "Borrower",
+    "lender": "Lender",
+    "guarantor": "Guarantor",
+    "surety": "Surety",
+    "donor": "Donor",
+    "donee": "Donee",
+    "executant": "Executant",
+    "testator": "Testator",
+    "testatrix": "Testatrix",
+    "executor": "Executor",
+    "beneficiary": "Beneficiary",
+    "assignor": "Assignor",
+    "assignee": "Assignee",
+    "employer": "Employer",
+    "employee": "Employee",
+    "company": "Company",
+    "contractor": "Contractor",
+    "sub-contractor": "Sub-Contractor",
+    "consultant": "Consultant",
+    "client": "Client",
+    "service provider": "Service Provider",
+    "developer": "Developer",
+    "owner": "Owner",
+    "allottee": "Allottee",
+    "promoter": "Promoter",
+    "partner": "Partner",
+    "principal": "Principal",
+    "agent": "Agent",
+    "attorney": "Attorney",
+    "power of attorney holder": "Power of Attorney Holder",
+    "deponent": "Deponent",
+    "petitioner": "Petitioner",
+    "respondent": "Respondent",
+    "appellant": "Appellant",
+    "plaintiff": "Plaintiff",
+    "defendant": "Defendant",
+    "complainant": "Complainant",
+    "accused": "Accused",
+    "applicant": "Applicant",
+    "opposite party": "Opposite Party",
+    "claimant": "Claimant",
+    "decree holder": "Decree Holder",
+    "judgment debtor": "Judgment Debtor",
+    "first party": "First Party",
+    "second party": "Second Party",
+    "party of the first part": "Party of the First Part",
+    "party of the second part": "Party of the Second Part",
+    "disclosing party": "Disclosing Party",
+    "receiving party": "Receiving Party",
+}
+
+_ROLE_ALTERNATION = "|".join(
+    re.escape(term).replace(r"\ ", r"\s+")
+    for term in sorted(ROLE_GAZETTEER, key=len, reverse=True)
+)
+
+_QUOTE = "[\"'“”‘’]"
+
+# "X, S/o Y, residing at ..., (hereinafter referred to as the "LESSOR", ...)"
+_HEREINAFTER_RE = re.compile(
+    r"\(?\s*hereinafter\s+(?:jointly\s+|collectively\s+|individually\s+)?"
+    r"(?:referred\s+to\s+as|called|termed|known\s+as|designated\s+as)\s+"
+    r"(?:the\s+)?" + _QUOTE + r"?\s*([A-Za-z][A-Za-z\s-]{1,40}?)\s*" + _QUOTE + r"?"
+    r"\s*(?=[,;)]|which|\.|\n|$)",
+    re.IGNORECASE,
+)
+
+# Short-form definitions: Acme Pvt. Ltd. (the "Company").
+# Only the role words ignore case; the name must be capitalised words.
+_SHORT_FORM_RE = re.compile(
+    r"([A-Z][\w.&'/-]*(?:\s+[A-Z][\w.&'/-]*){0,7})\s*\(\s*(?i:the\s+)?"
+    + _QUOTE + r"((?i:" + _ROLE_ALTERNATION + r"))" + _QUOTE + r"\s*\)",
+)
+
+# Cause titles: "Ramesh Kumar ....... Petitioner" / "State of Maharashtra  ...Respondent No. 1"
+_CAUSE_TITLE_RE = re.compile(
+    r"^[ \t]*(?:\d+\.\s*)?([A-Z][^\n.]{1,80}?)\s*(?:[.…_-]{2,}|\t|\s{3,})\s*"
+    r"((?i:" + _ROLE_ALTERNATION + r"))(?i:s?(?:\s+No\.?\s*\d+)?)\b",
+    re.MULTILINE,
+)
+
+# Leading party name of a recital segment, with Indian honorifics and entity suffixes.
+# Names stay on one line so a heading above the recital isn't swallowed, and stop before "S/o".
+_NAME_RE = re.compile(
+    r"(?:(?:Mr|Mrs|Ms|Miss|Smt|Shri|Sri|Shrimati|Kumari|Kum|Dr|Adv|M/s|Messrs)\.?[ \t]+)?"
+    r"[A-Z][A-Za-z.&'-]*(?:[ \t]+(?:[A-Z][A-Za-z.&'-]*(?!/)|&|of|and)){0,7}"
+    r"(?:[ \t]+(?:Pvt\.?[ \t]+Ltd\.?|Private[ \t]+Limited|Limited|Ltd\.?|LLP|Inc\.?|LLC))?"
+)
+
+# What follows a party name in a recital: "X, ...", "X (...)", "X S/o Y", "X residing at ..."
+_NAME_FOLLOWER_RE = re.compile(
+    r"\s*(?:[,(]|(?:S/o|D/o|W/o|C/o|son\s+of|daughter\s+of|wife\s+of|aged|residing|having|a\s+company)\b)",
+    re.IGNORECASE,
+)
+
+# Where a party description begins inside a recital.
+_SEGMENT_START_RE = re.compile(
+    r"(?:(?i:\bby\s+and\s+between\b|\bbetween\b|\bin\s+favour\s+of\b)|\bAND\b|;|\n\s*\n|:)",
+)
+
+_NAME_STOPWORDS = {"this", "the", "that", "whereas", "and", "also", "between", "agreement", "deed", "witnesseth"}
+
+_MAX_SEGMENT_CHARS = 600
+_MAX_MODEL_SPANS = 8
+
+_stats_lock = threading.Lock()
+_stats = {"documents": 0, "local_only": 0}
+
+
+def _clean_name(raw: str) -> Optional[str]:
+    """Trim a captured name and reject obvious non-names."""
+    words = re.sub(r"\s+", " ", raw).strip(" ,;:-\"'“”").split(" ")
+    while words and words[0].lower() in _NAME_STOPWORDS:
+        words.pop(0)
+    name = " ".join(words)
+    if len(name) < 3:
+        return None
+    return name
+
+
+def _canonical_role(raw: str) -> str:
+    key = re.sub(r"\s+", " ", raw).strip().lower()
+    return ROLE_GAZETTEER.get(key, key.title())
+
+
+def _gazetteer_role(raw: str) -> Optional[str]:
+    """Canonical role for a gazetteer term (singular or plural), or None for other defined terms."""
+    key = re.sub(r"\s+", " ", raw).strip().lower()
+    if key not in ROLE_GAZETTEER and key.endswith("s"):
+        key = key[:-1]
+    return ROLE_GAZETTEER.get(key)
+
+
+def _recital_segment(text: str, end: int) -> Tuple[int, str]:
+    """Return the start offset and text of the party description ending at `end`."""
+    window_start = max(0, end - _MAX_SEGMENT_CHARS)
+    window = text[window_start:end]
+    start = 0
+    for match in _SEGMENT_START_RE.finditer(window):
+        start = match.end()
+    return window_start + start, window[start:]
+
+
+def _recital_name(segment: str) -> Optional[str]:
+    """Pick the party name in a recital segment, skipping headings above it."""
+    candidates = list(_NAME_RE.finditer(segment))
+    for candidate in candidates:
+        if _NAME_FOLLOWER_RE.match(segment, candidate.end()):
+            name = _clean_name(candidate.group(0))
+            if name:
+                return name
+    return None
+
+
+def extract_parties_local(text: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    Extract (name, role) pairs with compiled patterns over the full text.
+
+    Args:
+        text: The full document text
+
+    Returns:
+        A tuple of (pairs, unresolved_spans). Unresolved spans are recital
+        fragments that define a role but whose party name could not be
+        identified locally.
+    """
+    pairs: Dict[str, str] = {}
+    unresolved: List[str] = []
+
+    for match in _HEREINAFTER_RE.finditer(text):
+        # "hereinafter referred to as" also defines terms like "the Said Premises"
+        role = _gazetteer_role(match.group(1))
+        if role is None:
+            continue
+        _, segment = _recital_segment(text, match.start())
+        name = _recital_name(segment)
+        if name:
+            pairs.setdefault(name, role)
+        else:
+            unresolved.append((segment + match.group(0)).strip())
+
+    for match in _SHORT_FORM_RE.finditer(text):
+        name = _clean_name(match.group(1))
+        if name:
+            pairs.setdefault(name, _canonical_role(match.group(2)))
+
+    for match in _CAUSE_TITLE_RE.finditer(text):
+        name = _clean_name(match.group(1))
+        if name:
+            pairs.setdefault(name, _canonical_role(match.group(2)))
+
+    return list(pairs.items()), unresolved
+
+
+def _parse_model_parties(content: str) -> List[Tuple[str, str]]:
+    """Parse the strict JSON reply: {"parties": [{"name": ..., "role": ...}]}."""
+    data = json.loads(content)
+    parties = data.get("parties") if isinstance(data, dict) else None
+    if not isinstance(parties, list):
+        raise ValueError("Response is missing a 'parties' list")
+
+    result = []
+    for item in parties:
+        if not isinstance(item, dict):
+            raise ValueError("Party entries must be objects")
+        name, role = item.get("name"), item.get("role")
+        if isinstance(name, str) and isinstance(role, str) and name.strip() and role.strip():
+            result.append((name.strip(), role.strip()))
+    return result
+
+
+def _resolve_with_model(spans: List[str]) -> List[Tuple[str, str]]:
+    """Ask the model to resolve only the spans the local pass could not."""
+    excerpt = "\n---\n".join(span[:_MAX_SEGMENT_CHARS] for span in spans[:_MAX_MODEL_SPANS])
+    messages = [
+        {
+            "role": "system",
+            "content": (
+                "You extract precise (name, role) pairs from legal documents. "
+                'Reply with JSON only, in the form {"parties": [{"name": "...", "role": "..."}]}. '
+                "Include only names with clearly stated roles."
+            )
+        },
+        {"role": "user", "content": f"Extract the parties from these excerpts:\n{excerpt}"}
+    ]
+    content = deepseek_chat(
+        messages,
+        temperature=0.3,
+        response_format={"type": "json_object"},
+        timeout=30
+    )
+    return _parse_model_parties(content)
+
+
+def extract_parties(text: str) -> List[Tuple[str, str]]:
+    """
+    Extract (name, role) pairs, calling the model only when the local pass can't.
+
+    The model sees the unresolved recital spans, or the opening of the
+    document when no party pattern matched at all.
+
+    Args:
+        text: The full document text
+
+    Returns:
+        List of (name, role) tuples, possibly empty
+    """
+    pairs, unresolved = extract_parties_local(text)
+    if not pairs and not unresolved:
+        unresolved = [text[:2000]]
+
+    used_model = False
+    if unresolved:
+        used_model = True
+        try:
+            known = {name for name, _ in pairs}
+            for name, role in _resolve_with_model(unresolved):
+                if name not in known:
+                    pairs.append((name, role))
+                    known.add(name)
+        except Exception as e:
+            logger.error(f"Model role extraction failed: {str(e)}")
+
+    with _stats_lock:
+        _stats["documents"] += 1
+        if not used_model:
+            _stats["local_only"] += 1
+    stats = get_extraction_stats()
+    logger.info(
+        f"Role extraction: {len(pairs)} parties, model {'used' if used_model else 'skipped'} "
+        f"({stats['local_only_fraction']:.0%} of {stats['documents']} documents needed no API call)"
+    )
+    return pairs
+
+
+def get_extraction_stats() -> Dict[str, float]:
+    """Return how many documents were resolved without an API call."""
+    with _stats_lock:
+        documents = _stats["documents"]
+        local_only = _stats["local_only"]
+    return {
+        "documents": documents,
+        "local_only": local_only,
+        "local_only_fraction": local_only / documents if documents else 0.0,
+    }
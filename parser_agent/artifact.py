@@ -0,0 +1,357 @@
+"""
+Binary artifact format for extracted documents.
+
+An artifact keeps what extraction knows about a document: the text,
+where each page starts and ends, where each stretch of text came from
+(text layer, page OCR, embedded-image OCR) and the structure index. Each
+page is compressed on its own, so a reader that maps the file can return
+one page by decompressing only that page's frame.
+
+Layout (all integers little-endian):
+
+    header     HEADER: magic "LLDA", version, codec, page and frame
+               counts, span count, text length in characters, and the
+               offset of each section below
+    frames     FRAME per frame: data offset, compressed and raw byte
+               sizes, character start and end in the document text
+    spans      SPAN per span: character start and end, source flags
+               (see parser_agent.parser), 1-based page
+    meta       UTF-8 JSON: language, source key
+    structure  compressed UTF-8 JSON list of structure index entries
+    data       compressed UTF-8 text of each frame
+
+Frames 0..page_count-1 are the pages; one more frame holds any text that
+follows the last page (text OCR'd from embedded images). Frames are
+compressed with zstd when the zstandard package is installed and zlib
+otherwise; LEGAL_LENS_ARTIFACT_CODEC picks one explicitly.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from common.config import get_env
+from common.tracing import span
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(get_env("LEGAL_LENS_CACHE_DIR", ".legal_lens_cache"))
+
+MAGIC = b"LLDA"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIIQQQQQQQ")
+FRAME = struct.Struct("<QIIQQ")
+SPAN = struct.Struct("<QQII")
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODECS = {"none": CODEC_NONE, "zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}
+ZSTD_LEVEL = int(get_env("LEGAL_LENS_ARTIFACT_ZSTD_LEVEL", "9"))
+ZLIB_LEVEL = 6
+# Stored artifacts are kept up to this many bytes, least recently read first out.
+MAX_STORE_BYTES = int(float(get_env("LEGAL_LENS_ARTIFACT_CACHE_MB", "1024")) * 1024 * 1024)
+# The store is measured at most this often; it is also how stale a last-read time may get.
+PRUNE_INTERVAL = 60.0
+
+
+class ArtifactError(Exception):
+    """A file is not a readable document artifact."""
+
+
+@lru_cache(maxsize=None)
+def _zstd():
+    """The optional zstandard bindings, or None; imported on first use."""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def default_codec() -> int:
+    name = get_env("LEGAL_LENS_ARTIFACT_CODEC", "").lower()
+    if name:
+        if name not in CODECS:
+            raise ValueError(f"Unknown artifact codec: {name}")
+        return CODECS[name]
+    return CODEC_ZSTD if _zstd() is not None else CODEC_ZLIB
+
+
+def _compress(data: bytes, codec: int) -> bytes:
+    if codec == CODEC_ZSTD:
+        return _zstd().ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, ZLIB_LEVEL)
+    return data
+
+
+def _decompress(data: bytes, codec: int, size: int = 0) -> bytes:
+    if codec == CODEC_ZSTD:
+        if _zstd() is None:
+            raise ArtifactError("Artifact is zstd-compressed but zstandard is not installed")
+        return _zstd().ZstdDecompressor().decompress(data, max_output_size=size)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    return bytes(data)
+
+
+def _frame_ranges(document) -> List[Tuple[int, int]]:
+    ranges = list(document.page_offsets) or [(0, 0)]
+    if ranges[-1][1] < len(document.text):
+        ranges.append((ranges[-1][1], len(document.text)))
+    return ranges
+
+
+def to_bytes(document, codec: Optional[int] = None) -> bytes:
+    """Serialize an ExtractedDocument as an artifact."""
+    codec = default_codec() if codec is None else codec
+    with span("artifact.write", codec=codec, pages=document.page_count) as s:
+        frames = []
+        for start, end in _frame_ranges(document):
+            raw = document.text[start:end].encode("utf-8")
+            frames.append((start, end, len(raw), _compress(raw, codec)))
+        meta = json.dumps({"language": document.language, "source_key": document.source_key}).encode("utf-8")
+        structure = _compress(json.dumps(document.structure.entries, ensure_ascii=False).encode("utf-8"), codec)
+
+        frames_offset = HEADER.size
+        spans_offset = frames_offset + FRAME.size * len(frames)
+        meta_offset = spans_offset + SPAN.size * len(document.spans)
+        structure_offset = meta_offset + len(meta)
+        data_offset = structure_offset + len(structure)
+
+        parts = [HEADER.pack(
+            MAGIC, VERSION, codec, document.page_count, len(frames), len(document.spans), len(document.text),
+            frames_offset, spans_offset, meta_offset, len(meta), structure_offset, len(structure)
+        )]
+        offset = data_offset
+        for start, end, raw_size, data in frames:
+            parts.append(FRAME.pack(offset, len(data), raw_size, start, end))
+            offset += len(data)
+        parts.extend(SPAN.pack(*entry) for entry in document.spans)
+        parts.append(meta)
+        parts.append(structure)
+        parts.extend(data for _, _, _, data in frames)
+        artifact = b"".join(parts)
+        s.set(bytes_out=len(artifact), chars=len(document.text))
+    return artifact
+
+
+def write_artifact(document, path, codec: Optional[int] = None):
+    """Write an artifact file; it appears complete or not at all."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(to_bytes(document, codec))
+    os.replace(tmp_path, path)
+
+
+class DocumentArtifact:
+    """
+    Read-only view of an artifact, from a file (memory-mapped) or bytes.
+
+    Offers the read side of ExtractedDocument (page_count, page_offsets,
+    page_text, pages_text, structure, language, source_key) without
+    loading the text: only the header is read on open, and each page is
+    decompressed when asked for. `text` and `to_document()` load it all.
+    """
+
+    def __init__(self, source):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._file = None
+            self._buffer = bytes(source)
+        else:
+            self._file = open(source, "rb")
+            try:
+                self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                self._file.close()
+                raise ArtifactError(f"{source} is empty")
+        if len(self._buffer) < HEADER.size:
+            self.close()
+            raise ArtifactError("Artifact is truncated")
+        (magic, version, self.codec, self.page_count, self.frame_count, self.span_count, self.text_length,
+         self._frames_offset, self._spans_offset, meta_offset, meta_length,
+         self._structure_offset, self._structure_length) = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ArtifactError(f"Not a version {VERSION} document artifact")
+        meta = json.loads(self._buffer[meta_offset:meta_offset + meta_length])
+        self.language = meta["language"]
+        self.source_key = meta["source_key"]
+        self._page_offsets = None
+        self._structure = None
+
+    def _frame(self, index: int) -> Tuple[int, int, int, int, int]:
+        return FRAME.unpack_from(self._buffer, self._frames_offset + FRAME.size * index)
+
+    def _frame_text(self, index: int) -> str:
+        offset, size, raw_size, _, _ = self._frame(index)
+        return _decompress(self._buffer[offset:offset + size], self.codec, raw_size).decode("utf-8")
+
+    @property
+    def page_offsets(self) -> List[Tuple[int, int]]:
+        if self._page_offsets is None:
+            self._page_offsets = [self._frame(i)[3:] for i in range(self.page_count)]
+        return self._page_offsets
+
+    def page_text(self, page: int) -> str:
+        """Return the text of a 1-based page, decompressing only that page."""
+        if not 1 <= page <= self.page_count:
+            raise IndexError(f"Page {page} out of range 1..{self.page_count}")
+        return self._frame_text(page - 1)
+
+    def pages_text(self, first: int, last: int) -> str:
+        """Return the text of 1-based pages first..last inclusive."""
+        first = max(1, first)
+        last = min(self.page_count, last)
+        return "".join(self._frame_text(i) for i in range(first - 1, last))
+
+    @property
+    def text(self) -> str:
+        """The whole document text, including text that follows the last page."""
+        return "".join(self._frame_text(i) for i in range(self.frame_count))
+
+    def spans(self, page: Optional[int] = None, source: int = 0) -> List[Tuple[int, int, int, int]]:
+        """(start, end, source flags, page) spans, optionally only one page's or those with any of `source`'s flags."""
+        result = []
+        for i in range(self.span_count):
+            entry = SPAN.unpack_from(self._buffer, self._spans_offset + SPAN.size * i)
+            if (page is None or entry[3] == page) and (not source or entry[2] & source):
+                result.append(entry)
+        return result
+
+    @property
+    def structure(self):
+        """The structure index, decoded on first use."""
+        if self._structure is None:
+            from parser_agent.structure import StructureIndex
+
+            data = self._buffer[self._structure_offset:self._structure_offset + self._structure_length]
+            entries = json.loads(_decompress(data, self.codec))
+            self._structure = StructureIndex(entries, self.page_offsets)
+        return self._structure
+
+    def to_document(self):
+        """Load the whole artifact as an ExtractedDocument."""
+        from parser_agent.parser import ExtractedDocument
+
+        return ExtractedDocument(
+            text=self.text, page_offsets=self.page_offsets, structure=self.structure,
+            language=self.language, source_key=self.source_key, spans=self.spans()
+        )
+
+    def close(self):
+        if self._file is not None:
+            if isinstance(self._buffer, mmap.mmap):
+                self._buffer.close()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def from_bytes(data: bytes):
+    """Load an artifact produced by to_bytes as an ExtractedDocument."""
+    return DocumentArtifact(data).to_document()
+
+
+class ArtifactStore:
+    """
+    Artifacts of extracted documents on disk, one file per document key.
+
+    Once the artifacts exceed `max_bytes`, the ones read least recently are
+    deleted; callers fall back to the corpus index for those.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = MAX_STORE_BYTES):
+        self.directory = Path(directory) if directory else CACHE_DIR / "artifacts"
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.llda"
+
+    def put(self, key: str, document) -> Path:
+        """Store a document's artifact, replacing any earlier one under the key."""
+        path = self.path(key)
+        write_artifact(document, path)
+        self.prune()
+        return path
+
+    def open(self, key: str) -> Optional[DocumentArtifact]:
+        """The stored artifact, memory-mapped, or None; close it when done."""
+        path = self.path(key)
+        try:
+            # The mtime records when the artifact was last read, for pruning
+            if time.time() - path.stat().st_mtime > PRUNE_INTERVAL:
+                os.utime(path)
+        except OSError:
+            return None
+        try:
+            return DocumentArtifact(path)
+        except (ArtifactError, OSError) as e:
+            logger.warning(f"Ignoring unreadable artifact {path.name}: {str(e)}")
+            return None
+
+    def load(self, key: str):
+        """The stored document as an ExtractedDocument, or None."""
+        artifact = self.open(key)
+        if artifact is None:
+            return None
+        with artifact:
+            return artifact.to_document()
+
+    def prune(self, force: bool = False) -> int:
+        """
+        Delete the least recently read artifacts until the store fits `max_bytes`.
+
+        Runs at most once per PRUNE_INTERVAL unless forced; the newest
+        artifact is always kept.
+
+        Returns:
+            Number of artifacts deleted
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_prune < PRUNE_INTERVAL:
+                return 0
+            self._last_prune = now
+
+        files = []
+        for path in self.directory.glob("*/*.llda"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files)[:-1]:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Pruned {removed} artifacts")
+        return removed
+
+
+@lru_cache(maxsize=None)
+def get_artifact_store() -> ArtifactStore:
+    """Process-wide artifact store."""
+    return ArtifactStore()
@@ -0,0 +1,205 @@
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import List
+
+from common.config import get_env
+from common.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Pages are OCR'd in groups of this size so a long scan never holds every page image at once.
+BATCH_SIZE = int(get_env("LEGAL_LENS_OCR_BATCH_SIZE", "16"))
+
+
+@lru_cache(maxsize=None)
+def _tesserocr():
+    """The optional tesserocr C API bindings, or None; imported on first use."""
+    try:
+        import tesserocr
+    except ImportError:
+        return None
+    return tesserocr
+
+
+def _tesseract_cmd() -> str:
+    import pytesseract
+
+    return pytesseract.pytesseract.tesseract_cmd
+
+
+class OCREngine(ABC):
+    """Base class for OCR backends."""
+
+    name = "base"
+
+    @abstractmethod
+    def image_to_string(self, image, lang: str = "eng") -> str:
+        """Text of one image, in a tesseract language spec such as "eng+hin"."""
+
+    def images_to_strings(self, images: List, lang: str = "eng") -> List[str]:
+        """OCR several images; backends that can amortize start-up override this."""
+        return [self.image_to_string(image, lang) for image in images]
+
+
+class PytesseractEngine(OCREngine):
+    """One tesseract process per image (the original behaviour)."""
+
+    name = "pytesseract"
+
+    def image_to_string(self, image, lang: str = "eng") -> str:
+        import pytesseract
+
+        with span("ocr.image", engine=self.name, lang=lang) as s:
+            text = pytesseract.image_to_string(image, lang=lang)
+            s.set(chars=len(text))
+        return text
+
+
+class TesserocrEngine(OCREngine):
+    """
+    Keeps an initialized tesseract instance alive per thread and language.
+
+    Language models are loaded once per worker thread instead of once per
+    image, and images are handed over in memory rather than via temp files.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self):
+        if _tesserocr() is None:
+            raise ImportError("tesserocr is not installed")
+        self._local = threading.local()
+
+    def _api(self, lang: str):
+        apis = getattr(self._local, "apis", None)
+        if apis is None:
+            apis = self._local.apis = {}
+        if lang not in apis:
+            apis[lang] = _tesserocr().PyTessBaseAPI(lang=lang)
+        return apis[lang]
+
+    def image_to_string(self, image, lang: str = "eng") -> str:
+        with span("ocr.image", engine=self.name, lang=lang) as s:
+            api = self._api(lang)
+            api.SetImage(image)
+            text = api.GetUTF8Text()
+            s.set(chars=len(text))
+        return text
+
+
+class BatchTesseractEngine(OCREngine):
+    """
+    Submits many images to a single tesseract invocation.
+
+    tesseract accepts a text file listing image paths and separates the
+    output pages with form feeds, so a batch pays the process start-up and
+    model load once.
+    """
+
+    name = "batch"
+
+    def __init__(self, tesseract_cmd: str = None):
+        self.tesseract_cmd = tesseract_cmd or _tesseract_cmd()
+
+    def image_to_string(self, image, lang: str = "eng") -> str:
+        return self.images_to_strings([image], lang)[0]
+
+    def images_to_strings(self, images: List, lang: str = "eng") -> List[str]:
+        if not images:
+            return []
+        with span("ocr.batch", engine=self.name, lang=lang, images=len(images)) as s:
+            with tempfile.TemporaryDirectory(prefix="legal_lens_ocr_") as tmp:
+                paths = []
+                for i, image in enumerate(images):
+                    path = os.path.join(tmp, f"{i:05d}.png")
+                    if image.mode not in ("1", "L", "P", "RGB", "RGBA"):
+                        image = image.convert("RGB")
+                    image.save(path)
+                    paths.append(path)
+                list_path = os.path.join(tmp, "images.txt")
+                with open(list_path, "w", encoding="utf-8") as f:
+                    f.write("\n".join(paths) + "\n")
+
+                result = subprocess.run(
+                    [self.tesseract_cmd, list_path, "stdout", "-l", lang],
+                    capture_output=True,
+                    check=True
+                )
+            pages = result.stdout.decode("utf-8", errors="replace").split("\f")
+            # One trailing separator follows the last page
+            if len(pages) == len(images) + 1 and not pages[-1].strip():
+                pages = pages[:-1]
+            if len(pages) != len(images):
+                logger.warning(f"Batch OCR returned {len(pages)} pages for {len(images)} images, retrying per image")
+                return PytesseractEngine().images_to_strings(images, lang)
+            s.set(chars=sum(len(p) for p in pages))
+        return pages
+
+
+class QueueOCREngine(OCREngine):
+    """
+    Sends images to OCR workers through the job queue (see workers/).
+
+    A batch is split into jobs that free workers on any node pick up at
+    once, so OCR throughput scales with the number of workers rather than
+    the cores of the UI host.
+    """
+
+    name = "queue"
+
+    def __init__(self):
+        from workers.queue import get_queue
+
+        if get_queue() is None:
+            raise ValueError("The queue OCR engine needs LEGAL_LENS_QUEUE to be set")
+
+    def image_to_string(self, image, lang: str = "eng") -> str:
+        return self.images_to_strings([image], lang)[0]
+
+    def images_to_strings(self, images: List, lang: str = "eng") -> List[str]:
+        from workers.client import ocr_images
+
+        if not images:
+            return []
+        with span("ocr.queue", engine=self.name, lang=lang, images=len(images)) as s:
+            texts = ocr_images(images, lang)
+            s.set(chars=sum(len(t) for t in texts))
+        return texts
+
+
+ENGINES = {
+    "pytesseract": PytesseractEngine,
+    "tesserocr": TesserocrEngine,
+    "batch": BatchTesseractEngine,
+    "queue": QueueOCREngine,
+}
+
+
+@lru_cache(maxsize=None)
+def get_ocr_engine(name: str = None) -> OCREngine:
+    """
+    Return the process-wide OCR engine.
+
+    The backend is chosen by name or LEGAL_LENS_OCR_ENGINE: "tesserocr",
+    "batch", "pytesseract", "queue" (OCR workers, see workers/) or "auto"
+    (the default), which prefers persistent tesserocr instances and falls
+    back to batched tesseract invocations.
+    """
+    name = (name or get_env("LEGAL_LENS_OCR_ENGINE", "auto")).lower()
+    if name == "auto":
+        if _tesserocr() is not None:
+            name = "tesserocr"
+        elif shutil.which(_tesseract_cmd()):
+            name = "batch"
+        else:
+            name = "pytesseract"
+    if name not in ENGINES:
+        raise ValueError(f"Unknown OCR engine: {name}")
+    logger.info(f"Using OCR engine: {name}")
+    return ENGINES[name]()
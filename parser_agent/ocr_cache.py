@@ -0,0 +1,250 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+from common.config import get_env
+from common.tracing import span
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(get_env("LEGAL_LENS_CACHE_DIR", ".legal_lens_cache"))
+
+# Hamming distance (out of 64 bits) under which a cached image is a candidate; hits also need identical pixels.
+DEFAULT_THRESHOLD = int(get_env("LEGAL_LENS_OCR_CACHE_THRESHOLD", "6"))
+DEFAULT_MAX_ENTRIES = int(get_env("LEGAL_LENS_OCR_CACHE_MAX_ENTRIES", "50000"))
+
+# Hashes are split into 8-bit bands; any two hashes within 7 bits share at least one band.
+BANDS = 8
+BAND_BITS = 64 // BANDS
+
+# Images smaller than this carry too little structure to hash reliably.
+MIN_IMAGE_SIDE = 24
+
+# Aspect ratios of matching images may differ by at most this fraction.
+ASPECT_TOLERANCE = 0.1
+
+
+def _dct_matrix(n: int):
+    """Orthonormal DCT-II basis."""
+    import numpy as np
+
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+@lru_cache(maxsize=None)
+def _tables():
+    """numpy plus the DCT basis and bit weights, built on the first hash so importing this module stays cheap."""
+    import numpy as np
+
+    bit_weights = (1 << np.arange(63, -1, -1, dtype=np.uint64)).astype(np.uint64)
+    return np, _dct_matrix(32), bit_weights
+
+
+def _bits_to_int(bits) -> int:
+    np, _, bit_weights = _tables()
+    return int(np.bitwise_or.reduce(bits.ravel().astype(np.uint64) * bit_weights))
+
+
+def dhash(image) -> int:
+    """64-bit difference hash: sign of horizontal gradients on a 9x8 thumbnail."""
+    np, _, _ = _tables()
+    pixels = np.asarray(image.convert("L").resize((9, 8)), dtype=np.int16)
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(image) -> int:
+    """64-bit perceptual hash: low-frequency DCT coefficients of a 32x32 thumbnail against their median."""
+    np, dct, _ = _tables()
+    pixels = np.asarray(image.convert("L").resize((32, 32)), dtype=np.float64)
+    coefficients = (dct @ pixels @ dct.T)[:8, :8]
+    values = coefficients.ravel()[1:]  # the DC term only reflects brightness
+    return _bits_to_int(np.concatenate(([False], values > np.median(values))))
+
+
+def pixel_digest(image) -> str:
+    """SHA-256 of an image's decoded pixels, so the same picture matches however it was encoded."""
+    header = f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("ascii")
+    return hashlib.sha256(header + image.tobytes()).hexdigest()
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _signed(value: int) -> int:
+    """SQLite integers are signed 64-bit."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class OCRCache:
+    """
+    Persistent OCR results keyed by perceptual image hash and OCR language.
+
+    Recurring seals, e-stamp papers and letterheads are recognised once per
+    deployment. Lookups find candidates whose pHash and dHash are both
+    within `threshold` bits, and return one only if its decoded pixels are
+    identical: scans of two different pages, or stamps with a different
+    amount, can be within a few bits of each other, and OCR text must never
+    move between documents on a near match. Rejected candidates are counted
+    as "rejected". Entries are evicted least recently used once the cache
+    exceeds `max_entries`.
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: int = DEFAULT_THRESHOLD,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        if threshold >= BANDS:
+            raise ValueError(f"threshold must be below {BANDS} for banded lookups")
+        self.path = str(path or CACHE_DIR / "ocr_cache.sqlite")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "rejected": 0, "inserts": 0, "evictions": 0}
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self):
+        band_columns = ", ".join(f"band{i} INTEGER NOT NULL" for i in range(BANDS))
+        with self._connection() as connection:
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(ocr_cache)")}
+            if columns and "digest" not in columns:
+                # Entries from before pixel digests can't be confirmed; start over
+                logger.info("Dropping OCR cache entries without pixel digests")
+                connection.execute("DROP TABLE ocr_cache")
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS ocr_cache ("
+                f"id INTEGER PRIMARY KEY, phash INTEGER NOT NULL, dhash INTEGER NOT NULL, "
+                f"lang TEXT NOT NULL, aspect REAL NOT NULL, digest TEXT NOT NULL, text TEXT NOT NULL, "
+                f"hits INTEGER NOT NULL DEFAULT 0, last_used REAL NOT NULL, {band_columns})"
+            )
+            for i in range(BANDS):
+                connection.execute(f"CREATE INDEX IF NOT EXISTS ocr_cache_band{i} ON ocr_cache (lang, band{i})")
+            connection.execute("CREATE INDEX IF NOT EXISTS ocr_cache_last_used ON ocr_cache (last_used)")
+
+    @staticmethod
+    def _bands(value: int):
+        mask = (1 << BAND_BITS) - 1
+        return [(value >> (i * BAND_BITS)) & mask for i in range(BANDS)]
+
+    @staticmethod
+    def cacheable(image) -> bool:
+        return min(image.size) >= MIN_IMAGE_SIDE
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def get(self, image, lang: str) -> Optional[str]:
+        """Return cached OCR text for a matching image, or None on a miss."""
+        if not self.cacheable(image):
+            return None
+        with span("cache.ocr", lang=lang) as s:
+            image_phash, image_dhash = phash(image), dhash(image)
+            aspect = image.size[0] / image.size[1]
+            bands = self._bands(image_phash)
+            where = " OR ".join(f"band{i} = ?" for i in range(BANDS))
+            connection = self._connection()
+            rows = connection.execute(
+                f"SELECT id, phash, dhash, aspect, digest, text FROM ocr_cache WHERE lang = ? AND ({where})",
+                [lang, *bands]
+            ).fetchall()
+
+            digest = None
+            best = None
+            rejected = 0
+            for row_id, row_phash, row_dhash, row_aspect, row_digest, text in rows:
+                if abs(row_aspect - aspect) > ASPECT_TOLERANCE * aspect:
+                    continue
+                if (hamming(_unsigned(row_phash), image_phash) > self.threshold
+                        or hamming(_unsigned(row_dhash), image_dhash) > self.threshold):
+                    continue
+                digest = digest or pixel_digest(image)
+                if row_digest != digest:
+                    rejected += 1
+                    continue
+                best = (row_id, text)
+                break
+
+            self._count("lookups")
+            self._count("rejected", rejected)
+            s.set(cache_hit=best is not None, candidates=len(rows), rejected=rejected)
+            if best is None:
+                return None
+
+            self._count("hits")
+            with connection:
+                connection.execute(
+                    "UPDATE ocr_cache SET hits = hits + 1, last_used = ? WHERE id = ?",
+                    (time.time(), best[0])
+                )
+            return best[1]
+
+    def put(self, image, lang: str, text: str):
+        """Store the OCR text of an image, evicting least recently used entries when full."""
+        if not self.cacheable(image):
+            return
+        image_phash = phash(image)
+        row = [
+            _signed(image_phash), _signed(dhash(image)), lang, image.size[0] / image.size[1],
+            pixel_digest(image), text, time.time(), *self._bands(image_phash)
+        ]
+        band_names = ", ".join(f"band{i}" for i in range(BANDS))
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                f"INSERT INTO ocr_cache (phash, dhash, lang, aspect, digest, text, last_used, {band_names}) "
+                f"VALUES ({', '.join('?' * len(row))})",
+                row
+            )
+            self._count("inserts")
+            (count,) = connection.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()
+            if count > self.max_entries:
+                # Evict a tenth at a time so eviction isn't paid on every insert
+                excess = count - self.max_entries + self.max_entries // 10
+                connection.execute(
+                    "DELETE FROM ocr_cache WHERE id IN (SELECT id FROM ocr_cache ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+                self._count("evictions", excess)
+
+    def stats(self) -> Dict[str, float]:
+        """Lookup, hit, rejected-candidate, insert and eviction counts plus the hit rate since start-up."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        (stats["entries"],) = self._connection().execute("SELECT COUNT(*) FROM ocr_cache").fetchone()
+        return stats
+
+
+@lru_cache(maxsize=None)
+def get_ocr_cache() -> Optional[OCRCache]:
+    """Process-wide OCR cache, or None when disabled with LEGAL_LENS_OCR_CACHE=0."""
+    if get_env("LEGAL_LENS_OCR_CACHE", "1").lower() in ("0", "false", "no"):
+        return None
+    try:
+        return OCRCache()
+    except (sqlite3.Error, OSError) as e:
+        logger.error(f"OCR cache unavailable: {str(e)}")
+        return None
@@ -1,15 +1,144 @@
-import fitz
 import logging
-import pytesseract
-from PIL import Image
+import hashlib
 import io
 import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from common.tracing import span
+from nlp.normalizer import normalize_pages, normalize_text
+from parser_agent.ocr import BATCH_SIZE, get_ocr_engine
+from parser_agent.ocr_cache import get_ocr_cache
+from parser_agent.script_detection import (
+    PageLanguageSelector, detect_script_from_text, ocr_languages_enabled, tesseract_languages
+)
+from parser_agent.structure import StructureIndex, build_structure_index
 
 logger = logging.getLogger(__name__)
 
+# Source flags of text spans: where each stretch of the extracted text came from
+TEXT_LAYER = 1   # the PDF's own text layer
+PAGE_OCR = 2     # OCR of a whole page (scans and image files)
+IMAGE_OCR = 4    # OCR of an image embedded in a page
+MARKER = 8       # text inserted by extraction, such as "[Text from image on page N]:"
+
+# Embedded images covering at least this share of their page are page content
+# (a scan, a pasted page), not a recurring stamp or letterhead, and skip the OCR cache
+MAX_CACHED_IMAGE_COVERAGE = 0.5
+
+
+@dataclass
+class ExtractedDocument:
+    """Extracted text plus the page offset map and structure index built in the same pass."""
+    text: str
+    page_offsets: List[Tuple[int, int]]
+    structure: StructureIndex
+    language: str = "English"  # detected document language, suggested as the summary language
+    source_key: Optional[str] = None  # sha256 of the source PDF, used to render page thumbnails
+    # (start, end, source flags, 1-based page) of each stretch of text; empty when unknown
+    spans: List[Tuple[int, int, int, int]] = field(default_factory=list)
+
+    @property
+    def page_count(self):
+        return len(self.page_offsets)
+
+    def page_text(self, page):
+        """Return the text of a 1-based page."""
+        start, end = self.page_offsets[page - 1]
+        return self.text[start:end]
+
+    def pages_text(self, first, last):
+        """Return the text of 1-based pages first..last inclusive in one slice."""
+        first = max(1, first)
+        last = min(self.page_count, last)
+        if first > last:
+            return ""
+        return self.text[self.page_offsets[first - 1][0]:self.page_offsets[last - 1][1]]
+
+    def search(self, query: str, limit: int = 50, context: int = 40) -> List[Dict]:
+        """
+        Case-insensitive search over the document text.
+
+        Returns:
+            Up to `limit` hits as {"page", "offset", "snippet"} in document order
+        """
+        if not query.strip():
+            return []
+        hits = []
+        for match in re.finditer(re.escape(query.strip()), self.text, re.IGNORECASE):
+            start = match.start()
+            snippet = self.text[max(0, start - context):match.end() + context].replace("\n", " ")
+            hits.append({"page": self.structure.page_of(start), "offset": start, "snippet": snippet})
+            if len(hits) >= limit:
+                break
+        return hits
+
+
+def _ocr_images(engine, images, selector=None, cache=None):
+    """
+    OCR images in one engine call per language set.
+
+    The selector chooses each image's languages; with a cache, images that
+    match a previously recognised one are answered without OCR.
+    """
+    if selector is None and cache is None:
+        return engine.images_to_strings(images)
+
+    packs = [selector.pack_for_page(image) for image in images] if selector else ["eng"] * len(images)
+    texts = [None] * len(images)
+    for pack in dict.fromkeys(packs):
+        lang = tesseract_languages(pack) if selector else "eng"
+        indexes = [i for i, p in enumerate(packs) if p == pack]
+        if cache:
+            for i in indexes:
+                texts[i] = cache.get(images[i], lang)
+        pending = [i for i in indexes if texts[i] is None]
+        if pending:
+            group_texts = engine.images_to_strings([images[i] for i in pending], lang=lang)
+            for i, text in zip(pending, group_texts):
+                texts[i] = text
+                if cache:
+                    cache.put(images[i], lang, text)
+        if selector:
+            for i in indexes:
+                selector.observe(pack, texts[i])
+    return texts
+
+
+def _ocr_embedded_images(engine, batch, selector=None):
+    """OCR embedded images, using the OCR cache only for those too small to be page content."""
+    cache = get_ocr_cache()
+    texts = [None] * len(batch)
+    for cached in (True, False):
+        indexes = [i for i, img_data in enumerate(batch)
+                   if (img_data["coverage"] < MAX_CACHED_IMAGE_COVERAGE) == cached]
+        if indexes:
+            group_texts = _ocr_images(engine, [batch[i]["image"] for i in indexes], selector,
+                                      cache if cached else None)
+            for i, text in zip(indexes, group_texts):
+                texts[i] = text
+    return texts
+
+
+def _image_coverage(page, xref) -> float:
+    """Largest share of the page area one placement of an image covers; 1.0 when unknown."""
+    page_area = abs(page.rect)
+    try:
+        rects = page.get_image_rects(xref)
+    except Exception:
+        rects = []
+    if not rects or not page_area:
+        return 1.0
+    return max(abs(rect & page.rect) for rect in rects) / page_area
+
+
 def extract_images_from_pdf(pdf_file):
     """Extract images from PDF pages."""
     try:
+        import fitz
+        from PIL import Image
+
         doc = fitz.open(stream=pdf_file.read(), filetype="pdf")
         images = []
         
@@ -38,11 +167,14 @@ def extract_images_from_pdf(pdf_file):
 def extract_text_from_image(image_file):
     """Extract text from an image file using OCR."""
     try:
+        from PIL import Image
+
         # Read the image file
         image = Image.open(image_file)
         
         # Perform OCR
-        text = pytesseract.image_to_string(image)
+        selector = PageLanguageSelector() if ocr_languages_enabled() else None
+        text = normalize_text(_ocr_images(get_ocr_engine(), [image], selector)[0])
         
         if not text.strip():
             raise Exception("No text could be extracted from the image. Please ensure the image is clear and readable.")
@@ -52,45 +184,212 @@ def extract_text_from_image(image_file):
         logger.error(f"Image OCR failed: {str(e)}")
         raise Exception(f"Failed to extract text from image: {str(e)}")
 
-def extract_text_from_pdf(file):
-    """Extract text from a PDF file."""
+def _page_lines_from_dict(page_dict, page_number, page_start):
+    """Rebuild a page's text from `page.get_text("dict")` along with per-line layout records."""
+    layout_lines = [
+        line.get("spans", [])
+        for block in page_dict.get("blocks", []) if block.get("type") == 0
+        for line in block.get("lines", [])
+    ]
+    # Normalized as one string; normalization keeps the line count, so lines still match their spans
+    raw = "".join("".join(span["text"] for span in spans) + "\n" for spans in layout_lines)
+    page_text = normalize_text(raw)
+    lines = []
+    offset = page_start
+    for line_text, spans in zip(page_text.split("\n"), layout_lines):
+        if line_text.strip():
+            lines.append({
+                "text": line_text,
+                "start": offset,
+                "page": page_number,
+                "size": max(span["size"] for span in spans),
+                "bold": all(span["flags"] & 16 or "Bold" in span["font"] for span in spans if span["text"].strip())
+            })
+        offset += len(line_text) + 1
+    return page_text, lines
+
+
+def _page_lines_from_text(page_text, page_number, page_start):
+    """Line records for OCR text, which carries no font information."""
+    lines = []
+    offset = page_start
+    for line_text in page_text.split("\n"):
+        if line_text.strip():
+            lines.append({"text": line_text, "start": offset, "page": page_number})
+        offset += len(line_text) + 1
+    return lines
+
+
+def extract_document_from_pdf(file):
+    """Extract text, page offsets and a structure index from a PDF file in one page pass."""
     try:
-        doc = fitz.open(stream=file.read(), filetype="pdf")
-        text = ""
-        
-        # First try to extract text directly
-        for page in doc:
-            text += page.get_text()
-        
+        # Imported here so importing the parser (e.g. from the UI script) stays cheap
+        import fitz
+        from PIL import Image
+
+        data = file.read()
+        doc = fitz.open(stream=data, filetype="pdf")
+        source_key = hashlib.sha256(data).hexdigest()
+        selector = PageLanguageSelector(source_key) if ocr_languages_enabled() else None
+        page_texts = []
+        page_lines = []
+        page_images = []
+        offset = 0
+
+        # First try to extract text directly, collecting layout and images in the same pass
+        for page_num, page in enumerate(doc):
+            with span("extract.page", page=page_num + 1) as s:
+                page_text, lines = _page_lines_from_dict(page.get_text("dict"), page_num + 1, offset)
+                page_texts.append(page_text)
+                page_lines.append(lines)
+                offset += len(page_text)
+
+                for img_index, img in enumerate(page.get_images()):
+                    try:
+                        base_image = doc.extract_image(img[0])
+                        page_images.append({
+                            "image": Image.open(io.BytesIO(base_image["image"])),
+                            "page": page_num + 1,
+                            "index": img_index,
+                            "coverage": _image_coverage(page, img[0])
+                        })
+                    except Exception as e:
+                        logger.error(f"Failed to extract image {img_index} on page {page_num + 1}: {str(e)}")
+                s.set(chars=len(page_text))
+
         # If no text is found or text is minimal, try OCR on the pages
-        if not text.strip() or len(text.strip()) < 100:  # Arbitrary threshold
+        scanned = sum(len(t.strip()) for t in page_texts) < 100  # Arbitrary threshold
+        if not scanned:
+            pack, language = detect_script_from_text("".join(page_texts)[:200000])
+            if selector:
+                # Embedded images of a text-layer document share its language
+                selector.seed(pack)
+        else:
             logger.info("Minimal text found, attempting OCR on pages...")
-            text = ""
-            for page in doc:
-                pix = page.get_pixmap()
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                text += pytesseract.image_to_string(img) + "\n"
-        
+            # Page OCR reads the embedded scans too; OCR'ing them again would repeat every page
+            page_images = []
+            page_texts = []
+            page_lines = []
+            offset = 0
+            engine = get_ocr_engine()
+            for batch_start in range(0, len(doc), BATCH_SIZE):
+                batch_pages = range(batch_start, min(batch_start + BATCH_SIZE, len(doc)))
+                images = []
+                for page_num in batch_pages:
+                    pix = doc[page_num].get_pixmap()
+                    images.append(Image.frombytes("RGB", [pix.width, pix.height], pix.samples))
+                for page_num, ocr_text in zip(batch_pages, normalize_pages(_ocr_images(engine, images, selector))):
+                    page_text = ocr_text + "\n"
+                    page_texts.append(page_text)
+                    page_lines.append(_page_lines_from_text(page_text, page_num + 1, offset))
+                    offset += len(page_text)
+
+        text = "".join(page_texts)
+        page_offsets = []
+        spans = []
+        start = 0
+        for page_num, page_text in enumerate(page_texts, start=1):
+            page_offsets.append((start, start + len(page_text)))
+            if page_text:
+                spans.append((start, start + len(page_text), PAGE_OCR if scanned else TEXT_LAYER, page_num))
+            start += len(page_text)
+
         # Extract text from embedded images
-        images = extract_images_from_pdf(file)
-        if images:
-            logger.info(f"Found {len(images)} images in PDF, extracting text...")
-            for img_data in images:
+        if page_images:
+            logger.info(f"Found {len(page_images)} images in PDF, extracting text...")
+            engine = get_ocr_engine()
+            for batch_start in range(0, len(page_images), BATCH_SIZE):
+                batch = page_images[batch_start:batch_start + BATCH_SIZE]
                 try:
-                    img_text = pytesseract.image_to_string(img_data["image"])
-                    if img_text.strip():
-                        text += f"\n[Text from image on page {img_data['page']}]:\n{img_text}\n"
+                    img_texts = _ocr_embedded_images(engine, batch, selector)
                 except Exception as e:
-                    logger.error(f"Failed to extract text from image on page {img_data['page']}: {str(e)}")
-        
+                    logger.warning(f"OCR of images on pages {batch[0]['page']}-{batch[-1]['page']} failed, retrying one by one: {str(e)}")
+                    img_texts = []
+                    for img_data in batch:
+                        # One unreadable image costs only its own text
+                        try:
+                            img_texts.extend(_ocr_embedded_images(engine, [img_data], selector))
+                        except Exception as e:
+                            logger.error(f"Failed to extract text from image {img_data['index']} on page {img_data['page']}: {str(e)}")
+                            img_texts.append("")
+                for img_data, img_text in zip(batch, img_texts):
+                    if img_text.strip():
+                        marker = f"\n[Text from image on page {img_data['page']}]:\n"
+                        body = f"{normalize_text(img_text)}\n"
+                        spans.append((len(text), len(text) + len(marker), IMAGE_OCR | MARKER, img_data["page"]))
+                        spans.append((len(text) + len(marker), len(text) + len(marker) + len(body), IMAGE_OCR, img_data["page"]))
+                        text += marker + body
+
         if not text.strip():
             raise Exception("No text could be extracted from the document. Please ensure the document is clear and readable.")
-            
-        return text
+
+        lines = [line for lines_on_page in page_lines for line in lines_on_page]
+        structure = build_structure_index(lines, page_offsets, len(text))
+        if scanned:
+            language = selector.dominant_language() if selector else "English"
+        logger.info(f"Extracted {len(page_offsets)} pages with {len(structure.entries)} structure entries ({language})")
+        return ExtractedDocument(
+            text=text, page_offsets=page_offsets, structure=structure, language=language,
+            source_key=source_key, spans=spans
+        )
     except Exception as e:
         logger.error(f"PDF extraction failed: {str(e)}")
         raise Exception(f"Failed to extract text from document: {str(e)}")
 
+def extract_text_from_pdf(file):
+    """Extract text from a PDF file."""
+    return extract_document_from_pdf(file).text
+
+def extract_document_from_image(image_file):
+    """Extract text and a structure index from an image file using OCR."""
+    text = extract_text_from_image(image_file)
+    page_offsets = [(0, len(text))]
+    structure = build_structure_index(_page_lines_from_text(text, 1, 0), page_offsets, len(text))
+    language = detect_script_from_text(text)[1]
+    return ExtractedDocument(
+        text=text, page_offsets=page_offsets, structure=structure, language=language,
+        spans=[(0, len(text), PAGE_OCR, 1)]
+    )
+
+def document_from_pages(page_texts: List[str], language: str = "English", source_key: Optional[str] = None):
+    """
+    Rebuild a document from stored page texts, such as the pages kept by the corpus index.
+
+    The structure index is rebuilt from the text alone, as for OCR output,
+    since font information isn't stored.
+    """
+    page_offsets = []
+    lines = []
+    start = 0
+    for page_number, page_text in enumerate(page_texts, start=1):
+        lines.extend(_page_lines_from_text(page_text, page_number, start))
+        page_offsets.append((start, start + len(page_text)))
+        start += len(page_text)
+    text = "".join(page_texts)
+    structure = build_structure_index(lines, page_offsets, len(text))
+    return ExtractedDocument(
+        text=text, page_offsets=page_offsets, structure=structure, language=language, source_key=source_key
+    )
+
+def extract_document(file):
+    """Main function to extract a structured document from either PDF or image files."""
+    try:
+        file_extension = os.path.splitext(file.name)[1].lower()
+
+        with span("extract.document", type=file_extension, bytes_out=getattr(file, "size", 0)) as s:
+            if file_extension == '.pdf':
+                document = extract_document_from_pdf(file)
+            elif file_extension in ['.png', '.jpg', '.jpeg', '.tiff', '.bmp']:
+                document = extract_document_from_image(file)
+            else:
+                raise Exception(f"Unsupported file type: {file_extension}")
+            s.set(pages=document.page_count, chars=len(document.text))
+        return document
+
+    except Exception as e:
+        logger.error(f"Document extraction failed: {str(e)}")
+        raise Exception(f"Failed to process document: {str(e)}")
+
 def extract_text(file):
     """Main function to extract text from either PDF or image files."""
     try:
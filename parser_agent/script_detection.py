@@ -0,0 +1,165 @@
+import logging
+import threading
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from common.config import get_env
+from common.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Script -> (tesseract language pack, language name used by the UI)
+SCRIPT_LANGUAGES = {
+    "Latin": ("eng", "English"),
+    "Devanagari": ("hin", "Hindi"),
+    "Bengali": ("ben", "Bengali"),
+    "Tamil": ("tam", "Tamil"),
+    "Telugu": ("tel", "Telugu"),
+}
+PACK_LANGUAGES = {pack: name for pack, name in SCRIPT_LANGUAGES.values()}
+PACK_LANGUAGES["mar"] = "Marathi"
+
+# Unicode blocks of the scripts we OCR
+_SCRIPT_RANGES = (
+    (0x0900, 0x097F, "Devanagari"),
+    (0x0980, 0x09FF, "Bengali"),
+    (0x0B80, 0x0BFF, "Tamil"),
+    (0x0C00, 0x0C7F, "Telugu"),
+)
+
+# "ळ" and the copula "आहे" are far more frequent in Marathi than in Hindi
+_MARATHI_MARKERS = ("ळ", "आहे", "च्या")
+
+# After this many consecutive pages agree, later pages reuse the choice without OSD.
+STABLE_PAGES = 3
+MAX_CACHED_DOCUMENTS = 256
+
+_document_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def detect_script_from_text(text: str) -> Tuple[str, str]:
+    """
+    Classify text by Unicode block counts.
+
+    Returns:
+        (tesseract language pack, language name), e.g. ("mar", "Marathi")
+    """
+    counts = Counter()
+    latin = 0
+    for char in text:
+        code = ord(char)
+        if code < 0x0250:
+            if char.isalpha():
+                latin += 1
+            continue
+        for low, high, script in _SCRIPT_RANGES:
+            if low <= code <= high:
+                counts[script] += 1
+                break
+
+    if not counts or counts.most_common(1)[0][1] < latin * 0.2:
+        return "eng", "English"
+    script = counts.most_common(1)[0][0]
+    if script == "Devanagari" and sum(text.count(marker) for marker in _MARATHI_MARKERS) * 200 > counts[script]:
+        return "mar", "Marathi"
+    return SCRIPT_LANGUAGES[script]
+
+
+@lru_cache(maxsize=None)
+def installed_languages() -> frozenset:
+    import pytesseract
+
+    try:
+        return frozenset(pytesseract.get_languages(config=""))
+    except Exception as e:
+        logger.warning(f"Could not list tesseract languages: {str(e)}")
+        return frozenset({"eng"})
+
+
+def tesseract_languages(pack: str) -> str:
+    """Smallest installed language set for a page: the script's pack plus English for bilingual documents."""
+    packs = [pack] if pack == "eng" else [pack, "eng"]
+    available = [p for p in packs if p in installed_languages()]
+    return "+".join(available) or "eng"
+
+
+def detect_script(image) -> Optional[str]:
+    """Detect the dominant script of a page image with tesseract OSD."""
+    import pytesseract
+
+    with span("ocr.osd") as s:
+        try:
+            osd = pytesseract.image_to_osd(image, output_type=pytesseract.Output.DICT)
+        except pytesseract.TesseractError as e:
+            logger.debug(f"OSD failed: {str(e)}")
+            return None
+        s.set(script=osd.get("script"), confidence=osd.get("script_conf"))
+    return osd.get("script")
+
+
+class PageLanguageSelector:
+    """
+    Picks the tesseract language set for each page of one document.
+
+    OSD runs until STABLE_PAGES consecutive pages agree; later pages reuse
+    that choice. The dominant pack is remembered per document key so a
+    re-upload skips detection entirely.
+    """
+
+    def __init__(self, document_key: Optional[str] = None):
+        self.document_key = document_key
+        self.pack_chars = Counter()
+        self._recent = []
+        with _cache_lock:
+            self._cached_pack = _document_cache.get(document_key) if document_key else None
+            if self._cached_pack:
+                _document_cache.move_to_end(document_key)
+
+    def seed(self, pack: str):
+        """Use a known language pack for every page, e.g. one detected from the text layer."""
+        self._cached_pack = pack
+
+    def _current_pack(self) -> Optional[str]:
+        if self._cached_pack:
+            return self._cached_pack
+        if len(self._recent) >= STABLE_PAGES and len(set(self._recent[-STABLE_PAGES:])) == 1:
+            return self._recent[-1]
+        return None
+
+    def pack_for_page(self, image) -> str:
+        """Return the language pack for a page image (before OCR)."""
+        pack = self._current_pack()
+        if pack is None:
+            script = detect_script(image)
+            pack = SCRIPT_LANGUAGES.get(script, ("eng", "English"))[0]
+            self._recent.append(pack)
+        return pack
+
+    def observe(self, pack: str, text: str):
+        """Record a page's OCR output; Devanagari pages are refined to Marathi here."""
+        if pack == "hin":
+            refined, _ = detect_script_from_text(text)
+            if refined == "mar":
+                pack = "mar"
+                self._recent = [("mar" if p == "hin" else p) for p in self._recent]
+        self.pack_chars[pack] += len(text.strip())
+
+    def dominant_language(self) -> str:
+        """UI language name of the pack that produced the most text."""
+        if not self.pack_chars:
+            return "English"
+        pack = self.pack_chars.most_common(1)[0][0]
+        if self.document_key:
+            with _cache_lock:
+                _document_cache[self.document_key] = pack
+                _document_cache.move_to_end(self.document_key)
+                while len(_document_cache) > MAX_CACHED_DOCUMENTS:
+                    _document_cache.popitem(last=False)
+        return PACK_LANGUAGES.get(pack, "English")
+
+
+def ocr_languages_enabled() -> bool:
+    """Script detection can be switched off to force English-only OCR."""
+    return get_env("LEGAL_LENS_OCR_SCRIPT_DETECTION", "1").lower() not in ("0", "false", "no")
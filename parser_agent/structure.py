@@ -0,0 +1,159 @@
+import bisect
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Entry levels: lower numbers enclose higher ones.
+LEVEL_APPENDIX = 0
+LEVEL_HEADING = 1
+LEVEL_CLAUSE = 2
+
+_ORDINALS = r"FIRST|SECOND|THIRD|FOURTH|FIFTH|SIXTH|SEVENTH|EIGHTH|NINTH|TENTH"
+
+_SCHEDULE_RE = re.compile(
+    r"^(?:THE\s+)?(?:(" + _ORDINALS + r")\s+)?SCHEDULE(?:\s*[-–:]?\s*([IVXLC]+|\d+|[A-Z])\b)?",
+    re.IGNORECASE,
+)
+_ANNEXURE_RE = re.compile(
+    r"^(ANNEXURE|ANNEX|APPENDIX|EXHIBIT)\s*[-–:]?\s*([IVXLC]+|\d+|[A-Z])?\b",
+    re.IGNORECASE,
+)
+_CLAUSE_RE = re.compile(
+    r"^(?:(?i:CLAUSE|SECTION|ARTICLE)\s+)?(\d{1,3}(?:\.\d{1,3}){0,3})(?:[.)]|\s*[-–:])?\s+([A-Z(\"“].{0,200})?$"
+)
+
+_MAX_HEADING_CHARS = 120
+_HEADING_SIZE_RATIO = 1.15
+
+
+def _normalize_label(label: str) -> str:
+    return re.sub(r"\s+", " ", label).strip().lower()
+
+
+def _body_font_size(lines: List[Dict]) -> Optional[float]:
+    """Character-weighted most common font size among lines that carry one."""
+    weights: Dict[float, int] = {}
+    for line in lines:
+        if line.get("size"):
+            size = round(line["size"], 1)
+            weights[size] = weights.get(size, 0) + len(line["text"])
+    if not weights:
+        return None
+    return max(weights, key=weights.get)
+
+
+def _classify_line(line: Dict, body_size: Optional[float]) -> Optional[Dict]:
+    """Return a partial structure entry for a line, or None for body text."""
+    text = line["text"].strip()
+    if not text or len(text) > 240:
+        return None
+
+    match = _SCHEDULE_RE.match(text)
+    if match and (match.group(1) or match.group(2) or text.isupper()):
+        ordinal = match.group(1) or ""
+        number = match.group(2) or ""
+        label = " ".join(part for part in (ordinal.title(), "Schedule", number.upper()) if part)
+        return {"kind": "schedule", "label": label, "title": text, "level": LEVEL_APPENDIX}
+
+    match = _ANNEXURE_RE.match(text)
+    if match and (match.group(2) or text.isupper()):
+        label = f"{match.group(1).title()} {(match.group(2) or '').upper()}".strip()
+        return {"kind": "annexure", "label": label, "title": text, "level": LEVEL_APPENDIX}
+
+    match = _CLAUSE_RE.match(text)
+    if match:
+        number = match.group(1)
+        return {
+            "kind": "clause",
+            "label": number,
+            "title": (match.group(2) or "").strip()[:_MAX_HEADING_CHARS],
+            "level": LEVEL_CLAUSE + number.count("."),
+        }
+
+    if len(text) <= _MAX_HEADING_CHARS and not text.endswith((",", ";")):
+        larger = bool(body_size and line.get("size") and line["size"] >= body_size * _HEADING_SIZE_RATIO)
+        bold_caps = bool(line.get("bold")) and text.isupper() and len(text) > 3
+        if larger or bold_caps:
+            return {"kind": "heading", "label": text, "title": text, "level": LEVEL_HEADING}
+    return None
+
+
+class StructureIndex:
+    """
+    Headings, numbered clauses, schedules and annexures of an extracted document.
+
+    Each entry is a dict with kind, label, title, level, start, end and page
+    (1-based); start/end are character offsets into the document text, so a
+    section can be sliced without rescanning the text.
+    """
+
+    def __init__(self, entries: List[Dict], page_offsets: List[Tuple[int, int]]):
+        self.entries = entries
+        self.page_offsets = page_offsets
+        self._page_starts = [start for start, _ in page_offsets]
+        self._by_label: Dict[str, Dict] = {}
+        for entry in entries:
+            for key in self._label_keys(entry):
+                self._by_label.setdefault(key, entry)
+
+    @staticmethod
+    def _label_keys(entry: Dict) -> List[str]:
+        label = _normalize_label(entry["label"])
+        if entry["kind"] == "clause":
+            return [label, f"clause {label}", f"section {label}", f"article {label}"]
+        return [label]
+
+    def find(self, label: str) -> Optional[Dict]:
+        """Look up an entry by label, e.g. "12", "clause 12.1", "schedule i", "annexure a"."""
+        return self._by_label.get(_normalize_label(label))
+
+    def slice(self, text: str, label: str) -> Optional[str]:
+        """Return the text of the section with the given label, or None."""
+        entry = self.find(label)
+        if entry is None:
+            return None
+        return text[entry["start"]:entry["end"]]
+
+    def page_of(self, offset: int) -> int:
+        """Return the 1-based page containing a character offset."""
+        if not self._page_starts:
+            return 1
+        return max(1, bisect.bisect_right(self._page_starts, offset))
+
+    def to_list(self) -> List[Dict]:
+        return [dict(entry) for entry in self.entries]
+
+
+def build_structure_index(lines: List[Dict], page_offsets: List[Tuple[int, int]], text_length: int) -> StructureIndex:
+    """
+    Build a structure index from per-line layout records.
+
+    Args:
+        lines: Line records in document order, each with text, start (character
+            offset into the document text), page, and optionally size and bold
+            from PyMuPDF span information (OCR lines carry no font data)
+        page_offsets: (start, end) character offsets of each page
+        text_length: Length of the document text
+
+    Returns:
+        The StructureIndex for the document
+    """
+    body_size = _body_font_size(lines)
+    entries: List[Dict] = []
+    for line in lines:
+        entry = _classify_line(line, body_size)
+        if entry:
+            entry["start"] = line["start"]
+            entry["page"] = line["page"]
+            entries.append(entry)
+
+    # A section runs until the next entry at the same or an enclosing level.
+    open_entries: List[Dict] = []
+    for entry in entries:
+        while open_entries and open_entries[-1]["level"] >= entry["level"]:
+            open_entries.pop()["end"] = entry["start"]
+        open_entries.append(entry)
+    content_end = page_offsets[-1][1] if page_offsets else text_length
+    for entry in open_entries:
+        entry["end"] = content_end
+
+    return StructureIndex(entries, page_offsets)
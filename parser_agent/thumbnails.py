@@ -0,0 +1,212 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from common.config import get_env
+from common.tracing import span
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(get_env("LEGAL_LENS_CACHE_DIR", ".legal_lens_cache"))
+
+DEFAULT_WIDTH = 180
+MEMORY_ITEMS = 256      # rendered thumbnails kept in memory
+OPEN_DOCUMENTS = 8      # parsed PDFs kept open for rendering
+# Source PDFs and their rendered thumbnails are kept up to this many bytes, least recently viewed first out.
+MAX_BYTES = int(float(get_env("LEGAL_LENS_THUMBNAIL_CACHE_MB", "512")) * 1024 * 1024)
+# The disk cache is measured at most this often; it is also how stale a last-viewed time may get.
+PRUNE_INTERVAL = 60.0
+
+
+class ThumbnailStore:
+    """
+    Page thumbnails rendered on demand and cached.
+
+    Each source PDF is stored once under its content hash; pages are only
+    rendered when the preview shows them. Rendered PNGs are kept on disk
+    and in a small in-memory LRU, so paging back and forth never renders
+    a page twice. Once sources and thumbnails on disk exceed `max_bytes`,
+    the documents viewed least recently are deleted with their thumbnails.
+    """
+
+    def __init__(self, directory: Optional[str] = None, memory_items: int = MEMORY_ITEMS,
+                 max_bytes: int = MAX_BYTES):
+        self.directory = Path(directory) if directory else CACHE_DIR
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def _source_path(self, key: str) -> Path:
+        return self.directory / "sources" / f"{key}.pdf"
+
+    def _thumbnail_path(self, key: str, page: int, width: int) -> Path:
+        return self.directory / "thumbnails" / key[:32] / f"{page}_{width}.png"
+
+    def add_pdf(self, data: bytes, key: str) -> str:
+        """Keep the source PDF for rendering; a no-op when it is already stored."""
+        path = self._source_path(key)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self.prune()
+        else:
+            self._touch(path)
+        return key
+
+    def has_source(self, key: Optional[str]) -> bool:
+        return bool(key) and self._touch(self._source_path(key))
+
+    @staticmethod
+    def _touch(path: Path) -> bool:
+        """Record that a source was viewed (its mtime is the LRU clock); False when it doesn't exist."""
+        try:
+            if time.time() - path.stat().st_mtime > PRUNE_INTERVAL:
+                os.utime(path)
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _tree_size(path: Path) -> int:
+        size = 0
+        for file in path.glob("*"):
+            try:
+                size += file.stat().st_size
+            except OSError:
+                pass
+        return size
+
+    def prune(self, force: bool = False) -> int:
+        """
+        Delete the least recently viewed sources and their thumbnails until the cache fits `max_bytes`.
+
+        Runs at most once per PRUNE_INTERVAL unless forced. Thumbnail
+        directories whose source is gone are always deleted.
+
+        Returns:
+            Number of documents deleted
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_prune < PRUNE_INTERVAL:
+                return 0
+            self._last_prune = now
+
+        thumbnail_root = self.directory / "thumbnails"
+        documents = {}  # thumbnail directory name -> [last viewed, bytes, source path]
+        for source in (self.directory / "sources").glob("*.pdf"):
+            try:
+                stat = source.stat()
+            except OSError:
+                continue
+            documents[source.stem[:32]] = [stat.st_mtime, stat.st_size, source]
+        orphans = []
+        if thumbnail_root.is_dir():
+            for directory in thumbnail_root.iterdir():
+                if directory.name in documents:
+                    documents[directory.name][1] += self._tree_size(directory)
+                else:
+                    orphans.append(directory)
+
+        total = sum(size for _, size, _ in documents.values())
+        removed = []
+        # The most recently viewed document is kept even if it alone exceeds the cap
+        for name, (_, size, source) in sorted(documents.items(), key=lambda item: item[1][0])[:-1]:
+            if total <= self.max_bytes:
+                break
+            source.unlink(missing_ok=True)
+            orphans.append(thumbnail_root / name)
+            removed.append(source.stem)
+            total -= size
+        for directory in orphans:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        if removed:
+            with self._lock:
+                for key in removed:
+                    doc = self._documents.pop(key, None)
+                    if doc is not None:
+                        doc.close()
+                for cache_key in [cache_key for cache_key in self._memory if cache_key[0] in removed]:
+                    del self._memory[cache_key]
+            logger.info(f"Pruned {len(removed)} documents from the thumbnail cache")
+        return len(removed)
+
+    def _document(self, key: str):
+        import fitz
+
+        doc = self._documents.get(key)
+        if doc is None:
+            doc = self._documents[key] = fitz.open(self._source_path(key))
+            while len(self._documents) > OPEN_DOCUMENTS:
+                self._documents.popitem(last=False)[1].close()
+        self._documents.move_to_end(key)
+        return doc
+
+    def _remember(self, cache_key, png: bytes):
+        self._memory[cache_key] = png
+        self._memory.move_to_end(cache_key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def thumbnail(self, key: str, page: int, width: int = DEFAULT_WIDTH) -> Optional[bytes]:
+        """
+        PNG bytes of a 1-based page scaled to `width` pixels.
+
+        Returns:
+            The image, or None when the source isn't stored or the page doesn't exist
+        """
+        cache_key = (key, page, width)
+        with self._lock:
+            png = self._memory.get(cache_key)
+            if png is not None:
+                self._memory.move_to_end(cache_key)
+                return png
+
+        with span("preview.thumbnail", page=page) as s:
+            path = self._thumbnail_path(key, page, width)
+            if path.exists():
+                png = path.read_bytes()
+                s.set(cache_hit=True)
+            else:
+                s.set(cache_hit=False)
+                if not self.has_source(key):
+                    return None
+                import fitz
+
+                with self._lock:
+                    try:
+                        doc = self._document(key)
+                        if not 1 <= page <= doc.page_count:
+                            return None
+                        pdf_page = doc[page - 1]
+                        zoom = width / pdf_page.rect.width
+                        png = pdf_page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False).tobytes("png")
+                    except Exception as e:
+                        logger.warning(f"Thumbnail of page {page} failed: {str(e)}")
+                        return None
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(png)
+                s.set(bytes_out=len(png))
+
+        with self._lock:
+            self._remember(cache_key, png)
+        return png
+
+
+@lru_cache(maxsize=None)
+def get_thumbnail_store() -> ThumbnailStore:
+    """Process-wide thumbnail store shared by all sessions."""
+    return ThumbnailStore()
@@ -0,0 +1,385 @@
+"""
+Corpus-wide full-text index over every processed document.
+
+Extracted text is kept in an SQLite FTS5 table with one row per page, so
+documents can be found again long after the session that uploaded them
+has ended, without re-uploading or re-running OCR.
+
+Usage:
+    python -m search_agent.index search "lock-in period"
+    python -m search_agent.index add contracts/*.pdf
+    python -m search_agent.index stats
+"""
+import argparse
+import hashlib
+import heapq
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from common.config import get_env
+from common.tracing import span
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(get_env("LEGAL_LENS_CACHE_DIR", ".legal_lens_cache"))
+INDEX_PATH = Path(get_env("LEGAL_LENS_INDEX_PATH") or CACHE_DIR / "corpus.db")
+
+# Page rows use rowid = document id * PAGE_STRIDE + page, so a document's pages are one rowid range.
+PAGE_STRIDE = 1 << 20
+# Queries are scored over at most this many matching pages, newest first. Scoring dominates the
+# cost of broad queries ("premises" matches nearly every page), so this keeps them within budget;
+# anything more selective is ranked exactly.
+RANK_CANDIDATES = 2000
+SNIPPET_CONTEXT = 60   # characters shown either side of the first hit on a page
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS documents (
+        id INTEGER PRIMARY KEY,
+        key TEXT UNIQUE NOT NULL,
+        name TEXT NOT NULL,
+        pages INTEGER NOT NULL,
+        language TEXT,
+        added REAL NOT NULL
+    )""",
+    # Mark categories (M*) keep Indic vowel signs inside their words
+    """CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+        text, tokenize="unicode61 remove_diacritics 2 categories 'L* N* Co M*'"
+    )""",
+]
+
+_QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+# Characters that continue a word: letters and digits plus Indic vowel signs, like the index tokenizer
+_WORD = r"[^\W_]|[\u0900-\u0DFF]"
+
+
+def parse_query(query: str) -> List[Tuple[str, bool]]:
+    """
+    Split a search box query into (text, is_prefix) terms.
+
+    Every term must appear on the page, in any order; "quoted phrases"
+    must appear as written and a trailing * matches words starting with
+    the prefix. Terms without a letter or digit are dropped.
+    """
+    terms = []
+    for phrase, word in _QUERY_TOKEN.findall(query):
+        text = phrase or word
+        prefix = not phrase and text.endswith("*")
+        text = text.rstrip("*")
+        if re.search(r"\w", text):
+            terms.append((text, prefix))
+    return terms
+
+
+def to_match_expression(query: str) -> Optional[str]:
+    """
+    Translate a search box query into an FTS5 MATCH expression.
+
+    Every term is quoted, so punctuation never raises a syntax error:
+    "lock-in" is searched as the phrase lock in.
+
+    Returns:
+        The expression, or None when the query has nothing searchable
+    """
+    parts = ['"' + text.replace('"', '""') + '"' + ("*" if prefix else "") for text, prefix in parse_query(query)]
+    return " ".join(parts) or None
+
+
+def _hit_pattern(terms: List[Tuple[str, bool]]) -> "re.Pattern":
+    """
+    Regex finding the query terms in page text, for hit positions.
+
+    FTS5 could report these through highlight(), but it re-evaluates the
+    whole query for every row it highlights, which is slow for prefix terms.
+    """
+    alternatives = []
+    for text, prefix in terms:
+        words = re.findall(f"(?:{_WORD})+", text)
+        # Phrase words may be separated by any run of non-word characters, as in the tokenizer
+        body = f"(?:(?!{_WORD}).)+".join(re.escape(word) for word in words)
+        alternatives.append(body + (f"(?:{_WORD})*" if prefix else f"(?!{_WORD})"))
+    return re.compile(f"(?<!{_WORD})(?:{'|'.join(alternatives)})", re.IGNORECASE | re.DOTALL)
+
+
+def document_key(document) -> str:
+    """Key a document is indexed under: its source hash, else a hash of its text."""
+    return document.source_key or hashlib.sha256(document.text.encode("utf-8")).hexdigest()
+
+
+def _snippet(text: str, positions: List[Tuple[int, int]], context: int = SNIPPET_CONTEXT) -> str:
+    if not positions:
+        return text[:2 * context].replace("\n", " ")
+    start, end = positions[0]
+    snippet = text[max(0, start - context):end + context].replace("\n", " ")
+    return ("…" if start > context else "") + snippet + ("…" if end + context < len(text) else "")
+
+
+class CorpusIndex:
+    """
+    Persistent full-text index of extracted documents.
+
+    Documents are added once per content key; re-adding a known document
+    is a cheap no-op, so every extraction can be indexed unconditionally.
+    Search ranks pages by BM25 and groups them by document, best page
+    first, with the character offsets of every hit on each page. Queries
+    matching more than RANK_CANDIDATES pages are ranked among the most
+    recently added matches.
+
+    Each thread gets its own connection; the database runs in WAL mode so
+    searches are not blocked while another session adds a document.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else INDEX_PATH
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._schema_lock:
+                if not self._schema_ready:
+                    with conn:
+                        for statement in _SCHEMA:
+                            conn.execute(statement)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def contains(self, key: str) -> bool:
+        return self._connection().execute("SELECT 1 FROM documents WHERE key = ?", (key,)).fetchone() is not None
+
+    def add_pages(self, key: str, name: str, pages: Sequence[str], language: Optional[str] = None) -> bool:
+        """
+        Index a document given as its page texts.
+
+        Returns:
+            True if the document was added, False if it was already indexed
+        """
+        if len(pages) >= PAGE_STRIDE:
+            raise Exception(f"Cannot index {len(pages)} pages; the limit is {PAGE_STRIDE - 1}")
+        with span("index.add", pages=len(pages)) as s:
+            conn = self._connection()
+            with conn:
+                if conn.execute("SELECT 1 FROM documents WHERE key = ?", (key,)).fetchone():
+                    s.set(cache_hit=True)
+                    return False
+                s.set(cache_hit=False)
+                document_id = conn.execute(
+                    "INSERT INTO documents (key, name, pages, language, added) VALUES (?, ?, ?, ?, ?)",
+                    (key, name, len(pages), language, time.time())
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO pages (rowid, text) VALUES (?, ?)",
+                    (
+                        (document_id * PAGE_STRIDE + number, text)
+                        for number, text in enumerate(pages, start=1) if text.strip()
+                    )
+                )
+        return True
+
+    def add_document(self, document, name: str, key: Optional[str] = None) -> bool:
+        """
+        Index an ExtractedDocument under `key` (default: document_key(document)).
+
+        Returns:
+            True if the document was added, False if it was already indexed
+        """
+        key = key or document_key(document)
+        pages = [document.page_text(page) for page in range(1, document.page_count + 1)]
+        if pages:
+            # Text OCR'd from embedded images follows the last page; index it with that page
+            pages[-1] += document.text[document.page_offsets[-1][1]:]
+        return self.add_pages(key, name, pages, getattr(document, "language", None))
+
+    def document(self, key: str):
+        """
+        Rebuild an indexed document from its stored pages, or None if it isn't indexed.
+
+        Returns:
+            An ExtractedDocument with text, page offsets and a structure index
+        """
+        from parser_agent.parser import document_from_pages
+
+        conn = self._connection()
+        row = conn.execute("SELECT id, pages, language FROM documents WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        document_id, count, language = row
+        pages = [""] * count
+        for rowid, text in conn.execute(
+            "SELECT rowid, text FROM pages WHERE rowid BETWEEN ? AND ?",
+            (document_id * PAGE_STRIDE, document_id * PAGE_STRIDE + PAGE_STRIDE - 1)
+        ):
+            pages[rowid % PAGE_STRIDE - 1] = text
+        return document_from_pages(pages, language or "English", source_key=key)
+
+    def remove_document(self, key: str) -> bool:
+        conn = self._connection()
+        with conn:
+            row = conn.execute("SELECT id FROM documents WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False
+            conn.execute(
+                "DELETE FROM pages WHERE rowid BETWEEN ? AND ?",
+                (row[0] * PAGE_STRIDE, row[0] * PAGE_STRIDE + PAGE_STRIDE - 1)
+            )
+            conn.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+        return True
+
+    def search(self, query: str, limit: int = 20, pages_per_document: int = 5) -> List[Dict]:
+        """
+        Ranked search over every indexed page.
+
+        Args:
+            query: Words, "quoted phrases" and prefix* terms, all of which must appear on a page
+            limit: Maximum number of documents returned
+            pages_per_document: Maximum number of matching pages listed per document
+
+        Returns:
+            Documents as {"key", "name", "score", "pages"}, best first; each page is
+            {"page", "score", "positions", "snippet"} where positions are
+            (start, end) character offsets of the hits within that page's text
+        """
+        expression = to_match_expression(query)
+        if expression is None:
+            return []
+        with span("index.search") as s:
+            conn = self._connection()
+            try:
+                # Rowid order streams matches without scoring them all first, unlike ORDER BY rank
+                candidates = conn.execute(
+                    "SELECT rowid, bm25(pages) FROM pages WHERE pages MATCH ? ORDER BY rowid DESC LIMIT ?",
+                    (expression, RANK_CANDIDATES)
+                ).fetchall()
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Index search failed for {query!r}: {str(e)}")
+                return []
+            s.set(candidates=len(candidates))
+            # bm25() is lower for better matches
+            ranked = heapq.nsmallest(limit * pages_per_document, candidates, key=lambda row: row[1])
+
+            # Group pages by document in rank order; a document ranks by its best page
+            grouped: Dict[int, List[Tuple[int, float]]] = {}
+            for rowid, rank in ranked:
+                document_id = rowid // PAGE_STRIDE
+                if document_id in grouped or len(grouped) < limit:
+                    grouped.setdefault(document_id, []).append((rowid, rank))
+            rowids = [rowid for hits in grouped.values() for rowid, _ in hits[:pages_per_document]]
+            if not rowids:
+                s.set(hits=0)
+                return []
+
+            marks = ",".join("?" * len(rowids))
+            texts = dict(conn.execute(f"SELECT rowid, text FROM pages WHERE rowid IN ({marks})", rowids).fetchall())
+            pattern = _hit_pattern(parse_query(query))
+            ids = ",".join("?" * len(grouped))
+            documents = {
+                row[0]: row[1:] for row in conn.execute(
+                    f"SELECT id, key, name FROM documents WHERE id IN ({ids})", tuple(grouped)
+                )
+            }
+
+            results = []
+            for document_id, hits in grouped.items():
+                if document_id not in documents:
+                    continue  # removed since the page rows were read
+                key, name = documents[document_id]
+                pages = []
+                for rowid, rank in hits[:pages_per_document]:
+                    text = texts.get(rowid, "")
+                    positions = [match.span() for match in pattern.finditer(text)]
+                    pages.append({
+                        "page": rowid % PAGE_STRIDE,
+                        "score": -rank,
+                        "positions": positions,
+                        "snippet": _snippet(text, positions),
+                    })
+                results.append({"key": key, "name": name, "score": -hits[0][1], "pages": pages})
+            s.set(hits=len(results))
+        return results
+
+    def optimize(self):
+        """Merge the index b-trees into one; worth running after large bulk imports."""
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT INTO pages (pages) VALUES ('optimize')")
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._connection()
+        documents, pages = conn.execute("SELECT COUNT(*), COALESCE(SUM(pages), 0) FROM documents").fetchone()
+        size = sum(path.stat().st_size for path in self.path.parent.glob(f"{self.path.name}*") if path.is_file())
+        return {"documents": documents, "pages": pages, "bytes": size}
+
+
+@lru_cache(maxsize=None)
+def get_corpus_index() -> CorpusIndex:
+    """The index shared by all sessions in this process."""
+    return CorpusIndex()
+
+
+def _print_results(results: List[Dict]):
+    if not results:
+        print("No matches")
+    for result in results:
+        print(f"{result['score']:7.2f}  {result['name']}  [{result['key'][:12]}]")
+        for page in result["pages"]:
+            print(f"         p.{page['page']:<5} {page['snippet']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", help=f"index database (default {INDEX_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    search = commands.add_parser("search", help="ranked search over the corpus")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--pages", type=int, default=5, help="matching pages listed per document")
+    add = commands.add_parser("add", help="extract and index PDF or image files")
+    add.add_argument("files", nargs="+")
+    remove = commands.add_parser("remove", help="drop a document by key")
+    remove.add_argument("key")
+    commands.add_parser("optimize", help="merge index segments after bulk imports")
+    commands.add_parser("stats", help="document, page and byte counts")
+    args = parser.parse_args()
+
+    index = CorpusIndex(args.index)
+    if args.command == "search":
+        start = time.perf_counter()
+        results = index.search(args.query, limit=args.limit, pages_per_document=args.pages)
+        elapsed = time.perf_counter() - start
+        _print_results(results)
+        print(f"\n{len(results)} documents in {elapsed * 1000:.1f} ms")
+    elif args.command == "add":
+        from parser_agent.parser import extract_document
+
+        for path in args.files:
+            try:
+                with open(path, "rb") as f:
+                    document = extract_document(f)
+                added = index.add_document(document, os.path.basename(path))
+                print(f"{'added' if added else 'already indexed'}: {path} ({document.page_count} pages)")
+            except Exception as e:
+                print(f"failed: {path}: {str(e)}")
+    elif args.command == "remove":
+        print("removed" if index.remove_document(args.key) else "not found")
+    elif args.command == "optimize":
+        index.optimize()
+    elif args.command == "stats":
+        for name, value in index.stats().items():
+            print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
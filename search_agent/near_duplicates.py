@@ -0,0 +1,231 @@
+"""
+Near-duplicate detection for uploaded documents.
+
+Re-scans, copies of a notice served on different parties and templates
+filled in under a new name share most of their text but not their bytes.
+Each document's extracted text is reduced to a MinHash signature over
+character shingles, which a few OCR errors barely disturb; locality-
+sensitive hashing over bands of the signature finds earlier documents
+with a high estimated Jaccard similarity in a few index lookups, whatever
+the size of the corpus.
+"""
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from common.config import get_env
+from search_agent.index import INDEX_PATH
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_CHARS = 7
+# Texts with fewer distinct shingles (about 30 characters) are neither indexed nor matched:
+# empty or failed extractions would otherwise all share one signature and match each other.
+MIN_SHINGLES = 24
+NUM_PERM = 128
+# 16 bands of 8 rows: documents above ~0.7 similarity collide in some band with high probability
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+THRESHOLD = float(get_env("LEGAL_LENS_NEAR_DUPLICATE_THRESHOLD", "0.8"))
+_SEED = 20240611  # fixed so signatures stay comparable across processes and releases
+_BLOCK = 4096     # shingles hashed per numpy pass, bounds the temporary matrix at NUM_PERM x _BLOCK
+_WORD_RE = re.compile(r"(?:[^\W_]|[\u0900-\u0DFF])+")  # words, keeping Indic vowel signs attached
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS near_duplicates (
+        key TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        signature BLOB NOT NULL,
+        similar_to TEXT,
+        similarity REAL,
+        added REAL NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS near_duplicate_bands (
+        band INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        key TEXT NOT NULL,
+        PRIMARY KEY (band, bucket, key)
+    ) WITHOUT ROWID""",
+]
+
+
+def shingle_hashes(text: str):
+    """
+    Distinct 32-bit hashes of the SHINGLE_CHARS-character shingles of a text, as a numpy array.
+
+    The text is lower-cased and reduced to its words separated by single
+    spaces first, so layout, punctuation and line breaks don't count.
+    """
+    import numpy as np
+
+    normalized = " ".join(_WORD_RE.findall(text.lower()))
+    codes = np.frombuffer(normalized.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if len(codes) < SHINGLE_CHARS:
+        return np.unique(codes[:1] if len(codes) else codes)
+    # Polynomial rolling hash of every window, computed for all windows at once
+    count = len(codes) - SHINGLE_CHARS + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(SHINGLE_CHARS):
+        hashes = hashes * np.uint64(1000003) + codes[offset:offset + count]
+    return np.unique((hashes >> np.uint64(32)) ^ (hashes & np.uint64(0xFFFFFFFF)))
+
+
+@lru_cache(maxsize=None)
+def _permutations(num_perm: int):
+    import numpy as np
+
+    rng = np.random.default_rng(_SEED + num_perm)
+    # Multiply-shift hashing: odd multipliers, arithmetic wraps modulo 2**64, keep the high 32 bits
+    a = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    return a[:, None], b[:, None]
+
+
+def minhash(hashes, num_perm: int = NUM_PERM):
+    """MinHash signature (uint32 array of length num_perm) of a set of shingle hashes."""
+    import numpy as np
+
+    signature = np.full(num_perm, 0xFFFFFFFF, dtype=np.uint64)
+    a, b = _permutations(num_perm)
+    for start in range(0, len(hashes), _BLOCK):
+        block = hashes[start:start + _BLOCK][None, :]
+        values = (a * block + b) >> np.uint64(32)
+        np.minimum(signature, values.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def similarity(signature_a, signature_b) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return float((signature_a == signature_b).mean())
+
+
+def _buckets(signature) -> List[int]:
+    return [
+        int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), "big", signed=True)
+        for band in signature.reshape(BANDS, ROWS)
+    ]
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash/LSH index of processed documents.
+
+    Stored alongside the corpus index and keyed the same way, so a match's
+    text can be read back from the corpus index. Each entry keeps the
+    document's signature and the best earlier match found when it was
+    registered.
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: float = THRESHOLD):
+        self.path = Path(path) if path else INDEX_PATH
+        self.threshold = threshold
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._schema_lock:
+                if not self._schema_ready:
+                    with conn:
+                        for statement in _SCHEMA:
+                            conn.execute(statement)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def find(self, signature, exclude: Optional[str] = None) -> Optional[Dict]:
+        """
+        Most similar indexed document at or above the threshold.
+
+        Returns:
+            {"key", "name", "similarity"} or None
+        """
+        import numpy as np
+
+        conn = self._connection()
+        buckets = _buckets(signature)
+        clauses = " OR ".join("(band = ? AND bucket = ?)" for _ in buckets)
+        params = [value for band, bucket in enumerate(buckets) for value in (band, bucket)]
+        candidates = conn.execute(
+            f"SELECT DISTINCT key FROM near_duplicate_bands WHERE {clauses}", params
+        ).fetchall()
+
+        best = None
+        for (key,) in candidates:
+            if key == exclude:
+                continue
+            row = conn.execute("SELECT name, signature FROM near_duplicates WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                continue
+            score = similarity(signature, np.frombuffer(row[1], dtype=np.uint32))
+            if score >= self.threshold and (best is None or score > best["similarity"]):
+                best = {"key": key, "name": row[0], "similarity": score}
+        return best
+
+    def register(self, key: str, name: str, text: str) -> Optional[Dict]:
+        """
+        Add a document and return the earlier document it nearly duplicates, if any.
+
+        Registering a known key does nothing and returns the match found the
+        first time. Texts under MIN_SHINGLES shingles are skipped and match nothing.
+        """
+        if self.contains(key):
+            return self.match(key)
+
+        start = time.perf_counter()
+        hashes = shingle_hashes(text)
+        if len(hashes) < MIN_SHINGLES:
+            logger.debug(f"Not indexing {name} for near-duplicates: too little text")
+            return None
+        signature = minhash(hashes)
+        best = self.find(signature, exclude=key)
+        conn = self._connection()
+        with conn:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO near_duplicates (key, name, signature, similar_to, similarity, added) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key, name, signature.tobytes(),
+                    best["key"] if best else None, best["similarity"] if best else None, time.time()
+                )
+            ).rowcount
+            if inserted:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO near_duplicate_bands (band, bucket, key) VALUES (?, ?, ?)",
+                    [(band, bucket, key) for band, bucket in enumerate(_buckets(signature))]
+                )
+        if best:
+            logger.info(
+                f"{name} is a near-duplicate of {best['name']} ({best['similarity']:.0%} similar, "
+                f"checked in {(time.perf_counter() - start) * 1000:.0f} ms)"
+            )
+        return best
+
+    def contains(self, key: str) -> bool:
+        return self._connection().execute("SELECT 1 FROM near_duplicates WHERE key = ?", (key,)).fetchone() is not None
+
+    def match(self, key: str) -> Optional[Dict]:
+        """The near-duplicate recorded when `key` was registered, or None."""
+        row = self._connection().execute(
+            "SELECT d.similar_to, o.name, d.similarity FROM near_duplicates d "
+            "JOIN near_duplicates o ON o.key = d.similar_to WHERE d.key = ?", (key,)
+        ).fetchone()
+        return {"key": row[0], "name": row[1], "similarity": row[2]} if row else None
+
+
+@lru_cache(maxsize=None)
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    """The index shared by all sessions in this process."""
+    return NearDuplicateIndex()
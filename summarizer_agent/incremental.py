@@ -0,0 +1,399 @@
+import contextvars
+import difflib
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from common.config import get_env
+from common.tracing import span
+from parser_agent.structure import LEVEL_CLAUSE
+from summarizer_agent.summarizer import summarize_text
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(get_env("LEGAL_LENS_CACHE_DIR", ".legal_lens_cache"))
+
+# Clauses longer than this are split further; untitled documents are cut into parts of this size.
+# Adjacent clauses are also sent to the model together, up to this size per call.
+MAX_CHUNK_CHARS = 6000
+# A group of adjacent clauses also ends after a clause whose hash is 0 modulo this,
+# so group boundaries depend on the clauses around them, not on where the document starts
+GROUP_BOUNDARY_MODULUS = 8
+# Model calls in flight at once for one document's groups
+SUMMARY_WORKERS = int(get_env("LEGAL_LENS_SUMMARY_WORKERS", "4"))
+# Share of the previous version's clauses that must still be present to diff against it
+MIN_VERSION_OVERLAP = 0.5
+
+# A near-duplicate's clause summary is reused when at most this share of its words
+# (or a single word) differ, and only by OCR-like misspellings (see _is_ocr_variant)
+MAX_VARIANT_WORDS = 0.05
+
+_VERSION_MARKERS_RE = re.compile(
+    r"(?:[\s_.-]*\(?(?:v(?:er(?:sion)?)?[\s_.-]*\d+|rev(?:ision)?[\s_.-]*\d+|draft|final|clean|redline|copy|\d+)\)?)+$",
+    re.IGNORECASE,
+)
+
+
+class SummaryError(Exception):
+    """A part of the document could not be summarized, so neither can the whole."""
+
+
+def document_family(filename: str, scope: Optional[str] = None) -> str:
+    """
+    Derive a version-independent key from an upload's file name.
+
+    "Lease_Agreement_v3.pdf", "lease agreement v4 (final).pdf" and
+    "Lease-Agreement-draft.pdf" all map to "lease agreement". With a scope
+    (the UI passes the session id), the key is "<scope>/lease agreement",
+    so one user's upload is never diffed against another user's file of
+    the same name.
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    stem = _VERSION_MARKERS_RE.sub("", stem)
+    name = re.sub(r"[\s_.-]+", " ", stem).strip().lower() or "document"
+    return f"{scope}/{name}" if scope else name
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _chunk_hash(text: str) -> str:
+    """Hash chunk content ignoring whitespace and page-break differences."""
+    return _hash(re.sub(r"\s+", " ", text).strip())
+
+
+def _split_long(label: str, text: str) -> List[Dict]:
+    if len(text) <= MAX_CHUNK_CHARS:
+        return [{"label": label, "text": text}]
+    parts = []
+    current = ""
+    for paragraph in re.split(r"(\n\s*\n)", text):
+        if current and len(current) + len(paragraph) > MAX_CHUNK_CHARS:
+            parts.append(current)
+            current = ""
+        current += paragraph
+    if current:
+        parts.append(current)
+    return [{"label": f"{label} (part {i})", "text": part} for i, part in enumerate(parts, 1)]
+
+
+def chunk_document(document) -> List[Dict]:
+    """
+    Split an extracted document into clause-level chunks.
+
+    Uses the top-level clauses, schedules and annexures of the structure
+    index; documents without structure are cut at paragraph boundaries.
+
+    Args:
+        document: An ExtractedDocument
+
+    Returns:
+        List of chunk dicts with label, text and hash
+    """
+    text = document.text
+    boundaries = [
+        entry for entry in document.structure.entries
+        if entry["level"] <= LEVEL_CLAUSE and entry["kind"] != "heading"
+    ]
+
+    chunks: List[Dict] = []
+    if boundaries:
+        if boundaries[0]["start"] > 0 and text[:boundaries[0]["start"]].strip():
+            chunks.extend(_split_long("Preamble", text[:boundaries[0]["start"]]))
+        for i, entry in enumerate(boundaries):
+            end = boundaries[i + 1]["start"] if i + 1 < len(boundaries) else len(text)
+            label = entry["label"] if entry["kind"] != "clause" else f"Clause {entry['label']}"
+            chunks.extend(_split_long(label, text[entry["start"]:end]))
+    else:
+        chunks.extend(_split_long("Part", text))
+
+    for chunk in chunks:
+        chunk["hash"] = _chunk_hash(chunk["text"])
+    return [chunk for chunk in chunks if chunk["text"].strip()]
+
+
+def _read_json(path: Path) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: Path, data: Dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per writer: sessions summarizing the same clause may finish together
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _summary_path(key: str, language: str) -> Path:
+    return CACHE_DIR / "summaries" / language.lower() / f"{key}.json"
+
+
+def _version_path(family: str) -> Path:
+    return CACHE_DIR / "versions" / f"{_hash(family)[:32]}.json"
+
+
+def _cached_summary(key: str, language: str) -> Optional[str]:
+    with span("cache.summary", language=language) as s:
+        data = _read_json(_summary_path(key, language))
+        s.set(cache_hit=data is not None)
+    return data["summary"] if data else None
+
+
+def _store_summary(key: str, language: str, summary: str):
+    # summarize_text reports failures as "Error: ..." strings; never cache those
+    if summary and not summary.startswith("Error:"):
+        _write_json(_summary_path(key, language), {"summary": summary})
+
+
+def _is_same_document(previous: List[Dict], current: List[Dict]) -> bool:
+    """Whether a stored version shares enough clauses with an upload to be an earlier version of it."""
+    if not previous:
+        return False
+    current_hashes = {chunk["hash"] for chunk in current}
+    shared = sum(1 for chunk in previous if chunk["hash"] in current_hashes)
+    return shared >= MIN_VERSION_OVERLAP * min(len(previous), len(current))
+
+
+def group_chunks(chunks: List[Dict], hashes: List[str]) -> List[List[int]]:
+    """
+    Pack adjacent chunks into groups of at most MAX_CHUNK_CHARS, one model call each.
+
+    A group ends at the size limit or after a chunk whose hash is 0 modulo
+    GROUP_BOUNDARY_MODULUS. Because the boundaries follow content, an edited
+    clause changes only its own group: the groups before and after it come
+    out the same and their cached summaries are reused.
+
+    Args:
+        chunks: Chunks from chunk_document
+        hashes: The hash each chunk is grouped and cached by
+
+    Returns:
+        Lists of chunk indexes, in document order
+    """
+    if sum(len(chunk["text"]) for chunk in chunks) <= MAX_CHUNK_CHARS:
+        return [list(range(len(chunks)))] if chunks else []
+    groups: List[List[int]] = []
+    current: List[int] = []
+    size = 0
+    for i, chunk in enumerate(chunks):
+        if current and size + len(chunk["text"]) > MAX_CHUNK_CHARS:
+            groups.append(current)
+            current, size = [], 0
+        current.append(i)
+        size += len(chunk["text"])
+        if int(hashes[i][:8], 16) % GROUP_BOUNDARY_MODULUS == 0:
+            groups.append(current)
+            current, size = [], 0
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _summarize_checked(text: str, language: str) -> str:
+    summary = summarize_text(text, language)
+    # summarize_text reports failures as "Error: ..." strings
+    if not summary or summary.startswith("Error:"):
+        raise SummaryError(summary or "Empty summary")
+    return summary
+
+
+def diff_chunks(previous: List[Dict], current: List[Dict]) -> Dict[str, List[str]]:
+    """
+    Compare two chunk lists by content hash.
+
+    Returns:
+        Dict with "changed" (labels of new or modified chunks in the current
+        version) and "removed" (labels only present in the previous version)
+    """
+    matcher = difflib.SequenceMatcher(
+        a=[chunk["hash"] for chunk in previous],
+        b=[chunk["hash"] for chunk in current],
+        autojunk=False
+    )
+    changed, removed = [], []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ("replace", "insert"):
+            changed.extend(chunk["label"] for chunk in current[j1:j2])
+        if tag in ("replace", "delete"):
+            removed.extend(
+                chunk["label"] for chunk in previous[i1:i2]
+                if chunk["label"] not in {c["label"] for c in current[j1:j2]}
+            )
+    return {"changed": changed, "removed": removed}
+
+
+def _is_ocr_variant(old: str, new: str) -> bool:
+    """
+    Whether two chunk texts differ only the way two scans of one page do.
+
+    Every difference must swap one word for a similar word of four or more
+    letters ("Lessee" for "Lessce"); inserted or deleted words, numbers and
+    short words (amounts, dates, "not") always count as real changes, as
+    does a different name filled into a template.
+    """
+    a, b = old.split(), new.split()
+    matcher = difflib.SequenceMatcher(a=a, b=b, autojunk=False)
+    differing = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if tag != "replace" or i2 - i1 != j2 - j1:
+            return False
+        for x, y in zip(a[i1:i2], b[j1:j2]):
+            if min(len(x), len(y)) < 4 or any(ch.isdigit() for ch in x + y):
+                return False
+            if difflib.SequenceMatcher(a=x.lower(), b=y.lower()).ratio() < 0.8:
+                return False
+        differing += i2 - i1
+    return differing <= max(1, MAX_VARIANT_WORDS * len(b))
+
+
+def summarize_document(
+    document,
+    language: str = "English",
+    family: Optional[str] = None,
+    reference=None,
+    save_version: bool = True
+) -> Dict:
+    """
+    Summarize a document, reusing cached summaries from earlier versions.
+
+    Adjacent chunks are summarized in groups (see group_chunks). Only groups
+    with a chunk that changed since anything previously summarized are sent
+    to the model, SUMMARY_WORKERS at a time; the group summaries are then
+    merged. If any of these calls fails, so does the whole summary.
+
+    Args:
+        document: An ExtractedDocument
+        language: The language for the summary
+        family: Version-independent document key (see document_family); when
+            given, the result is diffed against the previous stored version,
+            if at least MIN_VERSION_OVERLAP of that version's clauses are unchanged
+        reference: An ExtractedDocument this one nearly duplicates (e.g. another
+            scan of it). Clauses that differ from the reference's only by OCR
+            errors reuse its summaries, and without a previous version the
+            result is diffed against the reference instead
+        save_version: Record this version of the family now. Speculative runs
+            pass False and leave it to `record_version` once the result is used,
+            so an unused summary doesn't become the next upload's previous version
+
+    Returns:
+        Dict with summary, changed and removed clause labels, the number of
+        reused and re-summarized chunks, the previous version number, whether
+        the changes are relative to the reference, and the version record still
+        to be saved ("pending_version", None if saved or unchanged)
+
+    Raises:
+        SummaryError: The model could not summarize a group or the merge
+    """
+    chunks = chunk_document(document)
+    reference_chunks = chunk_document(reference) if reference is not None else []
+    by_label = {chunk["label"]: chunk for chunk in reference_chunks}
+
+    previous = _read_json(_version_path(family)) if family else None
+    if previous and not _is_same_document(previous["chunks"], chunks):
+        logger.info(f"Stored version of {family!r} shares too few clauses; not diffing against it")
+        previous = None
+    if previous:
+        diff = diff_chunks(previous["chunks"], chunks)
+    elif reference_chunks:
+        diff = diff_chunks(reference_chunks, chunks)
+    else:
+        diff = {"changed": [], "removed": []}
+
+    # A clause that differs from the reference's only by OCR errors stands in for it,
+    # so its group matches the reference's group and reuses that summary
+    hashes = []
+    variants = set()
+    for chunk in chunks:
+        match = by_label.get(chunk["label"])
+        if match and match["hash"] != chunk["hash"] and _is_ocr_variant(match["text"], chunk["text"]):
+            hashes.append(match["hash"])
+            variants.add(chunk["label"])
+        else:
+            hashes.append(chunk["hash"])
+
+    groups = group_chunks(chunks, hashes)
+    group_keys = [_hash("group\n" + "\n".join(hashes[i] for i in group)) for group in groups]
+    group_summaries = [_cached_summary(key, language) for key in group_keys]
+    pending = [n for n, summary in enumerate(group_summaries) if summary is None]
+    if pending:
+        # Each call keeps the caller's scheduler session, priority and cancellation
+        with ThreadPoolExecutor(max_workers=min(SUMMARY_WORKERS, len(pending))) as executor:
+            futures = {
+                n: executor.submit(
+                    contextvars.copy_context().run, _summarize_checked,
+                    "\n\n".join(chunks[i]["text"] for i in groups[n]), language
+                )
+                for n in pending
+            }
+            for n, future in futures.items():
+                group_summaries[n] = future.result()
+                _store_summary(group_keys[n], language, group_summaries[n])
+    resummarized = sum(len(groups[n]) for n in pending)
+    reused = len(chunks) - resummarized
+
+    if len(groups) <= 1:
+        summary = group_summaries[0] if group_summaries else ""
+    else:
+        merge_key = _hash("\n".join(_hash(s) for s in group_summaries))
+        summary = _cached_summary(merge_key, language)
+        if summary is None:
+            combined = "\n\n".join(
+                f"{chunks[group[0]]['label']}–{chunks[group[-1]]['label']}:\n{s}" if len(group) > 1
+                else f"{chunks[group[0]]['label']}:\n{s}"
+                for group, s in zip(groups, group_summaries)
+            )
+            summary = _summarize_checked(combined, language)
+            _store_summary(merge_key, language, summary)
+
+    if not previous and variants:
+        diff["changed"] = [label for label in diff["changed"] if label not in variants]
+
+    version = (previous["version"] + 1) if previous else 1
+    pending = None
+    if previous and not diff["changed"] and not diff["removed"]:
+        version = previous["version"]
+    elif family:
+        pending = {
+            "family": family,
+            "version": version,
+            "chunks": [{"label": c["label"], "hash": c["hash"]} for c in chunks],
+        }
+        if save_version:
+            record_version(pending)
+            pending = None
+
+    logger.info(
+        f"Summarized {len(chunks)} chunks in {len(groups)} groups: {reused} reused, {resummarized} re-summarized, "
+        f"{len(diff['changed'])} changed since {'previous version' if previous else 'reference'}"
+        + (f", {len(variants)} matched the reference up to OCR errors" if variants else "")
+    )
+    return {
+        "summary": summary,
+        "changed": diff["changed"],
+        "removed": diff["removed"],
+        "reused": reused,
+        "resummarized": resummarized,
+        "previous_version": previous["version"] if previous else None,
+        "reference": bool(reference_chunks) and not previous,
+        "pending_version": pending,
+    }
+
+
+def record_version(pending: Optional[Dict]):
+    """Save a version record returned by summarize_document(..., save_version=False)."""
+    if pending:
+        _write_json(_version_path(pending["family"]), pending)
@@ -1,14 +1,13 @@
-import os
-from dotenv import load_dotenv
-import requests
 import json
 
-# Load environment variables
-load_dotenv()
+from common.config import get_api_key
+from common.singleflight import coalesce, content_key
 
 def summarize_text(text, language="English"):
     """
     Generate a concise summary of the input text in the specified language.
+
+    Concurrent requests for the same text and language share one API call.
     
     Args:
         text (str): The text to summarize
@@ -17,9 +16,17 @@ def summarize_text(text, language="English"):
     Returns:
         str: The generated summary
     """
+    return coalesce(
+        content_key("summarizer_agent.summarize_text", text, language),
+        lambda: _summarize_text(text, language)
+    )
+
+def _summarize_text(text, language):
+    from common.api_client import chat_completion
+
     try:
         # Get API key from environment variable
-        api_key = os.getenv("DEEPSEEK_API_KEY")
+        api_key = get_api_key()
         if not api_key:
             return "Error: API key not found. Please check your environment variables."
 
@@ -32,25 +39,14 @@ Text to summarize:
 {text}"""
 
         # Make API request to DeepSeek
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": "deepseek-chat",
-            "messages": [
+        response = chat_completion(
+            [
                 {"role": "system", "content": "You are a legal document summarizer. Provide clear, concise summaries in the requested language."},
                 {"role": "user", "content": prompt}
             ],
-            "temperature": 0.7,
-            "max_tokens": 1000
-        }
-
-        response = requests.post(
-            "https://api.deepseek.com/v1/chat/completions",
-            headers=headers,
-            json=data
+            api_key=api_key,
+            temperature=0.7,
+            max_tokens=1000
         )
 
         if response.status_code == 200:
@@ -0,0 +1,49 @@
+import pytest
+
+from chatbot_agent.answer_cache import AnswerCache, question_terms
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnswerCache(str(tmp_path / "answers.sqlite"))
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Must the tenant pay rent?", "May the tenant pay rent?"),
+    ("Can the landlord terminate?", "Should the landlord terminate?"),
+    ("Is the tenant liable?", "Was the tenant liable?"),
+    ("Will the deposit be refunded?", "Was the deposit refunded?"),
+    ("Is the tenant liable for repairs?", "Is the tenant not liable for repairs?"),
+])
+def test_questions_differing_in_modal_tense_or_negation_do_not_share_answers(cache, cached, asked):
+    cache.put(cached, "doc", "English", "cached answer")
+    assert cache.get(asked, "doc", "English") is None
+    assert cache.get(cached, "doc", "English")["answer"] == "cached answer"
+
+
+def test_rewording_still_hits(cache):
+    cache.put("What is the monthly rent?", "doc", "English", "Rs. 25,000")
+    assert cache.get("Please tell me the monthly rent", "doc", "English")["answer"] == "Rs. 25,000"
+
+
+def test_modals_are_kept_as_terms():
+    assert question_terms("Must the tenant pay rent?") == ["must", "tenant", "pay", "rent"]
+    assert question_terms("Can't the landlord terminate?") == ["can", "not", "landlord", "terminate"]
+
+
+def test_entries_keyed_by_older_terms_are_dropped(tmp_path):
+    import sqlite3
+
+    path = tmp_path / "answers.sqlite"
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "CREATE TABLE answers (id INTEGER PRIMARY KEY, document TEXT NOT NULL, language TEXT NOT NULL, "
+            "question TEXT NOT NULL, terms TEXT NOT NULL, answer TEXT NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        connection.execute(
+            "INSERT INTO answers (document, language, question, terms, answer, created, last_used) "
+            "VALUES ('doc', 'English', 'Must the tenant pay rent?', 'tenant pay rent', 'old', 9e12, 9e12)"
+        )
+    cache = AnswerCache(str(path))
+    assert cache.get("Does the tenant pay rent?", "doc", "English") is None
@@ -0,0 +1,34 @@
+import os
+
+from parser_agent.artifact import ArtifactStore
+from parser_agent.parser import document_from_pages
+
+
+def document(text):
+    return document_from_pages([text])
+
+
+def test_least_recently_read_artifacts_are_pruned(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_bytes=0)
+    keys = ["aa" + "0" * 62, "bb" + "0" * 62, "cc" + "0" * 62]
+    for i, key in enumerate(keys):
+        store.put(key, document(f"Clause {i}. The Tenant shall pay rent."))
+        os.utime(store.path(key), (1000 + i, 1000 + i))
+
+    assert store.prune(force=True) == 2
+    assert store.load(keys[0]) is None and store.load(keys[1]) is None
+    assert store.load(keys[2]).text == "Clause 2. The Tenant shall pay rent."
+
+
+def test_reading_an_artifact_keeps_it(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_bytes=0)
+    old, new = "aa" + "0" * 62, "bb" + "0" * 62
+    store.put(old, document("Old"))
+    store.put(new, document("New"))
+    os.utime(store.path(old), (1000, 1000))
+    os.utime(store.path(new), (2000, 2000))
+
+    assert store.load(old).text == "Old"  # marks it as read now
+    assert store.prune(force=True) == 1
+    assert store.load(new) is None
+    assert store.load(old).text == "Old"
@@ -0,0 +1,30 @@
+from common.document_store import DocumentStore
+from tts_agent.tts import delete_audio
+
+
+def test_evicted_audio_file_is_deleted(tmp_path):
+    store = DocumentStore(idle_bytes=0)
+    audio = tmp_path / "summary.opus"
+    audio.write_bytes(b"OggS")
+
+    store.get_or_create("audio", lambda: str(audio), on_evict=delete_audio)
+    store.bind("session", "audio", "audio")
+    store.put("other", "x" * 1000)
+    assert audio.exists()  # held by the session, so never evicted
+
+    store.release_session("session")
+    store.put("newer", "y" * 1000)
+    assert store.get("audio") is None
+    assert not audio.exists()
+
+
+def test_failing_eviction_callback_does_not_break_the_store():
+    def fail(value):
+        raise OSError("read-only file system")
+
+    store = DocumentStore(idle_bytes=0)
+    store.put("first", "a", on_evict=fail)
+    store.put("second", "b")
+    assert store.get("first") is None
+    assert store.get("second") == "b"
+    assert store.stats()["evictions"] == 1
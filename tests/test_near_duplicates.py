@@ -0,0 +1,23 @@
+from search_agent.near_duplicates import NearDuplicateIndex
+
+LEASE = (
+    "This lease deed is made at Pune between Ramesh Kumar, the Lessor, and Anita Shah, the Lessee. "
+    "The Lessee shall pay a monthly rent of Rs. 25,000 on or before the fifth day of each month. "
+    "The term of the lease is eleven months from the date of execution and may be renewed by consent."
+)
+
+
+def test_empty_texts_are_not_near_duplicates(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "index.sqlite"))
+    assert index.register("a", "a.pdf", "") is None
+    assert index.register("b", "b.pdf", "   ") is None
+    assert index.register("c", "c.pdf", "p. 1") is None
+    assert not index.contains("a")
+
+
+def test_rescanned_copy_is_a_near_duplicate(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "index.sqlite"))
+    assert index.register("original", "lease.pdf", LEASE) is None
+    match = index.register("rescan", "lease_scan.pdf", LEASE.replace("Rs. 25,000", "Rs. 25.000"))
+    assert match["key"] == "original" and match["similarity"] >= 0.8
+    assert index.register("blank", "blank.pdf", "") is None
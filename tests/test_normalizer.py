@@ -0,0 +1,23 @@
+from nlp.normalizer import normalize_text, speech_text, strip_markdown
+
+
+def test_headings_keep_their_line_breaks():
+    text = "Summary of lease:\n## Parties\n- Lessor: A\n### Term\nFive years"
+    assert strip_markdown(text) == "Summary of lease:\nParties\n- Lessor: A\nTerm\nFive years"
+    assert strip_markdown("# Title\nBody") == "Title\nBody"
+    assert speech_text("Intro\n## Parties\nA") == "Intro Parties A"
+
+
+def test_blank_line_runs_collapse_to_one_blank_line():
+    assert strip_markdown("First\n\n\n\nSecond") == "First\n\nSecond"
+    assert strip_markdown("First\n  \n\n## Second\nText") == "First\n\nSecond\nText"
+
+
+def test_emphasis_links_and_code_keep_their_text():
+    text = "**Rent** is *due* on the _fifth_, see [clause 4](#c4) and `ANNEX_A`; keep snake_case"
+    assert strip_markdown(text) == "Rent is due on the fifth, see clause 4 and ANNEX_A; keep snake_case"
+    assert strip_markdown("Before\n```\ncode\n```\nAfter") == "Before\n\nAfter"
+
+
+def test_normalize_text_keeps_line_breaks():
+    assert normalize_text("termi-\nnation of theﬁrst  lease \n") == "termination\nof thefirst lease\n"
@@ -0,0 +1,61 @@
+import io
+
+import pytest
+from PIL import Image, ImageDraw
+
+from parser_agent import parser
+from parser_agent.ocr_cache import OCRCache, dhash, hamming, phash
+
+
+def scanned_page(lines):
+    """A white A4-ish page image with a few lines of text, like a 150 dpi scan."""
+    image = Image.new("L", (1240, 1755), 255)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((120, 150 + 40 * i), line, fill=0)
+    return image
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return OCRCache(str(tmp_path / "ocr_cache.sqlite"))
+
+
+def test_different_scanned_pages_do_not_share_text(cache):
+    first = scanned_page([f"1.{i} The Tenant shall pay Rs. 25,000 on the 5th day." for i in range(20)])
+    second = scanned_page([f"1.{i} The Tenant shall pay Rs. 85,000 on the 9th day." for i in range(20)])
+    # The pages are perceptual near-duplicates, which is what made this dangerous
+    assert hamming(phash(first), phash(second)) <= cache.threshold
+    assert hamming(dhash(first), dhash(second)) <= cache.threshold
+
+    cache.put(first, "eng", "first page text")
+    assert cache.get(second, "eng") is None
+    assert cache.stats()["rejected"] == 1
+    assert cache.get(first, "eng") == "first page text"
+
+
+def test_identical_image_hits_regardless_of_encoding(cache):
+    stamp = scanned_page(["NOTARY PUBLIC"]).resize((300, 300))
+    cache.put(stamp, "eng", "NOTARY PUBLIC")
+    buffer = io.BytesIO()
+    stamp.save(buffer, "PNG")
+    assert cache.get(Image.open(buffer), "eng") == "NOTARY PUBLIC"
+    assert cache.get(stamp, "hin+eng") is None
+
+
+class _FakeEngine:
+    name = "fake"
+
+    def images_to_strings(self, images, lang="eng"):
+        return [f"text of {image.getpixel((0, 0))}" for image in images]
+
+
+def test_page_sized_images_skip_the_cache(cache, monkeypatch):
+    monkeypatch.setattr(parser, "get_ocr_cache", lambda: cache)
+    batch = [
+        {"image": scanned_page(["page"]), "page": 1, "index": 0, "coverage": 0.95},
+        {"image": scanned_page(["seal"]).resize((200, 200)), "page": 1, "index": 1, "coverage": 0.04},
+    ]
+    parser._ocr_embedded_images(_FakeEngine(), batch)
+    assert cache.stats()["lookups"] == 1
+    assert cache.stats()["entries"] == 1
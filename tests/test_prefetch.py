@@ -0,0 +1,47 @@
+import threading
+
+from common import scheduler
+from common.document_store import DocumentStore
+from common.prefetch import Prefetcher
+
+
+def test_claim_cancels_a_queued_task_instead_of_waiting():
+    prefetcher = Prefetcher(workers=1, store=DocumentStore())
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+        return "first"
+
+    prefetcher.submit("a", "summary", "key-a", blocker)
+    started.wait(5)
+    ran = []
+    prefetcher.submit("b", "summary", "key-b", lambda: ran.append(1) or "second")
+
+    assert prefetcher.claim("b", "summary", "key-b") is None
+    release.set()
+    assert prefetcher.claim("a", "summary", "key-a") == "first"
+    prefetcher._executor.shutdown(wait=True)
+    assert not ran
+    stats = prefetcher.stats()
+    assert stats["misses"] == 1 and stats["joined"] == 1 and stats["cancelled"] == 1
+
+
+def test_finished_tasks_are_dropped_and_expired_sessions_cancelled():
+    store = DocumentStore()
+    prefetcher = Prefetcher(workers=1, store=store)
+    store.on_session_expired(prefetcher.cancel_session)
+
+    prefetcher.submit("a", "summary", "key-a", lambda: "done")
+    prefetcher._executor.submit(lambda: None).result()  # wait for the queue to drain
+    assert not prefetcher._tasks
+    assert prefetcher.claim("a", "summary", "key-a") == "done"
+
+    release = threading.Event()
+    prefetcher.submit("a", "roles", "key-roles", lambda: release.wait(5) and scheduler.check_cancelled())
+    store.expire_sessions(is_active=lambda session_id: False, force=True)
+    release.set()
+    assert not prefetcher._tasks
+    assert store.stats()["sessions"] == 0 and store.stats()["referenced_bytes"] == 0
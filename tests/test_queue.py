@@ -0,0 +1,106 @@
+import uuid
+
+import pytest
+
+from benchmarks.stub_redis import serve
+from workers.queue import RedisQueue, SQLiteQueue
+
+
+@pytest.fixture(scope="module")
+def redis_url():
+    server = serve(0)
+    yield f"redis://127.0.0.1:{server.server_address[1]}/0"
+    server.shutdown()
+
+
+@pytest.fixture
+def sqlite_queue(tmp_path):
+    return SQLiteQueue(str(tmp_path / "jobs.sqlite"))
+
+
+def test_sqlite_claim_and_complete(sqlite_queue):
+    job_id = sqlite_queue.submit("ocr", {"images": [b"\x89PNG"]})
+    assert sqlite_queue.claim(["summarize"], "worker-1") is None
+
+    job = sqlite_queue.claim(["ocr"], "worker-1")
+    assert job["id"] == job_id and job["attempts"] == 1
+    assert job["payload"] == {"images": [b"\x89PNG"]}
+    assert sqlite_queue.claim(["ocr"], "worker-2") is None
+    assert sqlite_queue.status(job_id)["status"] == "running"
+
+    assert not sqlite_queue.complete(job_id, "worker-2", ["wrong worker"])
+    assert sqlite_queue.complete(job_id, "worker-1", ["page text"])
+    assert sqlite_queue.status(job_id) == {"status": "done", "result": ["page text"], "error": None, "attempts": 1}
+
+
+def test_sqlite_submit_reuses_identical_jobs(sqlite_queue):
+    job_id = sqlite_queue.submit("ocr", {"page": 1})
+    assert sqlite_queue.submit("ocr", {"page": 1}) == job_id
+    assert sqlite_queue.submit("ocr", {"page": 2}) != job_id
+    assert sqlite_queue.submit("tts", {"page": 1}) != job_id
+
+    job = sqlite_queue.claim(["ocr"], "worker-1")
+    sqlite_queue.complete(job["id"], "worker-1", "text")
+    assert sqlite_queue.submit("ocr", {"page": 1}) == job_id  # finished results are shared too
+
+    failed = sqlite_queue.claim(["ocr"], "worker-1")
+    assert failed["payload"] == {"page": 2}
+    assert sqlite_queue.fail(failed["id"], "worker-1", "bad image")
+    assert sqlite_queue.submit("ocr", {"page": 2}) != failed["id"]  # failures are not
+
+
+def test_sqlite_lost_lease_is_requeued_for_another_worker(sqlite_queue):
+    job_id = sqlite_queue.submit("ocr", {"page": 1})
+    sqlite_queue.claim(["ocr"], "dead-worker", lease=-1)
+    assert sqlite_queue.requeue_expired() == 1
+    assert sqlite_queue.status(job_id)["status"] == "queued"
+
+    job = sqlite_queue.claim(["ocr"], "worker-2")
+    assert job["id"] == job_id and job["attempts"] == 2
+    assert not sqlite_queue.complete(job_id, "dead-worker", "late result")
+    assert sqlite_queue.complete(job_id, "worker-2", "text")
+
+
+def test_sqlite_job_fails_after_max_attempts(sqlite_queue):
+    job_id = sqlite_queue.submit("ocr", {"page": 1}, max_attempts=2)
+    for worker in ("worker-1", "worker-2"):
+        assert sqlite_queue.claim(["ocr"], worker, lease=-1)["id"] == job_id
+        assert sqlite_queue.requeue_expired() == 1
+    status = sqlite_queue.status(job_id)
+    assert status["status"] == "failed" and status["attempts"] == 2
+    assert "worker-2" in status["error"]
+    assert sqlite_queue.claim(["ocr"], "worker-3") is None
+
+
+@pytest.fixture
+def queue(redis_url):
+    return RedisQueue(redis_url, prefix=f"test_{uuid.uuid4().hex}:")
+
+
+def test_running_job_without_lease_is_requeued(queue):
+    job_id = queue.submit("ocr", {"page": 1})
+    # A reaper that removed the lease and died before requeueing leaves this behind
+    claimed = queue.claim(["ocr"], "worker-1")
+    queue.client.execute("ZREM", queue._key("leases"), job_id)
+    assert claimed["id"] == job_id
+
+    assert queue.requeue_expired() == 0  # could still be a claim in progress
+    assert queue.requeue_expired() == 1
+    assert queue.status(job_id)["status"] == "queued"
+    assert queue.claim(["ocr"], "worker-2")["id"] == job_id
+
+
+def test_claim_records_the_lease_before_marking_the_job_running(queue):
+    job_id = queue.submit("ocr", {"page": 1})
+    commands = []
+    execute = queue.client.execute
+
+    def recording(*args):
+        commands.append(args[0])
+        return execute(*args)
+
+    queue.client.execute = recording
+    queue.claim(["ocr"], "worker-1")
+    assert commands.index("ZADD") < commands.index("HSET")
+    assert queue.requeue_expired() == 0 and queue.requeue_expired() == 0
+    assert queue.status(job_id)["status"] == "running"
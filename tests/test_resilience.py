@@ -0,0 +1,57 @@
+import pytest
+import requests
+
+from common import api_client
+from common.resilience import CircuitBreaker
+
+
+class _Response:
+    status_code = 200
+    headers = {}
+    content = b"{}"
+
+    def json(self):
+        return {"choices": [{"message": {"content": "ok"}}]}
+
+
+@pytest.fixture
+def half_open(monkeypatch):
+    """An API client whose breaker has opened and whose cooldown is already over."""
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.0)
+    breaker.record_failure()
+    monkeypatch.setattr(api_client, "_breaker", breaker)
+    monkeypatch.setattr(api_client.scheduler, "get_scheduler", lambda: None)
+    return breaker
+
+
+def test_released_probe_lets_the_next_call_probe():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_probe_ending_in_an_unexpected_error_does_not_wedge_the_breaker(half_open, monkeypatch):
+    def broken_post(*args, **kwargs):
+        raise ValueError("malformed request")
+
+    monkeypatch.setattr(api_client, "_post", broken_post)
+    with pytest.raises(ValueError):
+        api_client.chat_completion([{"role": "user", "content": "hi"}], api_key="test", timeout=5)
+    assert half_open.state == "half_open"
+
+    monkeypatch.setattr(api_client, "_post", lambda *args, **kwargs: (_Response(), 0.01))
+    api_client.chat_completion([{"role": "user", "content": "hi"}], api_key="test", timeout=5)
+    assert half_open.state == "closed"
+
+
+def test_call_that_times_out_in_the_scheduler_takes_no_probe(half_open, monkeypatch):
+    def queue_timeout(*args, **kwargs):
+        raise requests.exceptions.Timeout("scheduler queue timeout")
+
+    monkeypatch.setattr(api_client, "_admit", queue_timeout)
+    with pytest.raises(requests.exceptions.Timeout):
+        api_client.chat_completion([{"role": "user", "content": "hi"}], api_key="test", timeout=5)
+    assert half_open.allow()
@@ -0,0 +1,32 @@
+import fcntl
+import os
+
+from common.singleflight import FileLockSingleFlight
+
+
+def test_stale_lock_files_are_pruned_unless_held(tmp_path):
+    flight = FileLockSingleFlight(str(tmp_path), result_ttl=60)
+    assert flight.do("old", lambda: 1) == 1
+    assert flight.do("held", lambda: 2) == 2
+    for name in ("old.lock", "old.result", "held.lock", "held.result"):
+        os.utime(tmp_path / name, (1000, 1000))
+
+    with open(tmp_path / "held.lock", "a+b") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        assert flight.do("new", lambda: 3) == 3
+        remaining = sorted(path.name for path in tmp_path.iterdir())
+        assert remaining == ["held.lock", "new.lock", "new.result"]
+
+
+def test_pruned_lock_is_reopened(tmp_path):
+    flight = FileLockSingleFlight(str(tmp_path))
+    lock_path = tmp_path / "key.lock"
+    lock_path.touch()
+    stale = open(lock_path, "a+b")
+    lock_path.unlink()  # as if pruned after this caller opened it
+    try:
+        assert not flight._is_current(lock_path, stale)
+    finally:
+        stale.close()
+    assert flight.do("key", lambda: "value") == "value"
+    assert lock_path.exists()
@@ -0,0 +1,35 @@
+import os
+
+import fitz
+
+from parser_agent.thumbnails import ThumbnailStore
+
+
+def pdf_bytes(text):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_least_recently_viewed_sources_are_pruned(tmp_path):
+    store = ThumbnailStore(str(tmp_path), max_bytes=0)
+    for i, key in enumerate(["a" * 64, "b" * 64, "c" * 64]):
+        store.add_pdf(pdf_bytes(key), key)
+        assert store.thumbnail(key, 1)
+        os.utime(store._source_path(key), (1000 + i, 1000 + i))
+
+    assert store.prune(force=True) == 2
+    assert not store.has_source("a" * 64) and not store.has_source("b" * 64)
+    assert store.has_source("c" * 64)
+    assert sorted(path.name for path in (tmp_path / "thumbnails").iterdir()) == ["c" * 32]
+    assert store.thumbnail("a" * 64, 1) is None
+
+
+def test_sources_within_the_cap_are_kept(tmp_path):
+    store = ThumbnailStore(str(tmp_path))
+    for key in ["a" * 64, "b" * 64]:
+        store.add_pdf(pdf_bytes(key), key)
+    assert store.prune(force=True) == 0
+    assert store.has_source("a" * 64) and store.has_source("b" * 64)
@@ -0,0 +1,22 @@
+from common import scheduler, tracing
+
+
+def test_spans_are_attributed_to_their_session():
+    was_enabled = tracing.is_enabled()
+    tracing.enable()
+    try:
+        with scheduler.request_context("alice"):
+            with tracing.span("test.alice"):
+                pass
+        with scheduler.request_context("bob"):
+            with tracing.span("test.bob"):
+                pass
+        assert "test.alice" in tracing.summarize("alice")
+        assert "test.bob" not in tracing.summarize("alice")
+
+        tracing.clear("alice")
+        assert "test.alice" not in tracing.summarize()
+        assert "test.bob" in tracing.summarize()
+    finally:
+        tracing.clear("bob")
+        tracing.enable(was_enabled)
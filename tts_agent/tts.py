@@ -1,12 +1,67 @@
-from gtts import gTTS
 import logging
 import os
+import shutil
+import subprocess
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
+
+from common.config import get_env
+from common.singleflight import coalesce, content_key
+from common.tracing import span
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# gtts is imported on first synthesis; benchmarks swap in an offline stand-in here.
+gTTS = None
+
+
+def _engine():
+    global gTTS
+    if gTTS is None:
+        from gtts import gTTS as engine
+        gTTS = engine
+    return gTTS
+
+# Speech is re-encoded to Opus at this bitrate when ffmpeg is available: about half
+# the size of gTTS's 32 kbps MP3 at the same intelligibility. "mp3" keeps gTTS's output.
+AUDIO_FORMAT = get_env("LEGAL_LENS_AUDIO_FORMAT", "opus").lower()
+OPUS_BITRATE = get_env("LEGAL_LENS_AUDIO_BITRATE", "16k")
+MIME_TYPES = {".opus": "audio/ogg", ".mp3": "audio/mpeg"}
+
+
+@lru_cache(maxsize=None)
+def _ffmpeg() -> Optional[str]:
+    return shutil.which(get_env("LEGAL_LENS_FFMPEG", "ffmpeg"))
+
+
+def audio_extension() -> str:
+    """File extension text_to_speech should be given for the most compact encoding available here."""
+    return ".opus" if AUDIO_FORMAT == "opus" and _ffmpeg() else ".mp3"
+
+
+def delete_audio(path: str):
+    """Remove an audio file written by text_to_speech, e.g. when its store entry is evicted."""
+    Path(path).unlink(missing_ok=True)
+
+
+def _encode_opus(mp3_path: str, output_path: str) -> bool:
+    """Re-encode gTTS's MP3 as mono speech-tuned Opus; False if ffmpeg fails."""
+    try:
+        subprocess.run(
+            [
+                _ffmpeg(), "-y", "-loglevel", "error", "-i", mp3_path,
+                "-ac", "1", "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip",
+                "-f", "ogg", output_path
+            ],
+            check=True, capture_output=True, timeout=300
+        )
+        return True
+    except (OSError, subprocess.SubprocessError) as e:
+        stderr = getattr(e, "stderr", None)
+        logger.warning(f"Opus encoding failed, keeping MP3: {stderr.decode(errors='replace').strip() if stderr else str(e)}")
+        return False
+
 # Language name to ISO code mapping
 LANGUAGE_CODES = {
     "English": "en",
@@ -19,6 +74,20 @@ LANGUAGE_CODES = {
 }
 
 def text_to_speech(text, lang="English", output_path="summary.mp3"):
+    """
+    Convert text to speech; concurrent identical requests share one synthesis.
+
+    An output path ending in .opus gets Opus audio (see audio_extension) and
+    any other path gets MP3. The file appears complete or not at all, so it
+    can be served while other requests are still writing. Returns the path
+    written, which ends in .mp3 instead if ffmpeg is missing or fails.
+    """
+    return coalesce(
+        content_key("tts.text_to_speech", text, lang, os.path.abspath(output_path)),
+        lambda: _text_to_speech(text, lang, output_path)
+    )
+
+def _text_to_speech(text, lang, output_path):
     try:
         # Create output directory if it doesn't exist
         output_dir = os.path.dirname(output_path)
@@ -36,12 +105,31 @@ def text_to_speech(text, lang="English", output_path="summary.mp3"):
         lang_code = LANGUAGE_CODES.get(lang, "en")  # Default to English if language not found
         logger.debug(f"Using language code: {lang_code}")
             
-        # Create TTS object
-        tts = gTTS(text=text, lang=lang_code, slow=False)
-        
-        # Save the audio file
-        logger.debug("Saving audio file...")
-        tts.save(output_path)
+        mp3_path = os.path.splitext(output_path)[0] + ".mp3"
+        opus = output_path.endswith(".opus") and _ffmpeg() is not None
+        if not opus:
+            output_path = mp3_path
+        partial = f"{mp3_path}.{os.getpid()}.part"
+        with span("tts.synthesize", lang=lang_code, chars=len(text)) as s:
+            # Create TTS object
+            tts = _engine()(text=text, lang=lang_code, slow=False)
+
+            # Save the audio file
+            logger.debug("Saving audio file...")
+            tts.save(partial)
+            if opus:
+                encoded = f"{output_path}.{os.getpid()}.part"
+                with span("tts.encode", format="opus"):
+                    if _encode_opus(partial, encoded):
+                        os.replace(encoded, output_path)
+                        os.remove(partial)
+                    else:
+                        if os.path.exists(encoded):
+                            os.remove(encoded)
+                        output_path = mp3_path
+            if os.path.exists(partial):
+                os.replace(partial, mp3_path)
+            s.set(bytes_in=os.path.getsize(output_path) if os.path.exists(output_path) else 0)
             
         # Verify the file was created
         if not os.path.exists(output_path):
@@ -1,284 +1,106 @@
-LANGUAGES = {
-    "English": {
-        # App UI
-        "title": "Legal Lens AI",
-        "subtitle": "AI-powered legal document analysis",
-        "footer": "Legal Lens AI © 2025",
-        
-        # File handling
-        "upload_title": "Upload Legal Document",
-        "upload_help": "Supported formats: PDF, PNG, JPG, TIFF, BMP",
-        "extracting_text": "Extracting text from document...",
-        "error_processing": "Error processing document",
-        
-        # Document viewer
-        "document_preview": "Document Preview",
-        "key_people": "Key People & Roles",
-        "extract_roles": "Extract Names & Roles",
-        "analyzing": "Analyzing document...",
-        "no_roles_found": "No names with clear roles found in document",
-        
-        # Summary
-        "generate_summary": "Generate AI Summary",
-        "ai_summary": "AI Document Summary",
-        "generate_audio": "Generate Audio Summary",
-        "generating_audio": "Generating audio...",
-        "audio_version": "Audio Summary",
-        "error_audio": "Error generating audio",
-        "read_summary": "Please read the summary above instead",
-        
-        # Chat interface
-        "chatbot_title": "Legal Assistant Chat",
-        "chat_placeholder": "Ask me about this document...",
-        "welcome_message": "👋 Hello! I'm your legal assistant specialized in Indian law. How can I help you today?",
-        "typing_indicator": "LegalBot is typing...",
-        "message_sent": "✓ Delivered",
-        "bot_name": "LegalBot",
-        "bot_avatar": "⚖️",
-        
-        # Errors
-        "general_error": "An unexpected error occurred. We're working on it!",
-        "api_error": "The AI service is currently unavailable",
-        "network_error": "Network connection issue",
-        "response_error": "The AI response couldn't be processed",
-        "api_key_error": "Service configuration error",
-        
-        # Language selection
-        "language_selector": "Interface Language",
-        "summary_language": "Summary Language",
-        
-        # Legal terms
-        "murder_law": {
-            "title": "Indian Murder Laws",
-            "section_302": "IPC Section 302",
-            "death_penalty": "Death Penalty (Rarest of Rare Cases)",
-            "life_term": "Life Imprisonment (14+ years)"
-        }
-    },
-    "Hindi": {
-        # App UI
-        "title": "लीगल लेंस AI",
-        "subtitle": "AI-संचालित कानूनी दस्तावेज़ विश्लेषण",
-        "footer": "लीगल लेंस AI © 2025",
-        
-        # File handling
-        "upload_title": "कानूनी दस्तावेज़ अपलोड करें",
-        "upload_help": "समर्थित प्रारूप: PDF, PNG, JPG, TIFF, BMP",
-        "extracting_text": "दस्तावेज़ से पाठ निकाला जा रहा है...",
-        "error_processing": "दस्तावेज़ प्रसंस्करण में त्रुटि",
-        
-        # Document viewer
-        "document_preview": "दस्तावेज़ पूर्वावलोकन",
-        "key_people": "मुख्य व्यक्ति और भूमिकाएँ",
-        "extract_roles": "नाम और भूमिकाएँ निकालें",
-        "analyzing": "दस्तावेज़ का विश्लेषण किया जा रहा है...",
-        "no_roles_found": "दस्तावेज़ में स्पष्ट भूमिकाओं वाले कोई नाम नहीं मिले",
-        
-        # Summary
-        "generate_summary": "AI सारांश बनाएं",
-        "ai_summary": "AI दस्तावेज़ सारांश",
-        "generate_audio": "ऑडियो सारांश बनाएं",
-        "generating_audio": "ऑडियो बनाया जा रहा है...",
-        "audio_version": "ऑडियो सारांश",
-        "error_audio": "ऑडियो बनाने में त्रुटि",
-        "read_summary": "कृपया ऊपर दिया गया सारांश पढ़ें",
-        
-        # Chat interface
-        "chatbot_title": "कानूनी सहायक चैट",
-        "chat_placeholder": "मुझसे इस दस्तावेज़ के बारे में पूछें...",
-        "welcome_message": "👋 नमस्ते! मैं भारतीय कानून में विशेषज्ञ एक कानूनी सहायक हूँ। आज मैं आपकी कैसे मदद कर सकता हूँ?",
-        "typing_indicator": "लिख रहा है...",
-        "message_sent": "✓ भेजा गया",
-        "bot_name": "कानूनी सहायक",
-        "bot_avatar": "📜",
-        
-        # Errors
-        "general_error": "एक अप्रत्याशित त्रुटि हुई। हम इस पर काम कर रहे हैं!",
-        "api_error": "AI सेवा वर्तमान में उपलब्ध नहीं है",
-        "network_error": "नेटवर्क कनेक्शन समस्या",
-        "response_error": "AI प्रतिक्रिया को संसाधित नहीं किया जा सका",
-        "api_key_error": "सेवा कॉन्फ़िगरेशन त्रुटि",
-        
-        # Language selection
-        "language_selector": "इंटरफ़ेस भाषा",
-        "summary_language": "सारांश भाषा",
-        
-        # Legal terms
-        "murder_law": {
-            "title": "भारतीय हत्या कानून",
-            "section_302": "आईपीसी धारा 302",
-            "death_penalty": "मृत्युदंड (अत्यंत दुर्लभ मामले)",
-            "life_term": "आजीवन कारावास (14+ वर्ष)"
-        }
-    },
-    "Telugu": {
-        # App UI
-        "title": "లీగల్ లెన్స్ AI",
-        "subtitle": "AI-శక్తితో చట్టపరమైన డాక్యుమెంట్ విశ్లేషణ",
-        "footer": "లీగల్ లెన్స్ AI © 2025",
-        
-        # File handling
-        "upload_title": "చట్టపరమైన డాక్యుమెంట్ అప్లోడ్ చేయండి",
-        "upload_help": "సపోర్ట్ చేయబడిన ఫార్మాట్లు: PDF, PNG, JPG, TIFF, BMP",
-        "extracting_text": "డాక్యుమెంట్ నుండి టెక్స్ట్ తీస్తున్నాము...",
-        "error_processing": "డాక్యుమెంట్ ప్రాసెస్ చేయడంలో లోపం",
-        
-        # Chat interface
-        "chatbot_title": "చట్టపరమైన సహాయకుడు చాట్",
-        "chat_placeholder": "ఈ డాక్యుమెంట్ గురించి నన్ను అడగండి...",
-        "welcome_message": "👋 నమస్కారం! నేను భారతీయ చట్టంలో నిపుణుడిని. ఈరోజు నేను మీకు ఎలా సహాయం చేయగలను?",
-        "typing_indicator": "టైప్ చేస్తోంది...",
-        "message_sent": "✓ పంపబడింది",
-        "bot_name": "చట్టపరమైన సహాయకుడు",
-        "bot_avatar": "📜",
-        
-        # Language selection
-        "language_selector": "ఇంటర్ఫేస్ భాష",
-        "summary_language": "సారాంశం భాష"
-    },
-    "Marathi": {
-        # App UI
-        "title": "लीगल लेन्स AI",
-        "subtitle": "AI-चालित कायदेशीर दस्तऐवज विश्लेषण",
-        "footer": "लीगल लेन्स AI © 2025",
-        
-        # Chat interface
-        "chatbot_title": "कायदेशीर सहाय्यक चॅट",
-        "chat_placeholder": "या दस्तऐवजाबद्दल मला विचारा...",
-        "welcome_message": "👋 नमस्कार! मी भारतीय कायद्यात तज्ञ आहे. आज मी तुम्हाला कशी मदत करू शकतो?",
-        "typing_indicator": "टाइप करत आहे...",
-        "message_sent": "✓ पाठवले",
-        "bot_name": "कायदेशीर सहाय्यक",
-        "bot_avatar": "📜",
-        
-        # Language selection
-        "language_selector": "इंटरफेस भाषा",
-        "summary_language": "सारांश भाषा"
-    },
-    "Bengali": {
-        # App UI
-        "title": "লিগাল লেন্স AI",
-        "subtitle": "AI-চালিত আইনি নথি বিশ্লেষণ",
-        "footer": "লিগাল লেন্স AI © 2025",
-        
-        # Chat interface
-        "chatbot_title": "আইনি সহায়ক চ্যাট",
-        "chat_placeholder": "এই নথি সম্পর্কে আমাকে জিজ্ঞাসা করুন...",
-        "welcome_message": "👋 নমস্কার! আমি ভারতীয় আইনে বিশেষজ্ঞ। আজ আমি আপনাকে কিভাবে সাহায্য করতে পারি?",
-        "typing_indicator": "টাইপ করছে...",
-        "message_sent": "✓ পাঠানো হয়েছে",
-        "bot_name": "আইনি সহায়ক",
-        "bot_avatar": "📜",
-        
-        # Language selection
-        "language_selector": "ইন্টারফেস ভাষা",
-        "summary_language": "সারাংশ ভাষা"
-    },
-    "Tamil": {
-        # App UI
-        "title": "லீகல் லென்ஸ் AI",
-        "subtitle": "AI-இயக்கப்பட்ட சட்ட ஆவண பகுப்பாய்வு",
-        "footer": "லீகல் லென்ஸ் AI © 2025",
-        
-        # Chat interface
-        "chatbot_title": "சட்ட உதவியாளர் அரட்டை",
-        "chat_placeholder": "இந்த ஆவணத்தைப் பற்றி என்னிடம் கேளுங்கள்...",
-        "welcome_message": "👋 வணக்கம்! நான் இந்திய சட்டத்தில் நிபுணர். இன்று நான் உங்களுக்கு எப்படி உதவ முடியும்?",
-        "typing_indicator": "தட்டச்சு செய்கிறது...",
-        "message_sent": "✓ அனுப்பப்பட்டது",
-        "bot_name": "சட்ட உதவியாளர்",
-        "bot_avatar": "📜",
-        
-        # Language selection
-        "language_selector": "இடைமுகம் மொழி",
-        "summary_language": "சுருக்கம் மொழி"
-    },
-    "Spanish": {
-        # App UI
-        "title": "Legal Lens AI",
-        "subtitle": "Análisis de documentos legales con IA",
-        "footer": "Legal Lens AI © 2025",
-        
-        # Chat interface
-        "chatbot_title": "Asistente Legal Chat",
-        "chat_placeholder": "Pregúntame sobre este documento...",
-        "welcome_message": "👋 ¡Hola! Soy tu asistente legal especializado en derecho indio. ¿Cómo puedo ayudarte hoy?",
-        "typing_indicator": "Escribiendo...",
-        "message_sent": "✓ Enviado",
-        "bot_name": "Asistente Legal",
-        "bot_avatar": "📜",
-        
-        # Language selection
-        "language_selector": "Idioma de la interfaz",
-        "summary_language": "Idioma del resumen"
-    },
-    "German": {
-        # App UI
-        "title": "Legal Lens AI",
-        "subtitle": "KI-gestützte Analyse von Rechtsdokumenten",
-        "footer": "Legal Lens AI © 2025",
-        
-        # Chat interface
-        "chatbot_title": "Rechtsassistent Chat",
-        "chat_placeholder": "Fragen Sie mich zu diesem Dokument...",
-        "welcome_message": "👋 Hallo! Ich bin Ihr auf indisches Recht spezialisierter Rechtsassistent. Wie kann ich Ihnen heute helfen?",
-        "typing_indicator": "Tippen...",
-        "message_sent": "✓ Gesendet",
-        "bot_name": "Rechtsassistent",
-        "bot_avatar": "📜",
-        
-        # Language selection
-        "language_selector": "Schnittstellensprache",
-        "summary_language": "Zusammenfassungssprache"
-    },
-    "French": {
-        # App UI
-        "title": "Legal Lens AI",
-        "subtitle": "Analyse de documents juridiques par IA",
-        "footer": "Legal Lens AI © 2025",
-        
-        # Chat interface
-        "chatbot_title": "Assistant Juridique Chat",
-        "chat_placeholder": "Posez-moi des questions sur ce document...",
-        "welcome_message": "👋 Bonjour! Je suis votre assistant juridique spécialisé en droit indien. Comment puis-je vous aider aujourd'hui?",
-        "typing_indicator": "En train d'écrire...",
-        "message_sent": "✓ Envoyé",
-        "bot_name": "Assistant Juridique",
-        "bot_avatar": "📜",
-        
-        # Language selection
-        "language_selector": "Langue de l'interface",
-        "summary_language": "Langue du résumé"
-    }
-}
+"""
+Localized UI strings.
+
+Each language is a JSON file in ui_frontend/locales named after the
+language. A file is read the first time its language is used, flattened to
+dotted keys ("murder_law.title") and merged over English, so a lookup is a
+single dict access and strings a translation lacks fall back to English
+without further work. Adding a language is adding a file.
+"""
+import json
+import logging
+import os
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+LOCALES_DIR = Path(__file__).parent / "locales"
+FALLBACK_LANGUAGE = "English"
+
+# English first, as the default choice; the rest in alphabetical order
+AVAILABLE_LANGUAGES = tuple(sorted(
+    (name[:-len(".json")] for name in os.listdir(LOCALES_DIR) if name.endswith(".json")),
+    key=lambda language: (language != FALLBACK_LANGUAGE, language)
+))
+
+_tables: Dict[str, Dict[str, str]] = {}
+_lock = threading.RLock()  # building a table builds the English one first
+
+
+def _flatten(entries: Dict, prefix: str = "") -> Dict[str, str]:
+    flat = {}
+    for key, value in entries.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, str):
+            flat[prefix + key] = value
+    return flat
+
+
+def _load(language: str) -> Dict[str, str]:
+    try:
+        with open(LOCALES_DIR / f"{language}.json", "r", encoding="utf-8") as f:
+            return _flatten(json.load(f))
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to load {language} strings: {str(e)}")
+        return {}
+
+
+def get_table(language: str) -> Dict[str, str]:
+    """
+    The flat key -> string table for a language, English included as fallback.
+
+    Unknown languages get the English table. Tables are built once per process.
+    """
+    table = _tables.get(language)
+    if table is not None:
+        return table
+    if language not in AVAILABLE_LANGUAGES:
+        return get_table(FALLBACK_LANGUAGE)
+    with _lock:
+        if language not in _tables:
+            fallback = get_table(FALLBACK_LANGUAGE) if language != FALLBACK_LANGUAGE else {}
+            _tables[language] = {**fallback, **_load(language)}
+        return _tables[language]
+
+
+class _Catalog(Mapping):
+    """Read-only {language: flat table} view that loads tables on first access."""
+
+    def __getitem__(self, language: str) -> Dict[str, str]:
+        if language not in AVAILABLE_LANGUAGES:
+            raise KeyError(language)
+        return get_table(language)
+
+    def __contains__(self, language) -> bool:
+        return language in AVAILABLE_LANGUAGES
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(AVAILABLE_LANGUAGES)
+
+    def __len__(self) -> int:
+        return len(AVAILABLE_LANGUAGES)
+
+
+LANGUAGES = _Catalog()
+
 
 def get_text(key: str, language: str = "English", default: str = None) -> str:
     """
     Get localized text for the given key and language.
-    
+
     Args:
-        key: The text key to look up (supports dot notation for nested keys)
+        key: The text key to look up (dot notation for nested keys, e.g. "murder_law.title")
         language: The language to use (default: English)
-        default: Fallback value if key not found
-        
+        default: Fallback value if the key is missing in both the language and English
+
     Returns:
-        The localized text or the key itself if not found
+        The localized text, the English text, the default, or the key itself
     """
-    try:
-        # Handle nested keys (e.g., "murder_law.title")
-        keys = key.split('.')
-        lang_dict = LANGUAGES.get(language, LANGUAGES["English"])
-        value = lang_dict
-        
-        for k in keys:
-            if isinstance(value, dict):
-                value = value.get(k, {})
-            else:
-                value = {}
-                break
-        
-        if isinstance(value, str):
-            return value
+    value = (_tables.get(language) or get_table(language)).get(key)
+    if value is None:
         return default if default is not None else key
-    except Exception:
-        return default if default is not None else key
\ No newline at end of file
+    return value
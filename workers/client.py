@@ -0,0 +1,117 @@
+"""
+Run pipeline stages through the job queue when one is configured.
+
+The wrappers here have the signatures of the in-process functions they
+stand in for. With LEGAL_LENS_QUEUE unset, or for a stage not listed in
+LEGAL_LENS_REMOTE_STAGES, they call those functions directly; otherwise
+they submit a job at the caller's scheduler priority and wait for a
+worker to return the result.
+"""
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+from common import scheduler
+from common.config import get_env
+from parser_agent.artifact import from_bytes, to_bytes
+from workers.queue import get_queue
+from workers.stages import image_to_png
+
+logger = logging.getLogger(__name__)
+
+REMOTE_STAGES = frozenset(
+    stage.strip() for stage in get_env("LEGAL_LENS_REMOTE_STAGES", "extract,summarize,tts").split(",") if stage.strip()
+)
+# Seconds a caller waits for a queued job, including time spent queued
+JOB_TIMEOUT = float(get_env("LEGAL_LENS_JOB_TIMEOUT", "600"))
+# Scanned pages per OCR job; smaller jobs spread one document over more workers
+OCR_JOB_PAGES = int(get_env("LEGAL_LENS_OCR_JOB_PAGES", "4"))
+
+
+def is_remote(stage: str) -> bool:
+    return stage in REMOTE_STAGES and get_queue() is not None
+
+
+def run(stage: str, payload: Dict, timeout: float = JOB_TIMEOUT) -> Any:
+    """Submit a job and wait for its result; raises JobFailed or TimeoutError."""
+    queue = get_queue()
+    job_id = queue.submit(stage, payload, priority=scheduler.current_priority())
+    return queue.wait(job_id, timeout)
+
+
+def extract_document(file):
+    """parser_agent.parser.extract_document, on a worker when "extract" is remote."""
+    if not is_remote("extract"):
+        from parser_agent.parser import extract_document as extract_locally
+
+        return extract_locally(file)
+    data = file.getvalue() if hasattr(file, "getvalue") else file.read()
+    try:
+        return from_bytes(run("extract", {"name": file.name, "data": data}))
+    except Exception as e:
+        logger.error(f"Document extraction failed: {str(e)}")
+        raise Exception(f"Failed to process document: {str(e)}")
+
+
+def summarize_document(document, language: str = "English", family=None, reference=None,
+                       save_version: bool = True) -> Dict:
+    """
+    summarizer_agent.incremental.summarize_document, on a worker when "summarize" is remote.
+
+    Version records are kept in the cache directory of the process that
+    summarizes, so workers on several nodes should share one
+    LEGAL_LENS_CACHE_DIR for changes to be reported against the previous
+    version.
+    """
+    if not is_remote("summarize"):
+        from summarizer_agent.incremental import summarize_document as summarize_locally
+
+        return summarize_locally(document, language, family=family, reference=reference, save_version=save_version)
+    return run("summarize", {
+        "document": to_bytes(document),
+        "language": language,
+        "family": family,
+        "reference": to_bytes(reference) if reference is not None else None,
+        "save_version": save_version,
+    })
+
+
+def text_to_speech(text, lang="English", output_path="summary.mp3"):
+    """tts_agent.tts.text_to_speech, on a worker when "tts" is remote; returns the path written."""
+    if not is_remote("tts"):
+        from tts_agent.tts import text_to_speech as synthesize_locally
+
+        return synthesize_locally(text, lang, output_path)
+    base, extension = os.path.splitext(output_path)
+    result = run("tts", {"text": text, "language": lang, "extension": extension or ".mp3"})
+    path = base + result["extension"]
+    if os.path.dirname(path):
+        Path(os.path.dirname(path)).mkdir(parents=True, exist_ok=True)
+    # Written whole, then renamed, so the file can be served while others write it
+    partial = f"{path}.{os.getpid()}.part"
+    Path(partial).write_bytes(result["audio"])
+    os.replace(partial, path)
+    return path
+
+
+def ocr_images(images: List, lang: str = "eng") -> List[str]:
+    """
+    OCR images on the workers, OCR_JOB_PAGES images per job.
+
+    All jobs are submitted before any is waited for, so one scan is read
+    by as many workers as are free.
+    """
+    queue = get_queue()
+    if queue is None:
+        raise Exception("OCR on workers needs a job queue; set LEGAL_LENS_QUEUE")
+    priority = scheduler.current_priority()
+    job_ids = [
+        queue.submit("ocr", {"images": [image_to_png(image) for image in images[i:i + OCR_JOB_PAGES]], "lang": lang},
+                     priority=priority)
+        for i in range(0, len(images), OCR_JOB_PAGES)
+    ]
+    texts = []
+    for job_id in job_ids:
+        texts.extend(queue.wait(job_id, JOB_TIMEOUT))
+    return texts
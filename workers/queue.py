@@ -0,0 +1,512 @@
+"""
+Job queues shared by the UI processes and the stage workers.
+
+A job is one unit of stage work (extract a document, OCR a batch of
+images, summarize, synthesize speech) with a JSON payload. Producers
+`submit` jobs and `wait` for their results. Workers `claim` jobs, hold
+them under a lease they renew with heartbeats, and `complete` or `fail`
+them. A job whose lease runs out belonged to a worker that died; any
+worker's reaper puts it back in the queue, up to `max_attempts` claims.
+
+Two backends share this interface:
+
+- SQLiteQueue: one database file, for workers on the same host
+  (or on a shared filesystem that supports SQLite locking).
+- RedisQueue: any Redis-protocol server, for workers on other nodes.
+
+get_queue() picks one from LEGAL_LENS_QUEUE ("sqlite", "sqlite:///path",
+"redis://host:port/db"); unset means stages run in-process.
+"""
+import base64
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from common.config import get_env
+from common.scheduler import BACKGROUND, INTERACTIVE, ON_DEMAND
+from common.singleflight import content_key
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(get_env("LEGAL_LENS_CACHE_DIR", ".legal_lens_cache"))
+
+STAGES = ("extract", "ocr", "summarize", "tts")
+PRIORITIES = (INTERACTIVE, ON_DEMAND, BACKGROUND)
+# A claimed job is handed to another worker if its lease isn't renewed for this long
+LEASE_SECONDS = float(get_env("LEGAL_LENS_JOB_LEASE", "30"))
+MAX_ATTEMPTS = int(get_env("LEGAL_LENS_JOB_ATTEMPTS", "3"))
+# Finished jobs (results and errors) are kept this long for waiting and deduplication
+RESULT_TTL = float(get_env("LEGAL_LENS_JOB_RESULT_TTL", "3600"))
+# Workers not heard from for this long are listed as gone
+WORKER_TIMEOUT = float(get_env("LEGAL_LENS_WORKER_TIMEOUT", "30"))
+
+
+class JobFailed(Exception):
+    """A job failed in its handler, or ran out of attempts after its workers died."""
+
+
+def _default(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _object_hook(value):
+    if len(value) == 1 and "__bytes__" in value:
+        return base64.b64decode(value["__bytes__"])
+    return value
+
+
+def encode(value: Any) -> str:
+    """JSON with bytes as base64, for payloads and results."""
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode(data: Optional[str]) -> Any:
+    return json.loads(data, object_hook=_object_hook) if data is not None else None
+
+
+def worker_info(stages: Iterable[str], **extra) -> Dict:
+    return {"node": socket.gethostname(), "pid": os.getpid(), "stages": list(stages), **extra}
+
+
+class JobQueue(ABC):
+    """Interface of a job queue backend; see the module docstring."""
+
+    @abstractmethod
+    def submit(self, stage: str, payload: Dict, priority: int = ON_DEMAND,
+               max_attempts: int = MAX_ATTEMPTS) -> str:
+        """
+        Queue a job and return its id.
+
+        A job with the same stage and payload that is queued, running or
+        finished successfully is reused instead, so producers on any node
+        asking for the same work share one job.
+        """
+
+    @abstractmethod
+    def claim(self, stages: Iterable[str], worker_id: str, lease: float = LEASE_SECONDS) -> Optional[Dict]:
+        """
+        Take the next job for one of the stages, highest priority first.
+
+        Returns:
+            {"id", "stage", "payload", "priority", "attempts"} or None if nothing is queued
+        """
+
+    @abstractmethod
+    def extend(self, job_id: str, worker_id: str, lease: float = LEASE_SECONDS) -> bool:
+        """Renew a claimed job's lease; False if the job was handed to another worker."""
+
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: Any) -> bool:
+        """Store a job's result; False if the job was handed to another worker meanwhile."""
+
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """Record that a job's handler failed; failed jobs are not retried."""
+
+    @abstractmethod
+    def status(self, job_id: str) -> Optional[Dict]:
+        """{"status", "result", "error", "attempts"} of a job, or None if unknown or expired."""
+
+    @abstractmethod
+    def requeue_expired(self) -> int:
+        """Put jobs whose lease ran out back in the queue, or fail them after max_attempts; returns how many."""
+
+    @abstractmethod
+    def heartbeat(self, worker_id: str, info: Dict):
+        """Record that a worker is alive, with what it runs and is running."""
+
+    @abstractmethod
+    def workers(self, max_age: float = WORKER_TIMEOUT) -> List[Dict]:
+        """Workers heard from within max_age seconds."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Job counts per stage and status."""
+
+    def purge(self, older_than: float = RESULT_TTL) -> int:
+        """Drop finished jobs older than `older_than` seconds; returns how many."""
+        return 0
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Any:
+        """
+        Block until a job finishes and return its result.
+
+        Raises:
+            JobFailed: if the job failed or its record expired
+            TimeoutError: if it hasn't finished within `timeout` seconds
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        delay = 0.01
+        while True:
+            status = self.status(job_id)
+            if status is None:
+                raise JobFailed(f"Job {job_id} is unknown or expired")
+            if status["status"] == "done":
+                return status["result"]
+            if status["status"] == "failed":
+                raise JobFailed(status["error"] or f"Job {job_id} failed")
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise TimeoutError(f"Job {job_id} did not finish within {timeout:g}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+
+class SQLiteQueue(JobQueue):
+    """Jobs in one SQLite database; claims are serialized by SQLite's write lock."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = str(path or CACHE_DIR / "jobs.sqlite")
+        self._local = threading.local()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit; writes that read first take the write lock up front with BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _create_schema(self):
+        with self._transaction() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, key TEXT NOT NULL, stage TEXT NOT NULL, priority INTEGER NOT NULL, "
+                "payload TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "max_attempts INTEGER NOT NULL, worker TEXT, lease_until REAL, result TEXT, error TEXT, "
+                "created REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (status, stage, priority, created)")
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key)")
+            connection.execute("CREATE TABLE IF NOT EXISTS workers (id TEXT PRIMARY KEY, info TEXT NOT NULL, seen REAL NOT NULL)")
+
+    def submit(self, stage, payload, priority=ON_DEMAND, max_attempts=MAX_ATTEMPTS):
+        data = encode(payload)
+        key = content_key(stage, data)
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT id FROM jobs WHERE key = ? AND status IN ('queued', 'running', 'done') LIMIT 1", (key,)
+            ).fetchone()
+            if row:
+                return row[0]
+            job_id = uuid.uuid4().hex
+            connection.execute(
+                "INSERT INTO jobs (id, key, stage, priority, payload, status, max_attempts, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, key, stage, priority, data, max_attempts, now, now)
+            )
+        return job_id
+
+    def claim(self, stages, worker_id, lease=LEASE_SECONDS):
+        stages = list(stages)
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                f"SELECT id, stage, payload, priority, attempts FROM jobs "
+                f"WHERE status = 'queued' AND stage IN ({', '.join('?' * len(stages))}) "
+                f"ORDER BY priority, created LIMIT 1",
+                stages
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                "lease_until = ?, updated = ? WHERE id = ?",
+                (worker_id, now + lease, now, row[0])
+            )
+        return {"id": row[0], "stage": row[1], "payload": decode(row[2]), "priority": row[3], "attempts": row[4] + 1}
+
+    def _finish(self, job_id, worker_id, assignments: str, values) -> bool:
+        return self._connection().execute(
+            f"UPDATE jobs SET {assignments}, updated = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (*values, time.time(), job_id, worker_id)
+        ).rowcount == 1
+
+    def extend(self, job_id, worker_id, lease=LEASE_SECONDS):
+        return self._finish(job_id, worker_id, "lease_until = ?", (time.time() + lease,))
+
+    def complete(self, job_id, worker_id, result):
+        return self._finish(job_id, worker_id, "status = 'done', result = ?, lease_until = NULL", (encode(result),))
+
+    def fail(self, job_id, worker_id, error):
+        return self._finish(job_id, worker_id, "status = 'failed', error = ?, lease_until = NULL", (error,))
+
+    def status(self, job_id):
+        row = self._connection().execute(
+            "SELECT status, result, error, attempts FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"status": row[0], "result": decode(row[1]), "error": row[2], "attempts": row[3]}
+
+    def requeue_expired(self):
+        now = time.time()
+        with self._transaction() as connection:
+            expired = connection.execute(
+                "SELECT id, worker, attempts, max_attempts FROM jobs WHERE status = 'running' AND lease_until < ?", (now,)
+            ).fetchall()
+            for job_id, worker_id, attempts, max_attempts in expired:
+                if attempts >= max_attempts:
+                    connection.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, lease_until = NULL, updated = ? WHERE id = ?",
+                        (f"Worker lost on each of {attempts} attempts (last: {worker_id})", now, job_id)
+                    )
+                else:
+                    connection.execute(
+                        "UPDATE jobs SET status = 'queued', worker = NULL, lease_until = NULL, updated = ? WHERE id = ?",
+                        (now, job_id)
+                    )
+        if expired:
+            logger.warning(f"Requeued or failed {len(expired)} jobs of lost workers")
+        return len(expired)
+
+    def heartbeat(self, worker_id, info):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO workers (id, info, seen) VALUES (?, ?, ?)", (worker_id, encode(info), time.time())
+        )
+
+    def workers(self, max_age=WORKER_TIMEOUT):
+        rows = self._connection().execute(
+            "SELECT id, info, seen FROM workers WHERE seen >= ? ORDER BY id", (time.time() - max_age,)
+        ).fetchall()
+        return [{"id": worker_id, **decode(info), "seen": seen} for worker_id, info, seen in rows]
+
+    def stats(self):
+        stats = {}
+        for stage, status, count in self._connection().execute(
+            "SELECT stage, status, COUNT(*) FROM jobs GROUP BY stage, status"
+        ):
+            stats.setdefault(stage, {})[status] = count
+        return stats
+
+    def purge(self, older_than=RESULT_TTL):
+        cutoff = time.time() - older_than
+        connection = self._connection()
+        removed = connection.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated < ?", (cutoff,)
+        ).rowcount
+        connection.execute("DELETE FROM workers WHERE seen < ?", (cutoff,))
+        return removed
+
+
+class RedisQueue(JobQueue):
+    """
+    Jobs in a Redis-protocol server, for workers on any number of nodes.
+
+    Each job is a hash; queued ids wait in one list per stage and priority
+    and move atomically to a processing list when claimed (RPOPLPUSH), so
+    no two workers get the same job. Leases are scores in a sorted set.
+    Finished jobs expire after RESULT_TTL. Only basic commands are used
+    (no scripts or transactions), so simple stand-ins work too.
+    """
+
+    def __init__(self, url: str, prefix: str = "legal_lens:"):
+        from workers.resp import RedisClient
+
+        self.client = RedisClient.from_url(url)
+        self.prefix = prefix
+        self._orphans = set()
+        self.client.execute("PING")
+
+    def _key(self, *parts) -> str:
+        return self.prefix + ":".join(str(part) for part in parts)
+
+    def submit(self, stage, payload, priority=ON_DEMAND, max_attempts=MAX_ATTEMPTS):
+        execute = self.client.execute
+        data = encode(payload)
+        key = content_key(stage, data)
+        existing = execute("GET", self._key("key", key))
+        if existing and execute("HGET", self._key("job", existing), "status") in ("queued", "running", "done"):
+            return existing
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        execute(
+            "HSET", self._key("job", job_id), "stage", stage, "priority", priority, "payload", data,
+            "status", "queued", "attempts", 0, "max_attempts", max_attempts, "created", now, "updated", now
+        )
+        execute("SET", self._key("key", key), job_id, "EX", int(RESULT_TTL))
+        execute("LPUSH", self._key("ready", stage, priority), job_id)
+        return job_id
+
+    def claim(self, stages, worker_id, lease=LEASE_SECONDS):
+        execute = self.client.execute
+        stages = list(stages)
+        for priority in PRIORITIES:
+            for stage in stages:
+                job_id = execute("RPOPLPUSH", self._key("ready", stage, priority), self._key("processing"))
+                if job_id is None:
+                    continue
+                job = self._key("job", job_id)
+                now = time.time()
+                attempts = execute("HINCRBY", job, "attempts", 1)
+                # The lease goes first: a job marked running without one would never be reaped
+                execute("ZADD", self._key("leases"), now + lease, job_id)
+                execute("HSET", job, "status", "running", "worker", worker_id, "lease_until", now + lease, "updated", now)
+                payload = execute("HGET", job, "payload")
+                return {"id": job_id, "stage": stage, "payload": decode(payload), "priority": priority, "attempts": attempts}
+        return None
+
+    def _owned(self, job_id, worker_id) -> bool:
+        status, worker = self.client.execute("HMGET", self._key("job", job_id), "status", "worker")
+        return status == "running" and worker == worker_id
+
+    def extend(self, job_id, worker_id, lease=LEASE_SECONDS):
+        if not self._owned(job_id, worker_id):
+            return False
+        until = time.time() + lease
+        self.client.execute("HSET", self._key("job", job_id), "lease_until", until)
+        self.client.execute("ZADD", self._key("leases"), until, job_id)
+        return True
+
+    def _finish(self, job_id, worker_id, *fields) -> bool:
+        if not self._owned(job_id, worker_id):
+            return False
+        execute = self.client.execute
+        job = self._key("job", job_id)
+        execute("HSET", job, *fields, "updated", time.time())
+        execute("ZREM", self._key("leases"), job_id)
+        execute("LREM", self._key("processing"), 1, job_id)
+        execute("EXPIRE", job, int(RESULT_TTL))
+        return True
+
+    def complete(self, job_id, worker_id, result):
+        return self._finish(job_id, worker_id, "status", "done", "result", encode(result))
+
+    def fail(self, job_id, worker_id, error):
+        return self._finish(job_id, worker_id, "status", "failed", "error", error)
+
+    def status(self, job_id):
+        status, result, error, attempts = self.client.execute(
+            "HMGET", self._key("job", job_id), "status", "result", "error", "attempts"
+        )
+        if status is None:
+            return None
+        return {"status": status, "result": decode(result), "error": error, "attempts": int(attempts or 0)}
+
+    def _requeue(self, job_id, now) -> None:
+        execute = self.client.execute
+        job = self._key("job", job_id)
+        execute("LREM", self._key("processing"), 1, job_id)
+        stage, priority, attempts, max_attempts, worker_id = execute(
+            "HMGET", job, "stage", "priority", "attempts", "max_attempts", "worker"
+        )
+        if stage is None:
+            return
+        if int(attempts or 0) >= int(max_attempts or MAX_ATTEMPTS):
+            execute(
+                "HSET", job, "status", "failed", "updated", now,
+                "error", f"Worker lost on each of {attempts} attempts (last: {worker_id})"
+            )
+            execute("EXPIRE", job, int(RESULT_TTL))
+        else:
+            execute("HSET", job, "status", "queued", "worker", "", "updated", now)
+            # Retried jobs go to the front of their queue
+            execute("RPUSH", self._key("ready", stage, priority), job_id)
+
+    def requeue_expired(self):
+        execute = self.client.execute
+        now = time.time()
+        count = 0
+        for job_id in execute("ZRANGEBYSCORE", self._key("leases"), "-inf", now) or []:
+            # Whichever reaper removes the lease owns the requeue
+            if execute("ZREM", self._key("leases"), job_id) == 1:
+                self._requeue(job_id, now)
+                count += 1
+        # Claimed by a worker that died before it could record its lease, or whose
+        # reaper died between removing the lease and requeueing. A claim in progress
+        # looks the same for a moment, so only ids seen on the previous pass count.
+        orphans = set()
+        for job_id in execute("LRANGE", self._key("processing"), 0, -1) or []:
+            if execute("ZSCORE", self._key("leases"), job_id) is not None:
+                continue
+            status = execute("HGET", self._key("job", job_id), "status")
+            if status in (None, "done", "failed"):
+                execute("LREM", self._key("processing"), 1, job_id)
+            elif job_id in self._orphans:
+                self._requeue(job_id, now)
+                count += 1
+            else:
+                orphans.add(job_id)
+        self._orphans = orphans
+        if count:
+            logger.warning(f"Requeued or failed {count} jobs of lost workers")
+        return count
+
+    def heartbeat(self, worker_id, info):
+        self.client.execute("HSET", self._key("workers"), worker_id, encode({**info, "seen": time.time()}))
+
+    def workers(self, max_age=WORKER_TIMEOUT):
+        entries = self.client.execute("HGETALL", self._key("workers")) or []
+        now = time.time()
+        alive = []
+        for worker_id, data in zip(entries[::2], entries[1::2]):
+            info = decode(data)
+            if info["seen"] >= now - max_age:
+                alive.append({"id": worker_id, **info})
+            elif info["seen"] < now - RESULT_TTL:
+                self.client.execute("HDEL", self._key("workers"), worker_id)
+        return sorted(alive, key=lambda info: info["id"])
+
+    def stats(self):
+        """Queued and running job counts per stage; finished jobs aren't indexed."""
+        execute = self.client.execute
+        stats = {}
+        for stage in STAGES:
+            queued = sum(execute("LLEN", self._key("ready", stage, priority)) for priority in PRIORITIES)
+            if queued:
+                stats.setdefault(stage, {})["queued"] = queued
+        for job_id in execute("LRANGE", self._key("processing"), 0, -1) or []:
+            stage = execute("HGET", self._key("job", job_id), "stage")
+            if stage:
+                counts = stats.setdefault(stage, {})
+                counts["running"] = counts.get("running", 0) + 1
+        return stats
+
+
+def open_queue(url: str) -> JobQueue:
+    """A queue for "sqlite", "sqlite:///path/to/jobs.sqlite" or "redis://[:password@]host:port/db"."""
+    if url == "sqlite":
+        return SQLiteQueue()
+    if url.startswith("sqlite://"):
+        return SQLiteQueue(url[len("sqlite://"):] or None)
+    if url.startswith(("redis://", "valkey://")):
+        return RedisQueue(url)
+    raise ValueError(f"Unsupported queue URL: {url}")
+
+
+@lru_cache(maxsize=None)
+def get_queue() -> Optional[JobQueue]:
+    """The queue named by LEGAL_LENS_QUEUE, or None when stages run in-process."""
+    url = get_env("LEGAL_LENS_QUEUE", "")
+    if not url:
+        return None
+    queue = open_queue(url)
+    logger.info(f"Using {type(queue).__name__} job queue at {url.split('@')[-1]}")
+    return queue
@@ -0,0 +1,111 @@
+"""
+Minimal client for the Redis serialization protocol (RESP2).
+
+Covers what the Redis job queue needs, plain commands and their replies,
+without adding a dependency. Works against Redis, Valkey, KeyDB and the
+stand-in in benchmarks/stub_redis.py.
+"""
+import socket
+import threading
+from typing import Any, Optional
+from urllib.parse import unquote, urlparse
+
+
+class RedisError(Exception):
+    """An error reply from the server."""
+
+
+def _encode(args) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        parts.append(f"${len(data)}\r\n".encode())
+        parts.append(data)
+        parts.append(b"\r\n")
+    return b"".join(parts)
+
+
+def read_reply(stream) -> Any:
+    """Read one reply from a buffered binary stream; bulk strings are decoded as UTF-8."""
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("Connection closed by server")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode("utf-8")
+    if kind == b"-":
+        raise RedisError(body.decode("utf-8"))
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        return data[:-2].decode("utf-8")
+    if kind == b"*":
+        count = int(body)
+        if count < 0:
+            return None
+        return [read_reply(stream) for _ in range(count)]
+    raise RedisError(f"Unexpected reply: {line[:40]!r}")
+
+
+class RedisClient:
+    """One connection per thread to a Redis-protocol server."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisClient":
+        """Client for redis://[:password@]host[:port][/db]."""
+        parsed = urlparse(url)
+        db = parsed.path.lstrip("/")
+        return cls(
+            host=parsed.hostname or "127.0.0.1",
+            port=parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=unquote(parsed.password) if parsed.password else None,
+            **kwargs
+        )
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        stream = sock.makefile("rb")
+        self._local.sock, self._local.stream = sock, stream
+        if self.password:
+            self._send(("AUTH", self.password))
+        if self.db:
+            self._send(("SELECT", self.db))
+
+    def _send(self, args) -> Any:
+        self._local.sock.sendall(_encode(args))
+        return read_reply(self._local.stream)
+
+    def execute(self, *args) -> Any:
+        """Send one command and return its reply, reconnecting once if the connection dropped."""
+        if getattr(self._local, "sock", None) is None:
+            self._connect()
+        try:
+            return self._send(args)
+        except (ConnectionError, socket.timeout, OSError):
+            self.close()
+            self._connect()
+            return self._send(args)
+
+    def close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = self._local.stream = None
@@ -0,0 +1,76 @@
+"""
+Stage handlers run by workers, and the wire format of their payloads.
+
+Each handler takes a job payload (JSON with bytes) and returns a JSON
+result. Documents travel as artifacts (see parser_agent.artifact).
+"""
+import io
+import logging
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from common.config import get_env
+from parser_agent.artifact import from_bytes, to_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def image_to_png(image) -> bytes:
+    if image.mode not in ("1", "L", "P", "RGB", "RGBA"):
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _extract(payload: Dict) -> bytes:
+    from parser_agent.parser import extract_document
+
+    file = io.BytesIO(payload["data"])
+    file.name = payload["name"]
+    file.size = len(payload["data"])
+    return to_bytes(extract_document(file))
+
+
+def _ocr(payload: Dict) -> List[str]:
+    from PIL import Image
+
+    from parser_agent.ocr import get_ocr_engine
+
+    # Workers run a local engine; "queue" here would send the images straight back to the queue
+    name = get_env("LEGAL_LENS_WORKER_OCR_ENGINE", "auto")
+    if name == "queue":
+        raise Exception("LEGAL_LENS_WORKER_OCR_ENGINE cannot be queue")
+    images = [Image.open(io.BytesIO(data)) for data in payload["images"]]
+    return get_ocr_engine(name).images_to_strings(images, lang=payload.get("lang", "eng"))
+
+
+def _summarize(payload: Dict) -> Dict:
+    from summarizer_agent.incremental import summarize_document
+
+    reference = payload.get("reference")
+    return summarize_document(
+        from_bytes(payload["document"]),
+        payload.get("language", "English"),
+        family=payload.get("family"),
+        reference=from_bytes(reference) if reference else None,
+        save_version=payload.get("save_version", True),
+    )
+
+
+def _tts(payload: Dict) -> Dict:
+    from tts_agent.tts import text_to_speech
+
+    with tempfile.TemporaryDirectory(prefix="legal-lens-tts-") as directory:
+        path = text_to_speech(payload["text"], payload.get("language", "English"),
+                              str(Path(directory) / f"audio{payload.get('extension', '.mp3')}"))
+        return {"audio": Path(path).read_bytes(), "extension": Path(path).suffix}
+
+
+HANDLERS: Dict[str, Callable[[Dict], object]] = {
+    "extract": _extract,
+    "ocr": _ocr,
+    "summarize": _summarize,
+    "tts": _tts,
+}
@@ -0,0 +1,176 @@
+"""
+Stage worker: claims jobs from the shared queue and runs them.
+
+Start as many as the load needs, on as many nodes as can reach the queue;
+they share the work by claiming jobs one at a time. Each runs
+`concurrency` claim loops plus a heartbeat loop that renews the leases
+of its running jobs, publishes what it is doing, and reaps jobs left
+behind by workers that died.
+
+Usage:
+    python -m workers.worker --queue redis://queue-host:6379/0 --stages ocr --concurrency 4
+    python -m workers.worker --queue sqlite --stages extract,summarize,tts
+    python -m workers.worker --queue sqlite --status
+"""
+import argparse
+import json
+import logging
+import signal
+import threading
+import time
+import traceback
+import uuid
+from typing import Dict, Iterable, Optional
+
+from common import scheduler
+from common.tracing import span
+from workers.queue import (
+    LEASE_SECONDS, RESULT_TTL, STAGES, JobQueue, get_queue, open_queue, worker_info
+)
+from workers.stages import HANDLERS
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Runs queued jobs for a set of stages.
+
+    Args:
+        queue: The shared job queue
+        stages: Stages this worker runs, a subset of STAGES
+        concurrency: Jobs run at the same time
+        lease: Seconds a claimed job stays ours without a heartbeat
+        heartbeat: Seconds between heartbeats; well under `lease`
+        poll: Longest wait between claim attempts while the queue is empty
+    """
+
+    def __init__(self, queue: JobQueue, stages: Iterable[str] = STAGES, concurrency: int = 1,
+                 lease: float = LEASE_SECONDS, heartbeat: Optional[float] = None, poll: float = 0.5):
+        self.queue = queue
+        self.stages = [stage for stage in stages if stage in HANDLERS]
+        if not self.stages:
+            raise ValueError(f"No known stages in {list(stages)}; choose from {', '.join(HANDLERS)}")
+        self.concurrency = concurrency
+        self.lease = lease
+        self.heartbeat_interval = heartbeat or lease / 6
+        self.poll = poll
+        self.id = f"{worker_info(())['node']}-{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._running: Dict[str, str] = {}  # job id -> stage
+        self._counts = {"completed": 0, "failed": 0, "lost": 0}
+
+    def _info(self) -> Dict:
+        with self._lock:
+            return worker_info(self.stages, concurrency=self.concurrency,
+                               running=sorted(self._running.values()), **self._counts)
+
+    def _run_job(self, job: Dict):
+        with self._lock:
+            self._running[job["id"]] = job["stage"]
+        try:
+            with span(f"worker.{job['stage']}", attempt=job["attempts"]) as s:
+                try:
+                    with scheduler.request_context(priority=job["priority"]):
+                        result = HANDLERS[job["stage"]](job["payload"])
+                except Exception as e:
+                    logger.error(f"Job {job['id']} ({job['stage']}) failed: {str(e)}")
+                    logger.debug(traceback.format_exc())
+                    recorded = self.queue.fail(job["id"], self.id, str(e))
+                    outcome = "failed"
+                else:
+                    recorded = self.queue.complete(job["id"], self.id, result)
+                    outcome = "completed"
+                if not recorded:
+                    # Our lease ran out and another worker has the job now
+                    logger.warning(f"Job {job['id']} was handed to another worker; result discarded")
+                    outcome = "lost"
+                s.set(outcome=outcome)
+            with self._lock:
+                self._counts[outcome] += 1
+        finally:
+            with self._lock:
+                self._running.pop(job["id"], None)
+
+    def _claim_loop(self):
+        delay = 0.01
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(self.stages, self.id, self.lease)
+            except Exception as e:
+                logger.error(f"Claiming a job failed: {str(e)}")
+                job = None
+                delay = self.poll
+            if job is None:
+                self._stop.wait(delay)
+                delay = min(delay * 2, self.poll)
+                continue
+            delay = 0.01
+            self._run_job(job)
+
+    def _heartbeat_loop(self):
+        last_purge = 0.0
+        while True:
+            try:
+                with self._lock:
+                    running = list(self._running)
+                for job_id in running:
+                    self.queue.extend(job_id, self.id, self.lease)
+                self.queue.heartbeat(self.id, self._info())
+                self.queue.requeue_expired()
+                if time.monotonic() - last_purge > 60:
+                    self.queue.purge(RESULT_TTL)
+                    last_purge = time.monotonic()
+            except Exception as e:
+                logger.error(f"Worker heartbeat failed: {str(e)}")
+            if self._stop.wait(self.heartbeat_interval):
+                return
+
+    def run(self):
+        """Run until stop() is called, then finish the running jobs."""
+        logger.info(f"Worker {self.id} running {', '.join(self.stages)} x{self.concurrency}")
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="legal-lens-heartbeat", daemon=True)
+        heartbeat.start()
+        loops = [
+            threading.Thread(target=self._claim_loop, name=f"legal-lens-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for loop in loops:
+            loop.start()
+        # Wait in slices so signal handlers run on the main thread
+        while any(loop.is_alive() for loop in loops):
+            for loop in loops:
+                loop.join(0.5)
+        heartbeat.join()
+        logger.info(f"Worker {self.id} stopped: {self._counts}")
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queue", help="queue URL (default: LEGAL_LENS_QUEUE)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated stages to run")
+    parser.add_argument("--concurrency", type=int, default=1, help="jobs run at the same time")
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS)
+    parser.add_argument("--status", action="store_true", help="print live workers and job counts, then exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    queue = open_queue(args.queue) if args.queue else get_queue()
+    if queue is None:
+        parser.error("no queue configured; pass --queue or set LEGAL_LENS_QUEUE")
+    if args.status:
+        print(json.dumps({"workers": queue.workers(), "jobs": queue.stats()}, indent=2))
+        return
+
+    worker = Worker(queue, args.stages.split(","), args.concurrency, args.lease)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()